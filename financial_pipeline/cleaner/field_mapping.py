@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*- #
+"""
+Declarative mapping of the Yahoo line items to the database columns
+"""
+
+from __future__ import annotations
+
+import json
+import hashlib
+import logging
+import pandas as pd
+
+from typing import Any, Dict, List, NamedTuple, Tuple
+
+try:
+    import yaml
+except ImportError:  # Optional dependency, only needed by YAML mapping files
+    yaml = None
+
+
+# ===========================================================================
+# Constant and global variables
+# ===========================================================================
+
+logger = logging.getLogger(__name__)
+
+# Database column -> where its value comes from, in the format of the mapping files:
+#   statement  Snapshot key of the statement holding the line items
+#   items      Line items summed to obtain the value, a leading "-" subtracts an item
+#   fallbacks  Alternative item lists, used in order when an item of the previous ones has no value that year
+#   sign       Multiplies the result, -1 to flip Yahoo's sign convention
+DEFAULT_MAPPING: Dict[str, Dict[str, Any]] = {
+    "sales": {"statement": "incomestmt", "items": ["Operating Revenue"], "fallbacks": [["Total Revenue"]]},
+    "current_assets": {"statement": "balancesheet", "items": ["Current Assets", "Other Current Assets"],
+                       "fallbacks": [["Current Assets"]]},
+    "current_liabilities": {"statement": "balancesheet", "items": ["Current Liabilities", "Other Current Liabilities"],
+                            "fallbacks": [["Current Liabilities"]]},
+    "financial_debts": {"statement": "balancesheet",
+                        "items": ["Derivative Product Liabilities", "Long Term Debt And Capital Lease Obligation"],
+                        "fallbacks": [["Long Term Debt And Capital Lease Obligation"],
+                                      ["Derivative Product Liabilities"]]},
+    "equity": {"statement": "balancesheet", "items": ["Stockholders Equity"]},
+    "intangible_assets": {"statement": "balancesheet", "items": ["Goodwill And Other Intangible Assets"]},
+    "net_income": {"statement": "incomestmt", "items": ["Net Income Continuous Operations"]},
+    "eps": {"statement": "incomestmt", "items": ["Basic EPS"]},
+}
+
+# Columns of the quarterly table, read from the quarterly statements
+QUARTERLY_MAPPING: Dict[str, Dict[str, Any]] = {
+    "sales": {"statement": "quarterly_incomestmt", "items": ["Operating Revenue"], "fallbacks": [["Total Revenue"]]},
+    "net_income": {"statement": "quarterly_incomestmt", "items": ["Net Income Continuous Operations"]},
+    "eps": {"statement": "quarterly_incomestmt", "items": ["Basic EPS"]},
+    "equity": {"statement": "quarterly_balancesheet", "items": ["Stockholders Equity"]},
+}
+
+# ===========================================================================
+# Records
+# ===========================================================================
+
+class FieldSpec(NamedTuple):
+    """One compiled column: alternatives of (line item, sign) pairs, tried in order."""
+
+    name: str
+    statement: str
+    sources: Tuple[Tuple[Tuple[str, int], ...], ...]
+    sign: int
+# End class FieldSpec
+
+# ===========================================================================
+# FieldMapping Class
+# ===========================================================================
+
+class FieldMapping:
+    """
+    Mapping of line items to columns, validated and compiled once. The same
+    compiled fields serve the per-snapshot extraction (`evaluate`) and the
+    vectorized extraction of whole statement frames (`extract_frame`).
+    """
+
+    def __init__(self, spec: Dict[str, Dict[str, Any]] = None) -> None:
+        self.spec = spec if spec is not None else DEFAULT_MAPPING
+        self.fields: List[FieldSpec] = [self._compile(name, entry) for name, entry in self.spec.items()]
+    # End def __init__
+
+    # ---------------------------------------------------------------------------------------------
+    # Magic Methods
+    # ---------------------------------------------------------------------------------------------
+
+    def __repr__(self) -> str:
+        return f"<FieldMapping {self.columns}>"
+    # End def __repr__
+
+    # ---------------------------------------------------------------------------------------------
+    # Accessors
+    # ---------------------------------------------------------------------------------------------
+
+    @property
+    def columns(self) -> List[str]:
+        return [field.name for field in self.fields]
+    # End def columns
+
+    @property
+    def statements(self) -> List[str]:
+        """Statements read by the mapping, in order of first use."""
+        return list(dict.fromkeys(field.statement for field in self.fields))
+    # End def statements
+
+    @property
+    def version(self) -> str:
+        """Hash of the mapping spec: changes whenever a field, item or sign does."""
+        payload = json.dumps(self.spec, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+    # End def version
+
+    def line_items(self) -> set:
+        return {item for field in self.fields for source in field.sources for item, _ in source}
+    # End def line_items
+
+    # ---------------------------------------------------------------------------------------------
+    # Public Methods
+    # ---------------------------------------------------------------------------------------------
+
+    @classmethod
+    def load(cls, path: str) -> FieldMapping:
+        """Read a mapping file, JSON or YAML (`.yml` / `.yaml`, needs `pyyaml`)."""
+        with open(path, encoding="utf-8") as f:
+            if path.endswith((".yml", ".yaml")):
+                if yaml is None:
+                    raise ImportError("YAML mapping files require the 'pyyaml' package.")
+                spec = yaml.safe_load(f)
+            else:
+                spec = json.load(f)
+        logger.info(f"[+] Loaded {len(spec)} fields from {path}")
+        return cls(spec)
+    # End def load
+
+    def evaluate(self, indexes: Dict[str, Dict[str, Dict[str, List[float]]]], year: str) -> Dict[str, Any]:
+        """Value of every column for one year of one snapshot.
+
+        Args:
+            indexes (Dict): Statement -> line item -> year -> values dated that year
+            year (str): Fiscal year
+
+        Returns:
+            Dict[str, Any]: Column -> value of the first alternative having all its items that
+                year, None when none has
+        """
+        row = {}
+        for field in self.fields:
+            index = indexes.get(field.statement, {})
+            row[field.name] = None
+            for source in field.sources:
+                values = []
+                for item, sign in source:
+                    dated = index.get(item, {}).get(year)
+                    # NaN and null count as missing, so that the fallbacks apply instead of a partial sum
+                    if not dated or dated[0] is None or dated[0] != dated[0]:
+                        break
+                    values.append(sign * dated[0])
+                else:
+                    row[field.name] = field.sign * sum(values) if len(values) > 1 else field.sign * values[0]
+                    break
+        return row
+    # End def evaluate
+
+    def extract_frame(self, frame: pd.DataFrame, keys: List[str]) -> pd.DataFrame:
+        """Vectorized evaluation over a long frame of many tickers and years.
+
+        Args:
+            frame (pd.DataFrame): Long frame with the statement, line_item and value columns, plus `keys`
+            keys (List[str]): Columns identifying an output row, e.g. ticker and year
+
+        Returns:
+            pd.DataFrame: One column per field, indexed by the `keys` having at least one value
+        """
+        by_statement = {statement: frame[frame["statement"] == statement] for statement in self.statements}
+        columns = {}
+        for field in self.fields:
+            statement_frame = by_statement[field.statement]
+            value = None
+            for source in field.sources:
+                signs = dict(source)
+                selected = statement_frame[statement_frame["line_item"].isin(signs) & statement_frame["value"].notna()]
+                signed = selected["value"] * selected["line_item"].map(signs)
+                groups = [selected[key] for key in keys]
+                summed = signed.groupby(groups).sum(min_count=1)
+                # Only the keys having every item of the source, as in `evaluate`
+                summed = summed[selected["line_item"].groupby(groups).nunique() == len(signs)]
+                value = summed if value is None else value.combine_first(summed)
+            columns[field.name] = value * field.sign
+        return pd.DataFrame(columns)
+    # End def extract_frame
+
+    # ---------------------------------------------------------------------------------------------
+    # Private Methods
+    # ---------------------------------------------------------------------------------------------
+
+    def _compile(self, name: str, entry: Dict[str, Any]) -> FieldSpec:
+        """Validate one entry of the mapping and turn its item lists into (item, sign) pairs."""
+        if not isinstance(entry, dict) or not entry.get("statement") or not entry.get("items"):
+            raise ValueError(f"Field '{name}' needs a 'statement' and a non-empty 'items' list")
+        unknown = set(entry) - {"statement", "items", "fallbacks", "sign"}
+        if unknown:
+            raise ValueError(f"Field '{name}' has unknown keys {sorted(unknown)}")
+        if entry.get("sign", 1) not in (1, -1):
+            raise ValueError(f"Field '{name}' has a sign other than 1 or -1")
+
+        sources = []
+        for items in [entry["items"], *entry.get("fallbacks", [])]:
+            if isinstance(items, str):
+                items = [items]
+            sources.append(tuple((item[1:], -1) if item.startswith("-") else (item, 1) for item in items))
+        return FieldSpec(name, entry["statement"], tuple(sources), entry.get("sign", 1))
+    # End def _compile
+# End class FieldMapping
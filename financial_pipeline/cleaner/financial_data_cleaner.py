@@ -5,9 +5,15 @@ Cleaning of raw data
 
 from __future__ import annotations
 
+import os
 import logging
+import pandas as pd
 from datetime import datetime
-from typing import Dict, List, Any
+from typing import Dict, Iterable, Iterator, List, Any, NamedTuple, Tuple
+from concurrent.futures import ProcessPoolExecutor
+
+from financial_pipeline.cleaner.field_mapping import QUARTERLY_MAPPING, FieldMapping
+from financial_pipeline.importer.raw_store import read_snapshot_file
 
 
 # ===========================================================================
@@ -17,6 +23,49 @@ from typing import Dict, List, Any
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
+# Columns of the yearly financials block of a `CompanyRecord` around the mapped statement fields,
+# `period_end` being the date the fiscal year ends
+MARKET_COLUMNS = ["year", "period_end", "share_price", "shares_issued"]
+DIVIDEND_COLUMNS = ["dividends"]
+
+# Layout of the records, part of `FinancialDataCleaner.version`: bumped when a column is added,
+# so that the snapshots loaded before are cleaned again
+RECORD_VERSION = "2"
+
+# Quarterly fields summed over the trailing twelve months, as `ttm_<field>` columns
+TTM_FIELDS = ["sales", "net_income", "eps"]
+TTM_QUARTERS = 4
+# Longest span between the first and the last quarter end of a TTM window; more means a missing quarter
+TTM_MAX_SPAN_DAYS = 300
+
+# ===========================================================================
+# Records
+# ===========================================================================
+
+class CompanyRecord(NamedTuple):
+    """A cleaned company: its metadata once, and its financials as one column per field, one row per year."""
+
+    name: str
+    company: Dict[str, Any]
+    financials: pd.DataFrame    # FinancialDataCleaner.columns
+    quarters: pd.DataFrame = None   # FinancialDataCleaner.quarterly_columns, None without quarterly statements
+
+    def to_rows(self) -> List[Dict[str, Any]]:
+        """The per-year rows of `extract_all`."""
+        head = {"name": self.name, **self.company}
+        return [{**head, **row} for row in self.financials.to_dict(orient="records")]
+    # End def to_rows
+# End class CompanyRecord
+
+
+class ExtractChunk(NamedTuple):
+    """Companies cleaned from a chunk of snapshot files, and the files that failed."""
+
+    records: List[CompanyRecord]
+    errors: List[Tuple[str, str]]   # (path, error)
+    paths: List[str]                # Every file of the chunk
+# End class ExtractChunk
+
 # ===========================================================================
 # FinancialDataCleaner Class
 # ===========================================================================
@@ -26,8 +75,18 @@ class FinancialDataCleaner:
     """
     Cleans raw Yahoo Finance JSON data into structured format
     suitable for inserting into the database.
+
+    The statement columns come from a `FieldMapping`, the default one or a
+    JSON / YAML mapping file, compiled once when the cleaner is created.
+    The quarterly statements have a mapping of their own.
     """
 
+    def __init__(self, mapping: FieldMapping | str = None, quarterly_mapping: FieldMapping | str = None) -> None:
+        self.mapping = FieldMapping.load(mapping) if isinstance(mapping, str) else mapping or FieldMapping()
+        self.quarterly_mapping = (FieldMapping.load(quarterly_mapping) if isinstance(quarterly_mapping, str)
+                                  else quarterly_mapping or FieldMapping(QUARTERLY_MAPPING))
+    # End def __init__
+
     # ===========================================================================
     # Magic Methods
     # ===========================================================================
@@ -36,6 +95,28 @@ class FinancialDataCleaner:
         return f"Extraction({datetime.now()})"
     # End def __str__
 
+    # ===========================================================================
+    # Accessors
+    # ===========================================================================
+
+    @property
+    def columns(self) -> List[str]:
+        """Columns of the yearly financials block, see `CompanyRecord`."""
+        return MARKET_COLUMNS + self.mapping.columns + DIVIDEND_COLUMNS
+    # End def columns
+
+    @property
+    def quarterly_columns(self) -> List[str]:
+        """Columns of the quarterly block, see `CompanyRecord`."""
+        return ["period"] + self.quarterly_mapping.columns + [f"ttm_{field}" for field in TTM_FIELDS]
+    # End def quarterly_columns
+
+    @property
+    def version(self) -> str:
+        """Version of the cleaning: a record cleaned with another version may have other values."""
+        return f"{RECORD_VERSION}-{self.mapping.version}-{self.quarterly_mapping.version}"
+    # End def version
+
     # ===========================================================================
     # Public Methods
     # ===========================================================================
@@ -44,88 +125,263 @@ class FinancialDataCleaner:
         """
         Convert raw Yahoo data to structured financial rows.
         Each row is a dictionary keyed by your database columns.
+
+        Every line item and the dividend history are indexed by year in a
+        single pass, then each row reads its fields from those indexes.
         """
-        financials = []
+        columns = self._yearly_columns(raw_data)
+        if not columns["year"]:
+            return []
 
-        # Handle time-series: use income stmt, balance sheet, and dividend dates
-        income = raw_data.get("incomestmt", {})
-        balance = raw_data.get("balancesheet", {})
-        dividends = raw_data.get("dividends", {})
+        # Companies database info, repeated on every row
+        head = {"name": company_name, **self._company_fields(raw_data)}
+        return [{**head, **dict(zip(columns, values))} for values in zip(*columns.values())]
+    # End def extract_all
 
-        # Assume all dicts have the same years; use incomestmt keys as base
-        fiscal_years = list(next(iter(income.values())).keys()) if income else []
-        fiscal_years = [year.split("-")[0] for year in fiscal_years]
-
-        for year in fiscal_years:
-            row = {
-                # Companies database info
-                "name": company_name,
-                "country": raw_data.get("country", None),
-                "phone": raw_data.get("phone", None),
-                "website": raw_data.get("website", None),
-                "industry": raw_data.get("industry", None),
-                "sector": raw_data.get("sector", None),
-                "region": raw_data.get("region", None),
-                "full_exchange_name": raw_data.get("fullExchangeName", None),
-                "exchange_timezone": raw_data.get("exchangeTimezoneShortName", None),
-                "isin": raw_data.get("isin", None),
-                "full_time_employees": int(raw_data.get("fullTimeEmployees", -1)),
-
-                # Financials database info
-                "year": int(year),  # Use only the year part
-                "share_price": raw_data.get("regularMarketPrice", None),
-                "sales": self._get_nested(income, "Operating Revenue", year),
-                "shares_issued": raw_data.get("sharesOutstanding", None),
-                "current_assets": self._sum_nested(balance, ["Current Assets", "Other Current Assets"], year),
-                "current_liabilities": self._sum_nested(balance, ["Current Liabilities", "Other Current Liabilities"], year),
-                "financial_debts": self._sum_nested(balance, [
-                    "Derivative Product Liabilities",
-                    "Long Term Debt And Capital Lease Obligation"
-                ], year),
-                "equity": self._get_nested(balance, "Stockholders Equity", year),
-                "intangible_assets": self._get_nested(balance, "Goodwill And Other Intangible Assets", year),
-                "net_income": self._get_nested(income, "Net Income Continuous Operations", year),
-                "dividends": self._sum_dividends(dividends, year),
-                "eps": self._get_nested(income, "Basic EPS", year),
-            }
-            financials.append(row)
+    def extract_company(self, raw_data: Dict[str, Any], company_name: str) -> CompanyRecord | None:
+        """
+        Columnar variant of `extract_all`: the company fields once and the
+        yearly financials as a DataFrame, for `CompanyStorage.insert_records`.
 
-        return financials
-    # End def extract_all
+        Returns:
+            CompanyRecord | None: The company, None if the snapshot has neither a fiscal
+                year nor a quarter; without fiscal year its financials are empty
+        """
+        columns = self._yearly_columns(raw_data)
+        quarters = self.extract_quarters(raw_data)
+        if not columns["year"] and quarters is None:
+            return None
+        return CompanyRecord(company_name, self._company_fields(raw_data), pd.DataFrame(columns), quarters)
+    # End def extract_company
+
+    def extract_quarters(self, raw_data: Dict[str, Any]) -> pd.DataFrame | None:
+        """
+        Quarterly financials of a snapshot, one row per quarter end of the
+        quarterly income statement, with the trailing twelve months sums.
+
+        Returns:
+            pd.DataFrame | None: `quarterly_columns`, None if the snapshot has no quarterly statement
+        """
+        income = raw_data.get("quarterly_incomestmt") or {}
+        periods = sorted({period for series in income.values() for period in (series or {})})
+        if not periods:
+            return None
+
+        indexes = {statement: self._index_by_year(raw_data.get(statement) or {}, key_length=10)
+                   for statement in self.quarterly_mapping.statements}
+        rows = [{"period": period, **self.quarterly_mapping.evaluate(indexes, period)} for period in periods]
+        return trailing_twelve_months(pd.DataFrame(rows, columns=["period"] + self.quarterly_mapping.columns))
+    # End def extract_quarters
+
+    def extract_many(self, paths: Iterable[str], workers: int = None, chunk_size: int = 200) -> Iterator[ExtractChunk]:
+        """
+        Parse and clean many raw snapshot files over a process pool.
+
+        Args:
+            paths (Iterable[str]): Snapshot files, in any raw format; the company
+                name is the file name without extension
+            workers (int, optional): Number of processes, one per core by default.
+                With 1, the files are cleaned in the calling process
+            chunk_size (int, optional): Number of files per chunk sent to a process
+
+        Yields:
+            ExtractChunk: Rows and per-file errors of each chunk, in the order of `paths`
+        """
+        paths = list(paths)
+        chunks = [paths[i:i + chunk_size] for i in range(0, len(paths), chunk_size)]
+        workers = min(workers or os.cpu_count() or 1, len(chunks))
+
+        if workers <= 1:
+            yield from map(self._extract_files, chunks)
+            return
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            yield from executor.map(self._extract_files, chunks)
+    # End def extract_many
+
+    def extract_statements(self, statements: pd.DataFrame) -> pd.DataFrame:
+        """
+        Vectorized extraction of the statement fields of many tickers at once.
+
+        Args:
+            statements (pd.DataFrame): Long frame with the ticker, statement, line_item,
+                period and value columns, as read from a `StatementStore`
+
+        Returns:
+            pd.DataFrame: One row per (name, year) of the income statements, with the
+                date the fiscal year ends, the mapped columns and dividends. Company info
+                and market data are not part of the statements and stay in the snapshots.
+        """
+        columns = ["name", "year", "period_end"] + self.mapping.columns + DIVIDEND_COLUMNS
+        if statements.empty:
+            return pd.DataFrame(columns=columns)
+
+        frame = statements[["ticker", "statement", "line_item", "period", "value"]].copy()
+        frame["year"] = frame["period"].astype(str).str[:4].astype(int)
+
+        keys = ["ticker", "year"]
+        income = frame[frame["statement"] == "incomestmt"]
+        result = income.groupby(keys)["period"].max().astype(str).str[:10].rename("period_end").to_frame()
+
+        result = result.join(self.mapping.extract_frame(frame, keys))
+
+        dividends = frame[frame["statement"] == "dividends"].groupby(keys)["value"].sum()
+        result["dividends"] = dividends.where(dividends > 0)
+
+        result = result.reset_index().rename(columns={"ticker": "name"})
+        result = result.astype(object).where(result.notna(), None)
+        return result[columns].sort_values(["name", "year"]).reset_index(drop=True)
+    # End def extract_statements
+
+    def extract_quarterly_statements(self, statements: pd.DataFrame) -> pd.DataFrame:
+        """
+        Vectorized extraction of the quarterly fields and their TTM sums, for many tickers at once.
+
+        Args:
+            statements (pd.DataFrame): Long frame as read from a `StatementStore`
+
+        Returns:
+            pd.DataFrame: One row per (name, period) of the quarterly income statements,
+                with the `quarterly_columns`
+        """
+        columns = ["name"] + self.quarterly_columns
+        frame = statements[statements["statement"].isin(self.quarterly_mapping.statements)]
+        keys = ["ticker", "period"]
+        periods = frame.loc[frame["statement"] == "quarterly_incomestmt", keys].drop_duplicates().set_index(keys)
+        if periods.empty:
+            return pd.DataFrame(columns=columns)
+
+        result = periods.join(self.quarterly_mapping.extract_frame(frame, keys))
+        result = result.reset_index().rename(columns={"ticker": "name"})
+        result["period"] = result["period"].astype(str)
+        result = trailing_twelve_months(result, group="name")
+        return result.astype(object).where(result.notna(), None)[columns]
+    # End def extract_quarterly_statements
+
+    def extract_from_store(self, store, tickers: List[str] = None) -> pd.DataFrame:
+        """Re-clean the statements of the whole universe with a single filtered scan of the store."""
+        line_items = self.mapping.line_items() | {"Dividends"}
+        return self.extract_statements(store.read(line_items=line_items, tickers=tickers))
+    # End def extract_from_store
 
     # ===========================================================================
     # Private Methods
     # ===========================================================================
 
-    def _get_nested(self, source: Dict, key: str, year: str) -> float:
-        try:
-            sub_dict = source.get(key, {})
-            for date_str, value in sub_dict.items():
-                if date_str.startswith(year):
-                    return value
-        except Exception as e:
-            logger.warning(f"Missing key {key} for year {year}: {e}")
-            return None
-    # End def _get_nested
-
-    def _sum_nested(self, source: Dict, keys: List[str], year: str) -> float:
-        total = 0.0
-        found = False
-        for key in keys:
-            sub_dict = source.get(key, {})
-            for date_str, value in sub_dict.items():
-                if date_str.startswith(year):
-                    total += value
-                    found = True
-        return total if found else None
-    # End def _sum_nested
-    
-    def _sum_dividends(self, dividends: Dict[str, float], year: str) -> float:
-        year_total = sum(amount for date, amount in dividends.items() if date.startswith(year))
-        return year_total if year_total > 0 else None
-    # End def _sum_dividends
+    def _extract_files(self, paths: List[str]) -> ExtractChunk:
+        """Body of a worker: clean a chunk of files, collecting the errors instead of raising."""
+        chunk = ExtractChunk(records=[], errors=[], paths=paths)
+        for path in paths:
+            try:
+                ticker, raw_data = read_snapshot_file(path)
+                record = self.extract_company(raw_data, ticker)
+                if record is not None:
+                    chunk.records.append(record)
+            except Exception as e:
+                chunk.errors.append((path, f"{type(e).__name__}: {e}"))
+        return chunk
+    # End def _extract_files
+
+    def _company_fields(self, raw_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Fields of the companies table."""
+        return {
+            "country": raw_data.get("country", None),
+            "phone": raw_data.get("phone", None),
+            "website": raw_data.get("website", None),
+            "industry": raw_data.get("industry", None),
+            "sector": raw_data.get("sector", None),
+            "region": raw_data.get("region", None),
+            "full_exchange_name": raw_data.get("fullExchangeName", None),
+            "exchange_timezone": raw_data.get("exchangeTimezoneShortName", None),
+            "isin": raw_data.get("isin", None),
+            "full_time_employees": int(raw_data.get("fullTimeEmployees", -1)),
+        }
+    # End def _company_fields
+
+    def _yearly_columns(self, raw_data: Dict[str, Any]) -> Dict[str, List[Any]]:
+        """Financials of every fiscal year, as `columns` -> one value per year."""
+        # Handle time-series: use the mapped statements and dividend dates
+        income = raw_data.get("incomestmt", {})
+        dividends = raw_data.get("dividends", {})
+
+        # Assume all dicts have the same years; use incomestmt keys as base
+        period_ends = [str(date)[:10] for date in next(iter(income.values())).keys()] if income else []
+        fiscal_years = [date.split("-")[0] for date in period_ends]
+
+        indexes = {statement: self._index_by_year(raw_data.get(statement) or {})
+                   for statement in self.mapping.statements}
+        dividends_by_year = self._dividends_by_year(dividends)
+
+        columns = {
+            "year": [int(year) for year in fiscal_years],  # Use only the year part
+            "period_end": period_ends,
+            "share_price": [raw_data.get("regularMarketPrice", None)] * len(fiscal_years),
+            "shares_issued": [raw_data.get("sharesOutstanding", None)] * len(fiscal_years),
+        }
+        values = [self.mapping.evaluate(indexes, year) for year in fiscal_years]
+        for field in self.mapping.columns:
+            columns[field] = [row[field] for row in values]
+        totals = [dividends_by_year.get(year, 0) for year in fiscal_years]
+        columns["dividends"] = [total if total > 0 else None for total in totals]
+        return columns
+    # End def _yearly_columns
+
+    def _index_by_year(self, statement: Dict[str, Dict[str, float]],
+                       key_length: int = 4) -> Dict[str, Dict[str, List[float]]]:
+        """Line item -> year -> values dated that year, in date order, in one pass over the dates.
+
+        With `key_length=10` the values are indexed by their full date, i.e. by quarter end.
+        """
+        index = {}
+        for line_item, series in statement.items():
+            by_year = index[line_item] = {}
+            for date_str, value in (series or {}).items():
+                by_year.setdefault(date_str[:key_length], []).append(value)
+        return index
+    # End def _index_by_year
+
+    def _dividends_by_year(self, dividends: Dict[str, float]) -> Dict[str, float]:
+        """Total dividend of each year, in one pass over the history."""
+        totals = {}
+        for date_str, amount in dividends.items():
+            totals[date_str[:4]] = totals.get(date_str[:4], 0) + amount
+        return totals
+    # End def _dividends_by_year
 # End class FinancialDataCleaner
 
+# ===========================================================================
+# Functions
+# ===========================================================================
+
+def trailing_twelve_months(frame: pd.DataFrame, group: str = None) -> pd.DataFrame:
+    """
+    Add the `ttm_<field>` columns: sums of the last four quarters of each `TTM_FIELDS`,
+    computed by rolling windows over the whole frame at once.
+
+    A window is left empty when one of its quarters has no value, or when its
+    quarter ends span more than `TTM_MAX_SPAN_DAYS` (a quarter is missing).
+
+    Args:
+        frame (pd.DataFrame): Quarterly rows with a `period` column ("YYYY-MM-DD")
+        group (str, optional): Column identifying the company, when the frame holds several
+
+    Returns:
+        pd.DataFrame: The rows sorted by company and period, with the TTM columns
+    """
+    frame = frame.sort_values([group, "period"] if group else ["period"]).reset_index(drop=True)
+    groups = frame[group] if group else pd.Series(0, index=frame.index)
+
+    dates = pd.to_datetime(frame["period"])
+    span = dates - dates.groupby(groups).shift(TTM_QUARTERS - 1)
+    complete = span <= pd.Timedelta(days=TTM_MAX_SPAN_DAYS)
+
+    for field in TTM_FIELDS:
+        values = pd.to_numeric(frame[field], errors="coerce")
+        rolled = values.groupby(groups).rolling(TTM_QUARTERS, min_periods=TTM_QUARTERS).sum()
+        frame[f"ttm_{field}"] = rolled.reset_index(level=0, drop=True).where(complete)
+    return frame
+# End def trailing_twelve_months
+
 if __name__ == "__main__":
     raw_data = {
             "regularMarketPrice": 52.5,
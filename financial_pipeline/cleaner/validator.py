@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*- #
+"""
+Data-quality validation of the cleaned financials, before they are stored
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import pandas as pd
+
+from typing import Any, Dict, List, NamedTuple, Tuple
+
+
+# ===========================================================================
+# Constant and global variables
+# ===========================================================================
+
+logger = logging.getLogger(__name__)
+
+# Fields every stored year needs, the Graham rules fail on a missing one
+REQUIRED_FIELDS = ["sales", "net_income", "eps", "current_assets", "current_liabilities", "equity"]
+
+# Sector -> fields required instead of REQUIRED_FIELDS. Banks and insurers publish
+# an unclassified balance sheet, without current assets and liabilities.
+SECTOR_REQUIRED_FIELDS: Dict[str, List[str]] = {
+    "Financial Services": ["sales", "net_income", "eps", "equity"],
+}
+
+# Field -> (minimum, maximum) allowed, None for no bound. Missing values are left to REQUIRED_FIELDS.
+RANGES: Dict[str, Tuple[float | None, float | None]] = {
+    "year": (1900, 2100),
+    "share_price": (0, None),
+    "shares_issued": (1, None),
+    "sales": (0, None),
+    "current_assets": (0, None),
+    "current_liabilities": (0, None),
+    "intangible_assets": (0, None),
+    "dividends": (0, None),
+}
+
+# Fields checked for a year-over-year jump of more than `jump_factor` (unit mismatch)
+JUMP_FIELDS = ["sales", "current_assets", "current_liabilities", "equity"]
+
+# ===========================================================================
+# Records
+# ===========================================================================
+
+class ValidationResult(NamedTuple):
+    """Records reduced to their valid years, and the rejected years with their reasons."""
+
+    records: List[Any]          # CompanyRecord
+    quarantine: pd.DataFrame    # name, year, reasons, data
+# End class ValidationResult
+
+# ===========================================================================
+# FinancialValidator Class
+# ===========================================================================
+
+class FinancialValidator:
+    """
+    Vectorized checks of a whole batch of cleaned companies, run between the
+    cleaner and the storage:
+
+    - nulls: a year without one of the `required` fields, or of the fields
+      `sector_required` for the sector of the company
+    - ranges: a value outside its `RANGES` bounds, e.g. a negative share count
+    - jumps: a value more than `jump_factor` times off a neighbouring year of
+      the same company and off its median, e.g. a year read in other units
+    - identities: EPS and net income of opposite signs, or EPS x shares more
+      than `jump_factor` times off the net income
+
+    Every check is a boolean mask over the concatenated financials of the
+    batch; only the failing rows are turned into readable reasons.
+    """
+
+    def __init__(self, required: List[str] = None, ranges: Dict[str, Tuple] = None, jump_factor: float = 100.0,
+                 sector_required: Dict[str, List[str]] = None) -> None:
+        self.required = REQUIRED_FIELDS if required is None else required
+        self.sector_required = SECTOR_REQUIRED_FIELDS if sector_required is None else sector_required
+        self.ranges = RANGES if ranges is None else ranges
+        self.jump_factor = jump_factor
+    # End def __init__
+
+    # ---------------------------------------------------------------------------------------------
+    # Magic Methods
+    # ---------------------------------------------------------------------------------------------
+
+    def __repr__(self) -> str:
+        return f"<FinancialValidator required={self.required} jump_factor={self.jump_factor}>"
+    # End def __repr__
+
+    # ---------------------------------------------------------------------------------------------
+    # Public Methods
+    # ---------------------------------------------------------------------------------------------
+
+    def check(self, frame: pd.DataFrame) -> pd.DataFrame:
+        """Run every check over a batch of yearly rows.
+
+        Args:
+            frame (pd.DataFrame): Rows with a `name` and a `year` column, plus the financial columns
+                and an optional `sector` column selecting the required fields
+
+        Returns:
+            pd.DataFrame: One boolean column per failed check (named by its reason), aligned on `frame`
+        """
+        values = frame.drop(columns=["name", "sector"], errors="ignore").apply(pd.to_numeric, errors="coerce")
+        sectors = frame["sector"] if "sector" in frame else pd.Series(None, index=frame.index, dtype=object)
+        checks = {}
+
+        other_sectors = ~sectors.isin(list(self.sector_required))
+        sector_fields = [field for required in self.sector_required.values() for field in required]
+        for field in dict.fromkeys(self.required + sector_fields):
+            needed = sectors.isin([sector for sector, required in self.sector_required.items() if field in required])
+            if field in self.required:
+                needed |= other_sectors
+            missing = values[field].isna() if field in values else pd.Series(True, frame.index)
+            checks[f"{field}: missing"] = missing & needed
+
+        for field, (low, high) in self.ranges.items():
+            if field not in values:
+                continue
+            below = values[field] < low if low is not None else False
+            above = values[field] > high if high is not None else False
+            checks[f"{field}: out of range"] = below | above
+
+        # Neighbours are taken within a company, in year order
+        order = frame.assign(_year=values["year"]).sort_values(["name", "_year"]).index
+        for field in JUMP_FIELDS:
+            if field in values:
+                checks[f"{field}: over {self.jump_factor:g}x jump from a neighbouring year"] = \
+                    self._spikes(values.loc[order, field], frame.loc[order, "name"]).reindex(frame.index)
+
+        if {"eps", "net_income"} <= set(values):
+            checks["eps: sign differs from net_income"] = values["eps"] * values["net_income"] < 0
+            if "shares_issued" in values:
+                ratio = (values["eps"] * values["shares_issued"]).abs() / values["net_income"].abs().where(
+                    values["net_income"] != 0)
+                checks[f"eps: shares x eps over {self.jump_factor:g}x off net_income"] = self._off(ratio)
+
+        return pd.DataFrame(checks, index=frame.index).astype(bool)
+    # End def check
+
+    def split(self, records: List[Any]) -> ValidationResult:
+        """Validate a batch of `CompanyRecord` at once.
+
+        Returns:
+            ValidationResult: Records keeping only their valid years, and a frame of the
+                quarantined years with their reasons and values
+        """
+        records = [record for record in records if record is not None]
+        if not records:
+            return ValidationResult([], pd.DataFrame(columns=["name", "year", "reasons", "data"]))
+
+        frame = pd.concat([record.financials.assign(name=record.name, sector=(record.company or {}).get("sector"),
+                                                    _record=i)
+                           for i, record in enumerate(records)], ignore_index=True)
+        failed = self.check(frame.drop(columns=["_record"]))
+        rejected = failed.any(axis=1)
+
+        # Companies keep their metadata and quarters even when every year is rejected
+        valid = dict(tuple(frame[~rejected].groupby("_record")))
+        valid_records = [
+            record._replace(financials=valid.get(i, frame.iloc[:0]).drop(columns=["name", "sector", "_record"])
+                            .reset_index(drop=True))
+            for i, record in enumerate(records)
+        ]
+        if not rejected.any():
+            return ValidationResult(valid_records, pd.DataFrame(columns=["name", "year", "reasons", "data"]))
+
+        quarantine = frame[rejected]
+        reasons = failed[rejected].apply(lambda row: "; ".join(row.index[row]), axis=1)
+        data = quarantine.drop(columns=["name", "year", "sector", "_record"])
+        quarantine = pd.DataFrame({
+            "name": quarantine["name"],
+            "year": quarantine["year"].astype(int),
+            "reasons": reasons,
+            "data": [json.dumps(row, default=str) for row in data.astype(object).where(data.notna(), None)
+                     .to_dict(orient="records")],
+        }).reset_index(drop=True)
+
+        if len(quarantine):
+            logger.warning(f"[!] Quarantined {len(quarantine)} of {len(frame)} yearly rows")
+        return ValidationResult(valid_records, quarantine)
+    # End def split
+
+    # ---------------------------------------------------------------------------------------------
+    # Private Methods
+    # ---------------------------------------------------------------------------------------------
+
+    def _spikes(self, values: pd.Series, names: pd.Series) -> pd.Series:
+        """Values more than `jump_factor` off a neighbouring year and off the median of the same company.
+
+        The median keeps the year after a spike, off its neighbour only because of
+        the spike, from being flagged as well.
+        """
+        values = values.abs().where(values != 0)
+        grouped = values.groupby(names)
+        jumped = pd.Series(False, index=values.index)
+        for reference in (grouped.shift(1), grouped.shift(-1)):
+            jumped |= self._off(values / reference)
+        return jumped & self._off(values / grouped.transform("median"))
+    # End def _spikes
+
+    def _off(self, ratio: pd.Series) -> pd.Series:
+        return (ratio > self.jump_factor) | (ratio < 1 / self.jump_factor)
+    # End def _off
+# End class FinancialValidator
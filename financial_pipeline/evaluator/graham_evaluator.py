@@ -43,8 +43,16 @@ class GrahamEvaluator:
     # Public Methods
     # ----------------------------------------------------------------------------------------------------------------------------------------------
     
-    def evaluate(self, company_name: str) -> Dict[str, Dict[str, Any]]:
-        """Evaluate a company against Graham’s rules."""
+    def evaluate(self, company_name: str, ttm: bool = False) -> Dict[str, Dict[str, Any]]:
+        """Evaluate a company against Graham’s rules.
+
+        Args:
+            company_name (str): Company to evaluate
+            ttm (bool, optional): Replace the sales, net income and EPS of the latest
+                fiscal year by the trailing twelve months of the quarterly statements,
+                and its equity by the one of the latest quarter, when they are all
+                available and more recent than the fiscal year
+        """
         rows = self.db.get_financials(company_name)
         if not rows:
             return {"error": f"No financials found for {company_name}"}
@@ -55,6 +63,8 @@ class GrahamEvaluator:
             "dividends", "eps"
         ]
         df = pd.DataFrame(rows, columns=columns).sort_values("year")
+        if ttm:
+            df = self._apply_ttm(df, company_name)
 
         results = {}
 
@@ -75,6 +85,37 @@ class GrahamEvaluator:
     # Private Methods
     # ----------------------------------------------------------------------------------------------------------------------------------------------
     
+    def _apply_ttm(self, df: pd.DataFrame, company_name: str) -> pd.DataFrame:
+        """Latest fiscal year updated with the latest TTM figures of the company.
+
+        The figures replace the year all together, so that they describe a
+        single period: they are skipped when one of them is missing, or when
+        they end before the latest fiscal year. A fiscal year stored without the
+        date it ends is taken to end on December 31.
+        """
+        latest = self.db.get_latest_ttm(company_name)
+        if latest is None:
+            return df
+        updates = {"sales": latest["ttm_sales"], "net_income": latest["ttm_net_income"],
+                   "eps": latest["ttm_eps"], "equity": latest["equity"]}
+        if any(value is None for value in updates.values()):
+            logger.debug(f"[=] {company_name}: TTM to {latest['period']} incomplete, skipped")
+            return df
+
+        year = int(df["year"].iloc[-1])
+        year_end = self.db.get_period_end(company_name, year) or f"{year}-12-31"
+        if str(latest["period"]) < str(year_end):
+            logger.debug(f"[=] {company_name}: TTM to {latest['period']} older than the fiscal year to {year_end}, "
+                         f"skipped")
+            return df
+
+        df = df.copy()
+        for column, value in updates.items():
+            df.loc[df.index[-1], column] = value
+        logger.debug(f"[=] {company_name}: latest year updated with the TTM to {latest['period']}")
+        return df
+    # End def _apply_ttm
+
     # Rule 1: Sales > 100M (50M for utilities — not handled yet)
     def _check_sales(self, df: pd.DataFrame) -> Dict:
         recent = df[df["year"] >= df["year"].max() - 1]
@@ -0,0 +1,308 @@
+# -*- coding: utf-8 -*- #
+"""
+Sources the importer downloads the ticker sections from
+"""
+
+from __future__ import annotations
+
+import time
+import random
+import logging
+import threading
+import yfinance as yf
+
+from yfinance.data import YfData
+
+from typing import Any, Dict, Iterable, List, Tuple
+from functools import lru_cache
+from collections import deque
+
+from financial_pipeline.importer.raw_store import get_raw_store
+
+
+# ===========================================================================
+# Constant and global variables
+# ===========================================================================
+
+logger = logging.getLogger(__name__)
+
+# Independent calls making up one raw snapshot
+SECTIONS = ("info", "isin", "incomestmt", "balancesheet", "dividends", "quarterly_incomestmt",
+            "quarterly_balancesheet")
+
+# Short names accepted by the `sections` argument of the importer
+SECTION_ALIASES = {"income": "incomestmt", "balance": "balancesheet",
+                   "quarterly_income": "quarterly_incomestmt", "quarterly_balance": "quarterly_balancesheet"}
+
+# Pseudo-section refreshing only the market price of a snapshot, from batched quotes
+PRICE = "price"
+
+# Sections still fetched for a secondary listing: its quote and the ISIN tying it to the primary one
+LISTING_SECTIONS = ("info", "isin")
+
+# Host reached by each Yahoo section, used by the circuit breaker
+YAHOO_HOST = "query2.finance.yahoo.com"
+SECTION_HOSTS = {"isin": "markets.businessinsider.com", "quote": "query1.finance.yahoo.com"}
+
+# Batched quote endpoint, accepting a comma separated list of symbols
+QUOTE_URL = "https://query1.finance.yahoo.com/v7/finance/quote"
+
+# ===========================================================================
+# Exceptions
+# ===========================================================================
+
+class ReplayError(Exception):
+    """Error raised by the replay source, either injected or for a missing recording.
+
+    Its `status_code` is the HTTP status the error stands for: 429 when throttled,
+    503 when injected, 404 for a missing recording.
+    """
+
+    def __init__(self, message: str, status_code: int = None) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+    # End def __init__
+# End class ReplayError
+
+# ===========================================================================
+# DataSource Classes
+# ===========================================================================
+
+class DataSource:
+    """
+    Where the importer gets the sections of a ticker from. `open` returns a
+    handle for one ticker, `fetch` returns one JSON-ready section of it.
+    """
+
+    def open(self, ticker: str, session=None) -> Any:
+        raise NotImplementedError
+    # End def open
+
+    def fetch(self, handle: Any, section: str) -> Any:
+        raise NotImplementedError
+    # End def fetch
+
+    def quotes(self, tickers: List[str], session=None) -> Dict[str, float]:
+        """Last price of many tickers in one call. Tickers without a quote are left out."""
+        raise NotImplementedError
+    # End def quotes
+
+    def host(self, section: str) -> str:
+        """Host reached when fetching a section (or `quote` for `quotes`)."""
+        return "local"
+    # End def host
+# End class DataSource
+
+
+class YahooDataSource(DataSource):
+    """
+    Live data from Yahoo Finance through yfinance.
+
+    yfinance's data layer (`YfData`) is a process-wide singleton holding the
+    session, cookie and crumb of every thread. It is bound to the importer's
+    shared session once, instead of on every quote request.
+    """
+
+    def __init__(self) -> None:
+        self._data = None
+        self._session = None
+        self._lock = threading.Lock()
+    # End def __init__
+
+    def __getstate__(self) -> dict:
+        # The data layer and its session stay in their process
+        return {}
+    # End def __getstate__
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__()
+    # End def __setstate__
+
+    def open(self, ticker: str, session=None) -> yf.Ticker:
+        return yf.Ticker(ticker, session=session)
+    # End def open
+
+    def fetch(self, handle: yf.Ticker, section: str) -> Any:
+        """Run the yfinance call behind one section and make it JSON-ready."""
+        if section == "info":
+            return handle.info
+        if section == "isin":
+            return handle.isin
+        if section == "incomestmt":
+            return convert_timestamp(handle.incomestmt.to_dict(orient='index'))
+        if section == "balancesheet":
+            return convert_timestamp(handle.balancesheet.to_dict(orient='index'))
+        if section == "dividends":
+            return {ts.strftime('%Y-%m-%d'): val for ts, val in handle.dividends.items()}
+        if section == "quarterly_incomestmt":
+            return convert_timestamp(handle.quarterly_incomestmt.to_dict(orient='index'))
+        if section == "quarterly_balancesheet":
+            return convert_timestamp(handle.quarterly_balancesheet.to_dict(orient='index'))
+        raise ValueError(f"Unknown section: {section}")
+    # End def fetch
+
+    def quotes(self, tickers: List[str], session=None) -> Dict[str, float]:
+        # yfinance's data layer handles the cookie and crumb the endpoint requires
+        result = self._yf_data(session).get_raw_json(QUOTE_URL, params={
+            "symbols": ",".join(tickers), "fields": "regularMarketPrice", "formatted": "false"})
+        quotes = result.get("quoteResponse", {}).get("result") or []
+        return {quote["symbol"]: quote["regularMarketPrice"] for quote in quotes
+                if quote.get("regularMarketPrice") is not None}
+    # End def quotes
+
+    def host(self, section: str) -> str:
+        return SECTION_HOSTS.get(section, YAHOO_HOST)
+    # End def host
+
+    def _yf_data(self, session=None) -> YfData:
+        """yfinance's data layer, bound to `session` when it first shows up rather than per call."""
+        with self._lock:
+            if self._data is None or (session is not None and session is not self._session):
+                self._data = YfData(session=session) if session is not None else YfData()
+                self._session = session
+            return self._data
+    # End def _yf_data
+# End class YahooDataSource
+
+
+class ReplayDataSource(DataSource):
+    """
+    Offline source serving snapshots recorded in a raw directory, with
+    optional latency, random errors and throttling, to benchmark the
+    importer and reproduce production failures without the network.
+    """
+
+    def __init__(self, fixture_path: str, raw_format: str = "json", latency: float | Tuple[float, float] = 0.0,
+                 error_rate: float = 0.0, max_rps: float = None, seed: int = None, cache_size: int = 256) -> None:
+        """
+        Args:
+            fixture_path (str): Raw directory holding the recorded snapshots
+            raw_format (str, optional): Format of the recorded snapshots
+            latency (float | Tuple[float, float], optional): Delay of each call in seconds, or (min, max) bounds
+            error_rate (float, optional): Probability of a call failing
+            max_rps (float, optional): Calls per second above which calls fail as throttled
+            seed (int, optional): Seed of the latency and error draws
+            cache_size (int, optional): Number of snapshots kept in memory
+        """
+        self.store = get_raw_store(raw_format, fixture_path)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.max_rps = max_rps
+        self.cache_size = cache_size
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._calls = deque()
+        self._load = lru_cache(maxsize=cache_size)(self.store.read)
+    # End def __init__
+
+    def __getstate__(self) -> dict:
+        # Locks and caches are rebuilt in the worker processes
+        state = self.__dict__.copy()
+        for key in ("_lock", "_calls", "_load"):
+            state.pop(key)
+        return state
+    # End def __getstate__
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+        self._calls = deque()
+        self._load = lru_cache(maxsize=self.cache_size)(self.store.read)
+    # End def __setstate__
+
+    def open(self, ticker: str, session=None) -> str:
+        return ticker
+    # End def open
+
+    def fetch(self, handle: str, section: str) -> Any:
+        self._simulate_network()
+
+        snapshot = self._load(handle)
+        if snapshot is None:
+            raise ReplayError(f"No recording for {handle}", status_code=404)
+
+        if section == "info":
+            return {key: value for key, value in snapshot.items() if key not in SECTIONS}
+        if section in SECTIONS:
+            return snapshot.get(section)
+        raise ValueError(f"Unknown section: {section}")
+    # End def fetch
+
+    def quotes(self, tickers: List[str], session=None) -> Dict[str, float]:
+        self._simulate_network()
+
+        prices = {}
+        for ticker in tickers:
+            snapshot = self._load(ticker)
+            if snapshot is not None and snapshot.get("regularMarketPrice") is not None:
+                prices[ticker] = snapshot["regularMarketPrice"]
+        return prices
+    # End def quotes
+
+    def host(self, section: str) -> str:
+        return "replay"
+    # End def host
+
+    def _simulate_network(self) -> None:
+        with self._lock:
+            if isinstance(self.latency, tuple):
+                delay = self._random.uniform(*self.latency)
+            else:
+                delay = self.latency
+            failed = self._random.random() < self.error_rate
+            throttled = self._is_throttled()
+
+        if delay:
+            time.sleep(delay)
+        if throttled:
+            raise ReplayError("429 Too Many Requests", status_code=429)
+        if failed:
+            raise ReplayError("Injected error", status_code=503)
+    # End def _simulate_network
+
+    def _is_throttled(self) -> bool:
+        """Count the call in a sliding one-second window (caller holds the lock)."""
+        if self.max_rps is None:
+            return False
+        now = time.monotonic()
+        while self._calls and now - self._calls[0] >= 1.0:
+            self._calls.popleft()
+        self._calls.append(now)
+        return len(self._calls) > self.max_rps
+    # End def _is_throttled
+# End class ReplayDataSource
+
+# ===========================================================================
+# Functions
+# ===========================================================================
+
+def resolve_sections(sections: Iterable[str] | None) -> List[str] | None:
+    """Canonical names of a selection of sections, in `SECTIONS` order then `price`.
+
+    Raises:
+        ValueError: On an unknown section name
+
+    Returns:
+        List[str] | None: The sections, None (every section but `price`) if no selection is given
+    """
+    if sections is None:
+        return None
+    if isinstance(sections, str):
+        sections = [sections]
+    wanted = {SECTION_ALIASES.get(section, section) for section in sections}
+    unknown = wanted - set(SECTIONS) - {PRICE}
+    if unknown:
+        valid = list(SECTIONS) + list(SECTION_ALIASES) + [PRICE]
+        raise ValueError(f"Unknown sections {sorted(unknown)}, expected some of {valid}")
+    return [section for section in (*SECTIONS, PRICE) if section in wanted]
+# End def resolve_sections
+
+def convert_timestamp(original_dict: dict) -> dict:
+    """Turn the timestamp keys of a `DataFrame.to_dict(orient='index')` into date strings."""
+    json_ready_dict = {
+        key: {ts.strftime('%Y-%m-%d'): value for ts, value in subdict.items()}
+        for key, subdict in original_dict.items()
+    }
+    return json_ready_dict
+# End def convert_timestamp
@@ -7,16 +7,31 @@ from __future__ import annotations
 
 import os
 import json
+import time
+import asyncio
 import logging
 import chardet
-import yfinance as yf
 
 from tqdm import tqdm
-from typing import List
+from typing import Any, Dict, Iterable, List
 from pathlib import Path
-from curl_cffi import requests
+from functools import partial
 from concurrent.futures import ThreadPoolExecutor
 
+from financial_pipeline.importer.manifest import RawManifest
+from financial_pipeline.importer.http_cache import HttpCache
+from financial_pipeline.importer.data_sources import (
+    LISTING_SECTIONS, PRICE, SECTIONS, DataSource, YahooDataSource, resolve_sections
+)
+from financial_pipeline.importer.raw_store import get_raw_store
+from financial_pipeline.importer.session_pool import SharedSession
+from financial_pipeline.importer.sharded_import import sharded_import
+from financial_pipeline.importer.telemetry import ImportTelemetry
+from financial_pipeline.importer.work_queue import queued_import, run_worker
+from financial_pipeline.importer.resilience import CircuitBreaker, DeadLetterQueue, RetryPolicy, TokenBucket
+from financial_pipeline.storage.company_storage import CompanyStorage
+from financial_pipeline.storage.ticker_registry import TickerRegistry
+
 
 # ===========================================================================
 # Constant and global variables
@@ -32,47 +47,255 @@ logging.basicConfig(level=logging.INFO)
 class FinancialDataImporter:
     """Import the data from Internet"""
 
-    def __init__(self, ticker_source=None, data_path="data/raw/"):
+    def __init__(self, ticker_source=None, data_path="data/raw/", ttl=None,
+                 rate_limit=5.0, max_attempts=4, raw_format="json", statement_store=None,
+                 source: DataSource = None, registry_path=None, http_cache: str | HttpCache = None):
+        # Settings needed to rebuild an equivalent importer in another process
+        self.config = dict(ticker_source=ticker_source, data_path=data_path, ttl=ttl,
+                           rate_limit=rate_limit, max_attempts=max_attempts, raw_format=raw_format,
+                           statement_store=statement_store, source=source, registry_path=registry_path,
+                           http_cache=http_cache)
+
         self.ticker_source = ticker_source or "data/raw/yh_tickers.json"
         self.data_path = data_path
-        os.makedirs(self.data_path, exist_ok=True)
+        self.source = source or YahooDataSource()
+        self.raw_store = get_raw_store(raw_format, self.data_path)
+
+        # Optional on-disk cache of the HTTP responses, given as a file path or an HttpCache
+        if isinstance(http_cache, str):
+            http_cache = HttpCache(http_cache)
+        self.http_cache = http_cache
+        self.session = SharedSession(cache=http_cache)
+        self.manifest = RawManifest(self.data_path, ttl=ttl)
+        self.registry = TickerRegistry(registry_path or os.path.join(self.data_path, "tickers.db"))
+
+        # Shared by every worker of this importer
+        self.rate_limiter = TokenBucket(rate=rate_limit)
+        self.circuit_breaker = CircuitBreaker()
+        self.retry_policy = RetryPolicy(max_attempts=max_attempts)
+        self.dead_letters = DeadLetterQueue(os.path.join(self.data_path, "dead_letter.db"))
+
+        # Optional columnar copy of the statements (see StatementStore)
+        self.statement_store = statement_store
+
+        # Per-ticker timings of the current run, reported by `_finish_run`
+        self.telemetry = ImportTelemetry()
+        self.reports_path = os.path.join(self.data_path, "reports")
     # End def __init__
 
     # ===========================================================================
     # Public methods
     # ===========================================================================
 
-    def retrieve_tickers(self) -> List[str]:
-        """Load tickers from file or return a fallback list."""
-        if not os.path.exists(self.ticker_source):
+    def retrieve_tickers(self, exchange: str = None, type: str = None) -> List[str]:
+        """Select tickers from the registry or return a fallback list.
+
+        Args:
+            exchange (str, optional): Exchange suffix to keep, e.g. "PA" (US for suffix-less tickers)
+            type (str, optional): Security type to keep, e.g. "equity"
+        """
+        self._sync_registry()
+        if len(self.registry) == 0:
             logger.info(f"[!] Ticker file not found: {self.ticker_source}")
             return ["TTE.PA", "AI.PA", "SAN.PA", "DG.PA", "OR.PA", "SU.PA"]
-        
-        data = self._read_dict_from_file(self.ticker_source)
-        tickers = list(data.keys()) if data else []
+
+        tickers = self.registry.select(exchange=exchange, type=type)
         logger.info(f"[+] Retrieved {len(tickers)} tickers")
         return tickers
     # End def retrieve_tickers
                 
-    def retrieve_data(self, tickers: List[str] = None):
-        """Sequential download of financials."""
+    def retrieve_data(self, tickers: List[str] = None, force=False, sections: Iterable[str] = None):
+        """Sequential download of financials, skipping the sections that are still fresh.
+
+        Args:
+            tickers (List[str], optional): Tickers to download, all known tickers by default
+            force (bool, optional): Re-download the selected sections, even those still fresh
+            sections (Iterable[str], optional): Sections to refresh, merged into the stored snapshots:
+                `info`, `isin`, `income`, `balance`, `dividends` and `price`. All but `price` by default
+        """
         tickers = tickers or self.retrieve_tickers()
+        sections, price = self._split_sections(sections)
 
-        for ticker in tqdm(tickers):
-            self._fetch_ticker_data(ticker)
+        if sections:
+            for ticker in tqdm(tickers):
+                self._fetch_ticker_data(ticker, force=force, sections=sections)
+        if price:
+            self._refresh_snapshot_prices(tickers, force)
+        self._finish_run()
     # End def retrieve_data
 
-    def parallel_retrieve_data(self, tickers: List[str] = None, max_workers=2):
-        """Parallel download using threads."""
+    def parallel_retrieve_data(self, tickers: List[str] = None, max_workers=2, force=False,
+                               sections: Iterable[str] = None):
+        """Parallel download using threads, see `retrieve_data` for the sections."""
         tickers = tickers or self.retrieve_tickers()
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            executor.map(self._fetch_ticker_data, tickers)
+        sections, price = self._split_sections(sections)
+
+        if sections:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                fetch = partial(self._fetch_ticker_data, force=force, sections=sections)
+                results = list(executor.map(fetch, tickers))
+            logger.info(f"[+] Downloaded {results.count(True)}/{len(tickers)} tickers")
+        if price:
+            self._refresh_snapshot_prices(tickers, force)
+        self._finish_run()
     # End def parallel_retrieve_data
 
+    def async_retrieve_data(self, tickers: List[str] = None, concurrency=16, force=False,
+                            sections: Iterable[str] = None):
+        """Concurrent download on the shared session, overlapping the calls of each ticker.
+
+        Args:
+            tickers (List[str], optional): Tickers to download, all known tickers by default
+            concurrency (int, optional): Number of tickers in flight at the same time
+            force (bool, optional): Re-download the selected sections, even those still fresh
+            sections (Iterable[str], optional): Sections to refresh, see `retrieve_data`
+        """
+        tickers = tickers or self.retrieve_tickers()
+        sections, price = self._split_sections(sections)
+
+        if sections:
+            asyncio.run(self._async_retrieve(tickers, concurrency, force, sections))
+        if price:
+            self._refresh_snapshot_prices(tickers, force)
+        self._finish_run()
+    # End def async_retrieve_data
+
+    def sharded_retrieve_data(self, tickers: List[str] = None, processes=4, concurrency=8, force=False,
+                              state_path=None) -> Dict[str, int]:
+        """Resumable download split across a process pool, see `sharded_import`.
+
+        Args:
+            tickers (List[str], optional): Tickers to download, all known tickers by default
+            processes (int, optional): Number of worker processes
+            concurrency (int, optional): Number of fetcher threads per process
+            force (bool, optional): Re-download every section, even those still fresh
+            state_path (str, optional): Checkpoint file, `import_state.db` in the raw directory by default
+
+        Returns:
+            Dict[str, int]: Number of tickers per status (done, failed, pending)
+        """
+        tickers = tickers or self.retrieve_tickers()
+        state_path = state_path or os.path.join(self.data_path, "import_state.db")
+        return sharded_import(tickers, self.config, state_path, processes=processes,
+                              concurrency=concurrency, force=force)
+    # End def sharded_retrieve_data
+
+    def queued_retrieve_data(self, tickers: List[str] = None, processes=4, concurrency=8, batch_size=50,
+                             force=False, queue_path=None) -> Dict[str, int]:
+        """Download through a lease-based work queue, shareable with other machines, see `queued_import`.
+
+        Each call is a new run: the tickers imported or failed by a previous run of the queue are queued again.
+
+        Args:
+            tickers (List[str], optional): Tickers to queue, all known tickers by default
+            processes (int, optional): Number of local worker processes
+            concurrency (int, optional): Number of fetcher threads per process
+            batch_size (int, optional): Number of tickers claimed at once by a worker
+            force (bool, optional): Re-download every section, even those still fresh
+            queue_path (str, optional): Queue file, `import_queue.db` in the raw directory by default
+
+        Returns:
+            Dict[str, int]: Number of tickers per status (done, failed, pending, leased)
+        """
+        tickers = tickers or self.retrieve_tickers()
+        queue_path = queue_path or os.path.join(self.data_path, "import_queue.db")
+        return queued_import(tickers, self.config, queue_path, processes=processes, concurrency=concurrency,
+                             batch_size=batch_size, force=force)
+    # End def queued_retrieve_data
+
+    def join_queue(self, queue_path=None, concurrency=8, batch_size=50, force=False) -> Dict[str, int]:
+        """Work on a queue filled by `queued_retrieve_data`, typically from another machine.
+
+        Returns at once if the queue has nothing pending or leased, so start it
+        once the filling run has started.
+
+        Returns:
+            Dict[str, int]: Number of tickers imported by this worker, per status
+        """
+        queue_path = queue_path or os.path.join(self.data_path, "import_queue.db")
+        return run_worker(self.config, queue_path, batch_size=batch_size, concurrency=concurrency, force=force)
+    # End def join_queue
+
+    def retry_failed(self, max_workers=2) -> List[str]:
+        """Download again only the tickers of the dead-letter list.
+
+        Returns:
+            List[str]: Tickers still failing afterwards
+        """
+        tickers = self.dead_letters.tickers()
+        if not tickers:
+            logger.info("[+] No failed ticker to retry")
+            return []
+
+        logger.info(f"[+] Retrying {len(tickers)} failed tickers")
+        self.parallel_retrieve_data(tickers, max_workers=max_workers)
+        return [ticker for ticker in tickers if ticker in self.dead_letters]
+    # End def retry_failed
+
+    def refresh_prices(self, tickers: List[str] = None, batch_size=200, max_workers=4, db_path=None) -> Dict[str, float]:
+        """Update only the share prices, from batched quotes, without downloading the statements.
+
+        Args:
+            tickers (List[str], optional): Tickers to refresh, every company of the database by default
+            batch_size (int, optional): Number of tickers per quote request
+            max_workers (int, optional): Number of quote requests in flight at the same time
+            db_path (str, optional): Company database, the `CompanyStorage` default if None
+
+        Returns:
+            Dict[str, float]: Ticker -> new share price, for the tickers that got a quote
+        """
+        storage = CompanyStorage(db_path)
+        tickers = tickers or [row[1] for row in storage.list_companies()]
+        batches = [tickers[i:i + batch_size] for i in range(0, len(tickers), batch_size)]
+
+        prices = {}
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for quotes in executor.map(self._fetch_quotes, batches):
+                prices.update(quotes)
+
+        updated = storage.update_share_prices(prices)
+        storage.close()
+        logger.info(f"[+] Refreshed {len(prices)}/{len(tickers)} prices, {updated} rows updated")
+        return prices
+    # End def refresh_prices
+
+    def fetch_snapshot(self, ticker: str, force=False) -> dict | None:
+        """Bring the raw snapshot of one ticker up to date and return it.
+
+        Returns:
+            dict | None: The snapshot, None if the download failed (the ticker is then dead-lettered)
+        """
+        record = self.telemetry.start(ticker)
+        try:
+            snapshot = self._update_snapshot(ticker, force, record)
+            return snapshot if snapshot is not None else self._read_snapshot(ticker)
+
+        except Exception as e:
+            logger.error(f"[✗] Error downloading {ticker}: {e}")
+            self.dead_letters.add(ticker, e)
+            self.telemetry.finish(record, "failed", e)
+            return None
+    # End def fetch_snapshot
+
     # ===========================================================================
     # Private methods
     # ===========================================================================    
 
+    def _sync_registry(self):
+        """Load the ticker file into the registry if it changed since it was last loaded."""
+        if not os.path.exists(self.ticker_source):
+            return
+        try:
+            version = str(os.path.getmtime(self.ticker_source))
+        except OSError:
+            version = None
+        if version is not None and self.registry.loaded_version(self.ticker_source) == version:
+            return
+
+        data = self._read_dict_from_file(self.ticker_source)
+        self.registry.load_mapping(data or {}, source=self.ticker_source, version=version)
+    # End def _sync_registry
+
     def _detect_encoding(self, filepath: str) -> str:
         """Detect file encoding using chardet."""
         with open(filepath, "rb") as f:
@@ -97,36 +320,243 @@ class FinancialDataImporter:
             return dictionary
     # End def _read_dict_from_file
     
-    def _fetch_ticker_data(self, ticker: str):
-        """Fetch and store raw financials for one ticker."""
+    def _fetch_ticker_data(self, ticker: str, force=False, sections: List[str] = SECTIONS) -> bool:
+        """Fetch and store the stale raw financials of one ticker. Returns False on failure."""
+        record = self.telemetry.start(ticker)
         try:
-            session = requests.Session(impersonate="chrome")
-            ticker_data = yf.Ticker(ticker, session=session)
-            data = ticker_data.info
-            data['isin'] = ticker_data.isin
-            data['incomestmt'] = self._convert_timestamp(ticker_data.incomestmt.to_dict(orient='index'))
-            data['balancesheet'] = self._convert_timestamp(ticker_data.balancesheet.to_dict(orient='index'))
-            dividends = {ts.strftime('%Y-%m-%d'): val for ts, val in ticker_data.dividends.items()}
-            data['dividends'] = dividends
-
-            output_path = os.path.join(self.data_path, f"{ticker}.json")
-            
-            with open(output_path, "w", encoding="utf-8") as f:
-                json.dump(data, f, indent=4)
-            # logger.info(f"[✓] Downloaded {ticker}")
+            self._update_snapshot(ticker, force, record, sections)
+            return True
 
         except Exception as e:
             logger.error(f"[✗] Error downloading {ticker}: {e}")
+            self.dead_letters.add(ticker, e)
+            self.telemetry.finish(record, "failed", e)
+            return False
     # End def _fetch_ticker_data
 
-    def _convert_timestamp(self, original_dict: dict) -> dict:
-        # Convert the dictionary
-        json_ready_dict = {
-            key: {ts.strftime('%Y-%m-%d'): value for ts, value in subdict.items()}
-            for key, subdict in original_dict.items()
-        }
-        return json_ready_dict
-    # End def _convert_timestamp
+    def _update_snapshot(self, ticker: str, force=False, record: dict = None,
+                         sections: List[str] = SECTIONS) -> dict | None:
+        """Download the stale sections of a ticker, among `sections`, and merge them into its snapshot.
+
+        Returns:
+            dict | None: The new snapshot, None if the stored one was still fresh
+        """
+        sections = self._sections_to_fetch(ticker, force, sections)
+        if not sections:
+            logger.debug(f"[=] {ticker} is up to date")
+            # A failure since recovered by another run is no longer a dead letter
+            self.dead_letters.discard(ticker)
+            self.telemetry.finish(record, "fresh")
+            return None
+
+        handle = self.source.open(ticker, session=self.session.get())
+        parts = {}
+        if self._needs_isin_first(ticker, sections):
+            parts["isin"] = self._call_section(handle, "isin", record)
+        for section in self._listing_sections(ticker, sections, parts):
+            parts[section] = self._call_section(handle, section, record)
+
+        # logger.info(f"[✓] Downloaded {ticker}")
+        snapshot = self._store_parts(ticker, parts, record)
+        self.telemetry.finish(record, "ok")
+        return snapshot
+    # End def _update_snapshot
+
+    async def _async_retrieve(self, tickers: List[str], concurrency: int, force=False,
+                              sections: List[str] = SECTIONS):
+        """Schedule every ticker on the event loop, `concurrency` at a time."""
+        semaphore = asyncio.Semaphore(concurrency)
+        with ThreadPoolExecutor(max_workers=concurrency * len(sections)) as executor:
+            tasks = [self._async_fetch_ticker_data(ticker, semaphore, executor, force, sections) for ticker in tickers]
+            for task in tqdm(asyncio.as_completed(tasks), total=len(tasks)):
+                await task
+    # End def _async_retrieve
+
+    async def _async_fetch_ticker_data(self, ticker: str, semaphore: asyncio.Semaphore, executor: ThreadPoolExecutor,
+                                       force=False, sections: List[str] = SECTIONS):
+        """Fetch the stale sections of one ticker concurrently, then store the snapshot."""
+        loop = asyncio.get_running_loop()
+        async with semaphore:
+            record = self.telemetry.start(ticker)
+            try:
+                sections = self._sections_to_fetch(ticker, force, sections)
+                if not sections:
+                    self.dead_letters.discard(ticker)
+                    self.telemetry.finish(record, "fresh")
+                    return
+                parts = {}
+                if self._needs_isin_first(ticker, sections):
+                    parts["isin"] = await loop.run_in_executor(executor, self._fetch_section, ticker, "isin", record)
+                sections = self._listing_sections(ticker, sections, parts)
+                results = await asyncio.gather(*(
+                    loop.run_in_executor(executor, self._fetch_section, ticker, section, record)
+                    for section in sections
+                ))
+                parts.update(zip(sections, results))
+                await loop.run_in_executor(executor, self._store_parts, ticker, parts, record)
+                self.telemetry.finish(record, "ok")
+            except Exception as e:
+                logger.error(f"[✗] Error downloading {ticker}: {e}")
+                self.dead_letters.add(ticker, e)
+                self.telemetry.finish(record, "failed", e)
+    # End def _async_fetch_ticker_data
+
+    def _fetch_section(self, ticker: str, section: str, record: dict = None) -> Any:
+        """Fetch one section on the shared session."""
+        return self._call_section(self.source.open(ticker, session=self.session.get()), section, record)
+    # End def _fetch_section
+
+    def _call_section(self, handle: Any, section: str, record: dict = None) -> Any:
+        """Fetch one section under the shared rate limiter, with retries and circuit breaker."""
+        retries = []
+        started = time.perf_counter()
+        try:
+            result = self.retry_policy.call(
+                lambda: self.source.fetch(handle, section),
+                host=self.source.host(section),
+                rate_limiter=self.rate_limiter,
+                circuit_breaker=self.circuit_breaker,
+                on_retry=lambda attempt, error: retries.append(error),
+            )
+        except Exception as e:
+            self.telemetry.section(record, section, time.perf_counter() - started, len(retries), e)
+            raise
+        self.telemetry.section(record, section, time.perf_counter() - started, len(retries))
+        return result
+    # End def _call_section
+
+    def _fetch_quotes(self, tickers: List[str]) -> Dict[str, float]:
+        """Quotes of one batch of tickers, empty if the request keeps failing."""
+        try:
+            return self.retry_policy.call(
+                lambda: self.source.quotes(tickers, session=self.session.get()),
+                host=self.source.host("quote"),
+                rate_limiter=self.rate_limiter,
+                circuit_breaker=self.circuit_breaker,
+            )
+        except Exception as e:
+            logger.error(f"[✗] Error fetching quotes of {len(tickers)} tickers: {e}")
+            return {}
+    # End def _fetch_quotes
+
+    def _split_sections(self, sections: Iterable[str] | None) -> tuple[List[str], bool]:
+        """Sections downloaded per ticker, and whether the prices are refreshed from batched quotes."""
+        sections = resolve_sections(sections)
+        if sections is None:
+            return list(SECTIONS), False
+        return [section for section in sections if section != PRICE], PRICE in sections
+    # End def _split_sections
+
+    def _sections_to_fetch(self, ticker: str, force=False, sections: List[str] = SECTIONS) -> List[str]:
+        """Sections of a ticker to download, among `sections`, according to the manifest TTLs and its listing."""
+        if force or not self.raw_store.exists(ticker):
+            sections = list(sections)
+        else:
+            sections = self.manifest.stale_sections(ticker, sections)
+        if self._is_secondary(ticker):
+            return [section for section in sections if section in LISTING_SECTIONS]
+        return sections
+    # End def _sections_to_fetch
+
+    def _is_secondary(self, ticker: str) -> bool:
+        """Whether another listing of the same ISIN is the primary one, whose statements are fetched."""
+        primary = self.registry.primary_of(ticker)
+        return primary is not None and primary != ticker
+    # End def _is_secondary
+
+    def _needs_isin_first(self, ticker: str, sections: List[str]) -> bool:
+        """Whether the ISIN of a ticker must be fetched before deciding which other sections to fetch."""
+        return "isin" in sections and len(sections) > 1 and self.registry.isin_of(ticker) is None
+    # End def _needs_isin_first
+
+    def _listing_sections(self, ticker: str, sections: List[str], parts: Dict[str, Any]) -> List[str]:
+        """Sections left to fetch once the ISIN fetched first (if any) is known.
+
+        A ticker whose ISIN turns out to be listed already elsewhere only gets
+        its `LISTING_SECTIONS`, the statements come from the primary listing.
+        """
+        if "isin" in parts:
+            self.registry.set_isin(ticker, parts["isin"])
+            if self._is_secondary(ticker):
+                logger.info(f"[=] {ticker} is a secondary listing of {self.registry.primary_of(ticker)}")
+                sections = [section for section in sections if section in LISTING_SECTIONS]
+        return [section for section in sections if section not in parts]
+    # End def _listing_sections
+
+    def _refresh_snapshot_prices(self, tickers: List[str], force=False, batch_size=200) -> int:
+        """Merge the market price of batched quotes into the snapshots, leaving the other sections as is.
+
+        Returns:
+            int: Number of snapshots updated
+        """
+        if not force:
+            tickers = [ticker for ticker in tickers if self.manifest.stale_sections(ticker, [PRICE])]
+        updated = 0
+        for i in range(0, len(tickers), batch_size):
+            for ticker, price in self._fetch_quotes(tickers[i:i + batch_size]).items():
+                snapshot = self._read_snapshot(ticker) or {}
+                snapshot["regularMarketPrice"] = price
+                self._write_snapshot(ticker, snapshot)
+                self.manifest.record(ticker, {PRICE: price})
+                updated += 1
+        logger.info(f"[+] Refreshed the price of {updated}/{len(tickers)} snapshots")
+        return updated
+    # End def _refresh_snapshot_prices
+
+    def _store_parts(self, ticker: str, parts: Dict[str, Any], record: dict = None) -> dict:
+        """Merge freshly fetched sections into the snapshot on disk and record them in the manifest."""
+        existing = None if len(parts) == len(SECTIONS) else self._read_snapshot(ticker)
+        snapshot = self._build_snapshot(parts, existing)
+        self.telemetry.written(record, self._write_snapshot(ticker, snapshot))
+        self.manifest.record(ticker, parts)
+        if "isin" in parts:
+            self.registry.set_isin(ticker, parts["isin"])
+        self.dead_letters.discard(ticker)
+        if self.statement_store is not None:
+            self.statement_store.append(ticker, parts)
+        return snapshot
+    # End def _store_parts
+
+    def _finish_run(self, report_suffix: str = "") -> str | None:
+        """Persist what is still buffered at the end of a download run and write its report.
+
+        Returns:
+            str | None: Path of the run report, None if no ticker was processed
+        """
+        if self.statement_store is not None:
+            self.statement_store.flush()
+
+        telemetry, self.telemetry = self.telemetry, ImportTelemetry()
+        if len(telemetry) == 0:
+            return None
+        return telemetry.write_report(self.reports_path, suffix=report_suffix)
+    # End def _finish_run
+
+    def _build_snapshot(self, parts: Dict[str, Any], existing: dict = None) -> dict:
+        """Merge the fetched sections into the raw snapshot layout.
+
+        Args:
+            parts (Dict[str, Any]): Section name -> fetched value
+            existing (dict, optional): Previous snapshot providing the sections not fetched this time
+        """
+        data = dict(existing or {})
+        if "info" in parts:
+            # The info keys are spread at the root of the snapshot
+            data = {key: value for key, value in data.items() if key in SECTIONS}
+            data.update(parts["info"] or {})
+        for section in SECTIONS[1:]:
+            if section in parts:
+                data[section] = parts[section]
+        return data
+    # End def _build_snapshot
+
+    def _read_snapshot(self, ticker: str) -> dict | None:
+        return self.raw_store.read(ticker)
+    # End def _read_snapshot
+
+    def _write_snapshot(self, ticker: str, data: dict) -> int:
+        return self.raw_store.write(ticker, data)
+    # End def _write_snapshot
 # End class StockDataImporter
 
 
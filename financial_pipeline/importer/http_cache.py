@@ -0,0 +1,355 @@
+# -*- coding: utf-8 -*- #
+"""
+On-disk cache of the HTTP responses downloaded by the importer
+"""
+
+from __future__ import annotations
+
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+
+from typing import Any, Dict, List, Tuple
+from urllib.parse import parse_qsl, urlsplit
+from curl_cffi import requests
+
+
+# ===========================================================================
+# Constant and global variables
+# ===========================================================================
+
+logger = logging.getLogger(__name__)
+
+MINUTE = 60
+HOUR = 60 * MINUTE
+DAY = 24 * HOUR
+
+# Lifetime of the responses per endpoint class, first matching URL fragment wins
+CACHE_TTL: List[Tuple[str, float]] = [
+    ("/getcrumb", 0),                       # Session bound, never cached
+    ("/v7/finance/quote", MINUTE),          # Prices
+    ("/quoteSummary/", 4 * HOUR),           # info
+    ("/fundamentals-timeseries/", 30 * DAY),  # incomestmt, balancesheet
+    ("/v8/finance/chart/", 7 * DAY),        # dividends
+    ("businessinsider.com", 365 * DAY),     # isin
+]
+DEFAULT_TTL = HOUR
+
+# Query parameters that change between sessions without changing the response
+IGNORED_PARAMS = ("crumb",)
+
+# Access times of the cache hits are written by batches, of this many hits or after this many seconds
+ACCESS_FLUSH_SIZE = 256
+ACCESS_FLUSH_SECONDS = 30.0
+
+# ===========================================================================
+# HttpCache Class
+# ===========================================================================
+
+class HttpCache:
+    """
+    SQLite file of GET responses keyed by method, URL and parameters, each
+    with an expiry from `CACHE_TTL` and its ETag / Last-Modified validators.
+    The least recently used responses are evicted above `max_bytes`.
+
+    Reads do not write: the access times of the hits are buffered and written
+    by batches, at the latest before the next eviction. The total size is kept
+    by triggers in the meta table, so checking the bound does not scan the
+    responses, whichever process wrote them.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 512 * 1024 ** 2, ttl: List[Tuple[str, float]] = None) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl if ttl is not None else CACHE_TTL
+
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self.cursor = self.conn.cursor()
+
+        # key -> access time of the hits not written yet
+        self._accessed: Dict[str, float] = {}
+        self._flushed_at = time.monotonic()
+
+        self.__initialize_db()
+    # End def __init__
+
+    # ---------------------------------------------------------------------------------------------
+    # Magic Methods
+    # ---------------------------------------------------------------------------------------------
+
+    def __len__(self) -> int:
+        with self._lock:
+            self.cursor.execute("SELECT COUNT(*) FROM responses")
+            return self.cursor.fetchone()[0]
+    # End def __len__
+
+    def __getstate__(self) -> dict:
+        # Worker processes open their own connection on the same file
+        return {"path": self.path, "max_bytes": self.max_bytes, "ttl": self.ttl}
+    # End def __getstate__
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(**state)
+    # End def __setstate__
+
+    # ---------------------------------------------------------------------------------------------
+    # Accessors
+    # ---------------------------------------------------------------------------------------------
+
+    def size(self) -> int:
+        """Total size in bytes of the stored bodies."""
+        with self._lock:
+            return self._total_size()
+    # End def size
+
+    def ttl_for(self, url: str) -> float:
+        for fragment, ttl in self.ttl:
+            if fragment in url:
+                return ttl
+        return DEFAULT_TTL
+    # End def ttl_for
+
+    def get(self, key: str) -> Dict[str, Any] | None:
+        """Stored response of a key, fresh or not, None if there is none."""
+        with self._lock:
+            self.cursor.execute("""
+                SELECT url, status, headers, body, expires_at, etag, last_modified
+                FROM responses WHERE key = ?
+            """, (key,))
+            row = self.cursor.fetchone()
+            if row is None:
+                return None
+            self._accessed[key] = time.time()
+            if (len(self._accessed) >= ACCESS_FLUSH_SIZE
+                    or time.monotonic() - self._flushed_at >= ACCESS_FLUSH_SECONDS):
+                self._flush_accessed()
+                self.conn.commit()
+        url, status, headers, body, expires_at, etag, last_modified = row
+        return {"url": url, "status": status, "headers": json.loads(headers), "body": body,
+                "fresh": expires_at > time.time(), "etag": etag, "last_modified": last_modified}
+    # End def get
+
+    # ---------------------------------------------------------------------------------------------
+    # Public Methods
+    # ---------------------------------------------------------------------------------------------
+
+    def put(self, key: str, response: requests.Response) -> None:
+        """Store a response with the expiry of its endpoint class, then evict above the size bound."""
+        ttl = self.ttl_for(response.url)
+        if ttl <= 0:
+            return
+        now = time.time()
+        headers = json.dumps(dict(response.headers.items()))
+        with self._lock:
+            self._accessed.pop(key, None)
+            self.cursor.execute("""
+                INSERT INTO responses
+                    (key, url, status, headers, body, size, expires_at, etag, last_modified, accessed_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET
+                    url = excluded.url, status = excluded.status, headers = excluded.headers,
+                    body = excluded.body, size = excluded.size, expires_at = excluded.expires_at,
+                    etag = excluded.etag, last_modified = excluded.last_modified, accessed_at = excluded.accessed_at
+            """, (key, response.url, response.status_code, headers, response.content, len(response.content),
+                  now + ttl, response.headers.get("ETag"), response.headers.get("Last-Modified"), now))
+            self._flush_accessed()
+            self.conn.commit()
+            self._evict()
+    # End def put
+
+    def refresh(self, key: str, url: str) -> None:
+        """Extend a stored response after the server confirmed it did not change (304)."""
+        with self._lock:
+            self._accessed.pop(key, None)
+            self.cursor.execute("""
+                UPDATE responses SET expires_at = ?, accessed_at = ? WHERE key = ?
+            """, (time.time() + self.ttl_for(url), time.time(), key))
+            self.conn.commit()
+    # End def refresh
+
+    def clear(self) -> None:
+        with self._lock:
+            self._accessed.clear()
+            self.cursor.execute("DELETE FROM responses")
+            self.conn.commit()
+    # End def clear
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush_accessed()
+            self.conn.commit()
+        self.conn.close()
+    # End def close
+
+    # ---------------------------------------------------------------------------------------------
+    # Private Methods
+    # ---------------------------------------------------------------------------------------------
+
+    def _total_size(self) -> int:
+        self.cursor.execute("SELECT value FROM meta WHERE key = 'total_size'")
+        return self.cursor.fetchone()[0]
+    # End def _total_size
+
+    def _flush_accessed(self) -> None:
+        """Write the buffered access times, without committing (caller holds the lock)."""
+        if self._accessed:
+            self.cursor.executemany("UPDATE responses SET accessed_at = ? WHERE key = ?",
+                                    [(accessed_at, key) for key, accessed_at in self._accessed.items()])
+            self._accessed.clear()
+        self._flushed_at = time.monotonic()
+    # End def _flush_accessed
+
+    def _evict(self) -> None:
+        """Drop the least recently used responses above `max_bytes` (caller holds the lock)."""
+        excess = self._total_size() - self.max_bytes
+        if excess <= 0:
+            return
+
+        # Walk the access time index only as far as needed
+        self.cursor.execute("SELECT key, size FROM responses ORDER BY accessed_at")
+        evicted = []
+        while excess > 0:
+            rows = self.cursor.fetchmany(64)
+            if not rows:
+                break
+            for key, size in rows:
+                if excess <= 0:
+                    break
+                evicted.append((key,))
+                excess -= size
+        self.cursor.executemany("DELETE FROM responses WHERE key = ?", evicted)
+        self.conn.commit()
+        logger.debug(f"Evicted {len(evicted)} cached responses")
+    # End def _evict
+
+    def __initialize_db(self) -> None:
+        self.cursor.execute("PRAGMA journal_mode=WAL")
+        self.cursor.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                status INTEGER NOT NULL,
+                headers TEXT NOT NULL,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                accessed_at REAL NOT NULL
+            );
+        """)
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses (accessed_at);")
+
+        # Running total of the body sizes, kept up to date by the triggers below
+        self.cursor.execute("""
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+        """)
+        self.cursor.execute("""
+            INSERT OR IGNORE INTO meta (key, value)
+            VALUES ('total_size', (SELECT COALESCE(SUM(size), 0) FROM responses))
+        """)
+        self.cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS responses_size_insert AFTER INSERT ON responses
+            BEGIN
+                UPDATE meta SET value = value + NEW.size WHERE key = 'total_size';
+            END;
+        """)
+        self.cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS responses_size_update AFTER UPDATE OF size ON responses
+            BEGIN
+                UPDATE meta SET value = value + NEW.size - OLD.size WHERE key = 'total_size';
+            END;
+        """)
+        self.cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS responses_size_delete AFTER DELETE ON responses
+            BEGIN
+                UPDATE meta SET value = value - OLD.size WHERE key = 'total_size';
+            END;
+        """)
+        self.conn.commit()
+    # End def __initialize_db
+# End class HttpCache
+
+# ===========================================================================
+# CachedSession Class
+# ===========================================================================
+
+class CachedSession(requests.Session):
+    """
+    `curl_cffi` session answering GET requests from an `HttpCache`. Fresh
+    responses are served without any request, stale ones are revalidated
+    with If-None-Match / If-Modified-Since when the server sent validators.
+    Served responses have `from_cache` set to True.
+
+    The cache is kept in `_http_cache`: yfinance rejects any session with a
+    `cache` attribute, taking it for a `requests_cache` session.
+    """
+
+    def __init__(self, cache: HttpCache, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self._http_cache = cache
+    # End def __init__
+
+    def request(self, method, url, params=None, headers=None, **kwargs):
+        if method.upper() != "GET" or self._http_cache.ttl_for(url) <= 0:
+            return super().request(method, url, params=params, headers=headers, **kwargs)
+
+        key = cache_key(method, url, params)
+        entry = self._http_cache.get(key)
+        if entry is not None and entry["fresh"]:
+            return _cached_response(entry)
+
+        if entry is not None:
+            validators = {}
+            if entry["etag"]:
+                validators["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                validators["If-Modified-Since"] = entry["last_modified"]
+            if validators:
+                headers = {**dict(headers or {}), **validators}
+
+        response = super().request(method, url, params=params, headers=headers, **kwargs)
+        if response.status_code == 304 and entry is not None:
+            self._http_cache.refresh(key, url)
+            return _cached_response(entry)
+        if response.status_code == 200:
+            self._http_cache.put(key, response)
+        response.from_cache = False
+        return response
+    # End def request
+# End class CachedSession
+
+# ===========================================================================
+# Functions
+# ===========================================================================
+
+def cache_key(method: str, url: str, params: Any = None) -> str:
+    """Hash of the method, the URL and the parameters (query string included), in a stable order."""
+    split = urlsplit(url)
+    query = parse_qsl(split.query, keep_blank_values=True)
+    if isinstance(params, dict):
+        query += list(params.items())
+    elif params:
+        query += list(params)
+    query = sorted((str(k), str(v)) for k, v in query if k not in IGNORED_PARAMS)
+
+    base = f"{method.upper()} {split.scheme}://{split.netloc}{split.path}"
+    return hashlib.sha1(f"{base}?{json.dumps(query)}".encode("utf-8")).hexdigest()
+# End def cache_key
+
+def _cached_response(entry: Dict[str, Any]) -> requests.Response:
+    response = requests.Response()
+    response.url = entry["url"]
+    response.status_code = entry["status"]
+    response.headers = requests.Headers(entry["headers"])
+    response.content = entry["body"]
+    response.from_cache = True
+    return response
+# End def _cached_response
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*- #
+"""
+Parser of the Yahoo Finance lookup pages
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+
+from typing import Any, Dict, List, NamedTuple
+
+
+# ===========================================================================
+# Constant and global variables
+# ===========================================================================
+
+logger = logging.getLogger(__name__)
+
+# Key of the JSON object embedded in the lookup pages
+LOOKUP_MARKER = '"lookupData":'
+
+_decoder = json.JSONDecoder()
+
+# ===========================================================================
+# Records
+# ===========================================================================
+
+class LookupRecord(NamedTuple):
+    """One symbol of a lookup page."""
+
+    symbol: str
+    short_name: str | None
+    exchange: str | None
+    type: str | None
+    industry: str | None
+
+    def to_registry(self) -> Dict[str, Any]:
+        """Fields of the ticker registry (see `TickerRegistry.upsert`)."""
+        return {"symbol": self.symbol, "short_name": self.short_name, "yahoo_exchange": self.exchange,
+                "type": self.type, "industry": self.industry}
+    # End def to_registry
+# End class LookupRecord
+
+
+class LookupPage(NamedTuple):
+    """The `lookupData` object of a page: pagination and records."""
+
+    start: int | None
+    total: int | None
+    records: List[LookupRecord]
+# End class LookupPage
+
+# ===========================================================================
+# Functions
+# ===========================================================================
+
+def parse_lookup(body: str) -> LookupPage | None:
+    """Decode the `lookupData` JSON embedded in a lookup page.
+
+    The object is located once and decoded in place with `raw_decode`, which
+    stops at its closing brace: the rest of the page is never copied nor
+    evaluated.
+
+    Args:
+        body (str): HTML of the lookup page
+
+    Raises:
+        ValueError: If the object after the marker is not valid JSON
+
+    Returns:
+        LookupPage | None: The page, None if it has no `lookupData`
+    """
+    pos = body.find(LOOKUP_MARKER)
+    if pos == -1:
+        return None
+
+    pos += len(LOOKUP_MARKER)
+    while body[pos:pos + 1].isspace():
+        pos += 1
+    data, _ = _decoder.raw_decode(body, pos)
+
+    records = [
+        LookupRecord(
+            symbol=document["symbol"],
+            short_name=document.get("shortName"),
+            exchange=document.get("exchange"),
+            type=document.get("type"),
+            industry=document.get("industryName"),
+        )
+        for document in data.get("documents") or []
+        if document.get("symbol")
+    ]
+    return LookupPage(start=data.get("start"), total=data.get("total"), records=records)
+# End def parse_lookup
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*- #
+"""
+Freshness manifest of the raw snapshots
+"""
+
+from __future__ import annotations
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+
+from typing import Any, Dict, Iterable, List
+
+
+# ===========================================================================
+# Constant and global variables
+# ===========================================================================
+
+logger = logging.getLogger(__name__)
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+# Time-to-live of each section, in seconds. `info` carries the market price
+# so it is refreshed intraday, statements only change once a year.
+DEFAULT_TTL = {
+    "info": 4 * HOUR,
+    "isin": 365 * DAY,
+    "incomestmt": 30 * DAY,
+    "balancesheet": 30 * DAY,
+    "dividends": 7 * DAY,
+    "quarterly_incomestmt": 7 * DAY,
+    "quarterly_balancesheet": 7 * DAY,
+    "price": HOUR // 4,
+}
+
+# ===========================================================================
+# RawManifest Class
+# ===========================================================================
+
+class RawManifest:
+    """
+    Record, for every ticker and section, when it was fetched and the hash
+    of its content, so that the importer only downloads what is stale.
+    """
+
+    def __init__(self, data_path: str, ttl: Dict[str, float] = None, filename: str = "manifest.db") -> None:
+        self.path = os.path.join(data_path, filename)
+        self.ttl = {**DEFAULT_TTL, **(ttl or {})}
+
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self.cursor = self.conn.cursor()
+
+        self.__initialize_db()
+    # End def __init__
+
+    # ---------------------------------------------------------------------------------------------
+    # Magic Methods
+    # ---------------------------------------------------------------------------------------------
+
+    def __len__(self) -> int:
+        with self._lock:
+            self.cursor.execute("SELECT COUNT(DISTINCT ticker) FROM manifest")
+            return self.cursor.fetchone()[0]
+    # End def __len__
+
+    # ---------------------------------------------------------------------------------------------
+    # Accessors
+    # ---------------------------------------------------------------------------------------------
+
+    def get(self, ticker: str) -> Dict[str, Dict[str, Any]]:
+        """Return the fetch time and content hash of every section stored for a ticker."""
+        with self._lock:
+            self.cursor.execute("""
+                SELECT section, fetched_at, content_hash FROM manifest
+                WHERE ticker = ?
+            """, (ticker,))
+            rows = self.cursor.fetchall()
+        return {section: {"fetched_at": fetched_at, "content_hash": content_hash}
+                for section, fetched_at, content_hash in rows}
+    # End def get
+
+    def stale_sections(self, ticker: str, sections: Iterable[str], now: float = None) -> List[str]:
+        """Return the sections of a ticker that were never fetched or whose TTL has expired."""
+        now = now or time.time()
+        entries = self.get(ticker)
+        stale = []
+        for section in sections:
+            entry = entries.get(section)
+            if entry is None or now - entry["fetched_at"] >= self.ttl.get(section, 0):
+                stale.append(section)
+        return stale
+    # End def stale_sections
+
+    # ---------------------------------------------------------------------------------------------
+    # Public Methods
+    # ---------------------------------------------------------------------------------------------
+
+    def record(self, ticker: str, parts: Dict[str, Any], fetched_at: float = None) -> None:
+        """Mark the given sections of a ticker as fetched now."""
+        fetched_at = fetched_at or time.time()
+        rows = [(ticker, section, fetched_at, self.content_hash(value)) for section, value in parts.items()]
+        with self._lock:
+            self.cursor.executemany("""
+                INSERT INTO manifest (ticker, section, fetched_at, content_hash)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(ticker, section) DO UPDATE SET
+                    fetched_at = excluded.fetched_at,
+                    content_hash = excluded.content_hash
+            """, rows)
+            self.conn.commit()
+    # End def record
+
+    def forget(self, ticker: str) -> None:
+        """Drop every entry of a ticker so that it is fully fetched again."""
+        with self._lock:
+            self.cursor.execute("DELETE FROM manifest WHERE ticker = ?", (ticker,))
+            self.conn.commit()
+    # End def forget
+
+    def close(self) -> None:
+        self.conn.close()
+    # End def close
+
+    @staticmethod
+    def content_hash(value: Any) -> str:
+        """Stable hash of a JSON-ready value."""
+        payload = json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+    # End def content_hash
+
+    # ---------------------------------------------------------------------------------------------
+    # Private Methods
+    # ---------------------------------------------------------------------------------------------
+
+    def __initialize_db(self) -> None:
+        self.cursor.execute("""
+            CREATE TABLE IF NOT EXISTS manifest (
+                ticker TEXT NOT NULL,
+                section TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                content_hash TEXT,
+                PRIMARY KEY (ticker, section)
+            );
+        """)
+        self.conn.commit()
+    # End def __initialize_db
+# End class RawManifest
@@ -0,0 +1,277 @@
+# -*- coding: utf-8 -*- #
+"""
+Readers and writers of the raw ticker snapshots
+"""
+
+from __future__ import annotations
+
+import os
+import gzip
+import json
+import logging
+
+from typing import Any, Dict, Iterator, List
+
+try:
+    import msgpack
+except ImportError:  # Optional dependency, only needed by the msgpack formats
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # Optional dependency, only needed by the zstd format
+    zstandard = None
+
+
+# ===========================================================================
+# Constant and global variables
+# ===========================================================================
+
+logger = logging.getLogger(__name__)
+
+# Files of the raw directory that are not ticker snapshots
+RESERVED_NAMES = ("yh_tickers",)
+
+# Snapshot keys holding a statement: line item -> date -> value
+STATEMENT_KEYS = ("incomestmt", "balancesheet", "quarterly_incomestmt", "quarterly_balancesheet")
+
+# ===========================================================================
+# RawStore Classes
+# ===========================================================================
+
+class RawStore:
+    """
+    One snapshot file per ticker in `data_path`. Subclasses only define the
+    file extension and how a snapshot is turned into bytes and back.
+    """
+
+    extension = ""
+
+    def __init__(self, data_path: str) -> None:
+        self.data_path = data_path
+        os.makedirs(self.data_path, exist_ok=True)
+    # End def __init__
+
+    # ---------------------------------------------------------------------------------------------
+    # Magic Methods
+    # ---------------------------------------------------------------------------------------------
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} {self.data_path}>"
+    # End def __repr__
+
+    # ---------------------------------------------------------------------------------------------
+    # Accessors
+    # ---------------------------------------------------------------------------------------------
+
+    def path(self, ticker: str) -> str:
+        return os.path.join(self.data_path, f"{ticker}{self.extension}")
+    # End def path
+
+    def exists(self, ticker: str) -> bool:
+        return os.path.exists(self.path(ticker))
+    # End def exists
+
+    def tickers(self) -> List[str]:
+        """Tickers having a snapshot in this format."""
+        tickers = []
+        for filename in os.listdir(self.data_path):
+            if not filename.endswith(self.extension):
+                continue
+            ticker = filename[:-len(self.extension)]
+            if ticker not in RESERVED_NAMES:
+                tickers.append(ticker)
+        return sorted(tickers)
+    # End def tickers
+
+    # ---------------------------------------------------------------------------------------------
+    # Public Methods
+    # ---------------------------------------------------------------------------------------------
+
+    def read(self, ticker: str) -> dict | None:
+        """Load the snapshot of a ticker, None if there is none."""
+        path = self.path(ticker)
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            return self.decode(f.read())
+    # End def read
+
+    def write(self, ticker: str, data: dict) -> int:
+        """Store the snapshot of a ticker. Returns the number of bytes written."""
+        payload = self.encode(data)
+        tmp_path = f"{self.path(ticker)}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(payload)
+        os.replace(tmp_path, self.path(ticker))
+        return len(payload)
+    # End def write
+
+    def iter_snapshots(self) -> Iterator[tuple[str, dict]]:
+        """Yield every (ticker, snapshot) of the store."""
+        for ticker in self.tickers():
+            yield ticker, self.read(ticker)
+    # End def iter_snapshots
+
+    def encode(self, data: dict) -> bytes:
+        raise NotImplementedError
+    # End def encode
+
+    def decode(self, payload: bytes) -> dict:
+        raise NotImplementedError
+    # End def decode
+# End class RawStore
+
+
+class JsonRawStore(RawStore):
+    """Plain, compact JSON. Readable by hand and by the previous pipeline."""
+
+    extension = ".json"
+
+    def encode(self, data: dict) -> bytes:
+        return json.dumps(data, separators=(",", ":")).encode("utf-8")
+    # End def encode
+
+    def decode(self, payload: bytes) -> dict:
+        return json.loads(payload)
+    # End def decode
+# End class JsonRawStore
+
+
+class GzipJsonRawStore(RawStore):
+    """Gzip-compressed JSON with statements stored column-wise."""
+
+    extension = ".json.gz"
+
+    def encode(self, data: dict) -> bytes:
+        payload = json.dumps(pack_statements(data), separators=(",", ":")).encode("utf-8")
+        return gzip.compress(payload, compresslevel=6, mtime=0)
+    # End def encode
+
+    def decode(self, payload: bytes) -> dict:
+        return unpack_statements(json.loads(gzip.decompress(payload)))
+    # End def decode
+# End class GzipJsonRawStore
+
+
+class MsgpackRawStore(RawStore):
+    """Gzip-compressed msgpack with statements stored column-wise. Needs `msgpack`."""
+
+    extension = ".msgpack.gz"
+
+    def __init__(self, data_path: str) -> None:
+        if msgpack is None:
+            raise ImportError(f"The '{self.extension}' raw format requires the 'msgpack' package.")
+        super().__init__(data_path)
+    # End def __init__
+
+    def encode(self, data: dict) -> bytes:
+        return self._compress(msgpack.packb(pack_statements(data), use_bin_type=True))
+    # End def encode
+
+    def decode(self, payload: bytes) -> dict:
+        return unpack_statements(msgpack.unpackb(self._decompress(payload), raw=False, strict_map_key=False))
+    # End def decode
+
+    def _compress(self, payload: bytes) -> bytes:
+        return gzip.compress(payload, compresslevel=6, mtime=0)
+    # End def _compress
+
+    def _decompress(self, payload: bytes) -> bytes:
+        return gzip.decompress(payload)
+    # End def _decompress
+# End class MsgpackRawStore
+
+
+class ZstdMsgpackRawStore(MsgpackRawStore):
+    """Zstandard-compressed msgpack. Needs `msgpack` and `zstandard`."""
+
+    extension = ".msgpack.zst"
+
+    def __init__(self, data_path: str) -> None:
+        if zstandard is None:
+            raise ImportError(f"The '{self.extension}' raw format requires the 'zstandard' package.")
+        super().__init__(data_path)
+    # End def __init__
+
+    def _compress(self, payload: bytes) -> bytes:
+        return zstandard.ZstdCompressor(level=9).compress(payload)
+    # End def _compress
+
+    def _decompress(self, payload: bytes) -> bytes:
+        return zstandard.ZstdDecompressor().decompress(payload)
+    # End def _decompress
+# End class ZstdMsgpackRawStore
+
+
+RAW_FORMATS = {
+    "json": JsonRawStore,
+    "json.gz": GzipJsonRawStore,
+    "msgpack.gz": MsgpackRawStore,
+    "msgpack.zst": ZstdMsgpackRawStore,
+}
+
+# ===========================================================================
+# Functions
+# ===========================================================================
+
+def get_raw_store(raw_format: str = "json", data_path: str = "data/raw/") -> RawStore:
+    """Instantiate the store of a raw format (see `RAW_FORMATS`)."""
+    try:
+        return RAW_FORMATS[raw_format](data_path)
+    except KeyError:
+        raise ValueError(f"Unknown raw format '{raw_format}', expected one of {list(RAW_FORMATS)}")
+# End def get_raw_store
+
+def read_snapshot_file(path: str) -> tuple[str, dict]:
+    """Load a snapshot file of any raw format, told apart by its extension.
+
+    Raises:
+        ValueError: If the extension is not one of a raw format
+
+    Returns:
+        tuple[str, dict]: Ticker (the file name without extension) and snapshot
+    """
+    filename = os.path.basename(path)
+    # Longest extensions first, so that `.json.gz` is not taken for `.json`
+    for store_class in sorted(RAW_FORMATS.values(), key=lambda cls: -len(cls.extension)):
+        if filename.endswith(store_class.extension):
+            store = store_class(os.path.dirname(path) or ".")
+            with open(path, "rb") as f:
+                return filename[:-len(store_class.extension)], store.decode(f.read())
+    raise ValueError(f"Not a raw snapshot file: {path}")
+# End def read_snapshot_file
+
+def pack_statements(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Store each statement as shared dates plus one value list per line item.
+
+    {"Net Income": {"2023-12-31": 1.0, "2022-12-31": 2.0}}
+    becomes {"dates": ["2022-12-31", "2023-12-31"], "items": {"Net Income": [2.0, 1.0]}}.
+    Missing values are stored as None.
+    """
+    packed = dict(data)
+    for key in STATEMENT_KEYS:
+        statement = data.get(key)
+        if not isinstance(statement, dict):
+            continue
+        dates = sorted({date for values in statement.values() for date in values})
+        packed[key] = {
+            "dates": dates,
+            "items": {item: [values.get(date) for date in dates] for item, values in statement.items()},
+        }
+    return packed
+# End def pack_statements
+
+def unpack_statements(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Inverse of `pack_statements`."""
+    for key in STATEMENT_KEYS:
+        statement = data.get(key)
+        if not isinstance(statement, dict) or "dates" not in statement:
+            continue
+        dates = statement["dates"]
+        data[key] = {
+            item: {date: value for date, value in zip(dates, values) if value is not None}
+            for item, values in statement["items"].items()
+        }
+    return data
+# End def unpack_statements
@@ -0,0 +1,388 @@
+# -*- coding: utf-8 -*- #
+"""
+Rate limiting, retries and failure bookkeeping for the downloads
+"""
+
+from __future__ import annotations
+
+import time
+import sqlite3
+import random
+import logging
+import threading
+
+from typing import Any, Callable, Dict, List, Tuple, Type
+
+
+# ===========================================================================
+# Constant and global variables
+# ===========================================================================
+
+logger = logging.getLogger(__name__)
+
+# Seconds between two checks of a circuit while its probe call is in flight
+PROBE_POLL_INTERVAL = 0.1
+
+# ===========================================================================
+# Exceptions
+# ===========================================================================
+
+class CircuitOpenError(Exception):
+    """Raised when a call is refused because the circuit of its host is open."""
+# End class CircuitOpenError
+
+# ===========================================================================
+# TokenBucket Class
+# ===========================================================================
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. `rate` tokens are added every second up to
+    `capacity`; each call takes one token and waits when the bucket is empty.
+    """
+
+    def __init__(self, rate: float = 5.0, capacity: float = None) -> None:
+        if rate <= 0:
+            raise ValueError("The rate must be positive.")
+        self.rate = rate
+        self.capacity = capacity or rate
+
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+    # End def __init__
+
+    # ---------------------------------------------------------------------------------------------
+    # Public Methods
+    # ---------------------------------------------------------------------------------------------
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Block until `tokens` are available. Returns the time spent waiting."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+    # End def acquire
+
+    # ---------------------------------------------------------------------------------------------
+    # Private Methods
+    # ---------------------------------------------------------------------------------------------
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+    # End def _refill
+# End class TokenBucket
+
+# ===========================================================================
+# CircuitBreaker Class
+# ===========================================================================
+
+class CircuitBreaker:
+    """
+    Per-host circuit breaker. After `failure_threshold` consecutive failures
+    on a host, calls to it are refused for `reset_timeout` seconds. Then a
+    single probe call is let through: its success closes the circuit, its
+    failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 60.0) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self._failures: Dict[str, int] = {}
+        self._opened_at: Dict[str, float] = {}
+        self._probing: set = set()
+        self._lock = threading.Lock()
+    # End def __init__
+
+    # ---------------------------------------------------------------------------------------------
+    # Accessors
+    # ---------------------------------------------------------------------------------------------
+
+    def state(self, host: str) -> str:
+        """Return `closed`, `open` or `half-open`."""
+        with self._lock:
+            if host not in self._opened_at:
+                return "closed"
+            if time.monotonic() - self._opened_at[host] < self.reset_timeout:
+                return "open"
+            return "half-open"
+    # End def state
+
+    def retry_after(self, host: str) -> float:
+        """Seconds before the open circuit of a host lets a probe through, 0 once it may."""
+        with self._lock:
+            opened_at = self._opened_at.get(host)
+            if opened_at is None:
+                return 0.0
+            return max(0.0, self.reset_timeout - (time.monotonic() - opened_at))
+    # End def retry_after
+
+    # ---------------------------------------------------------------------------------------------
+    # Public Methods
+    # ---------------------------------------------------------------------------------------------
+
+    def before_call(self, host: str) -> None:
+        """Raise `CircuitOpenError` if the host must not be called now."""
+        with self._lock:
+            opened_at = self._opened_at.get(host)
+            if opened_at is None:
+                return
+            if time.monotonic() - opened_at < self.reset_timeout or host in self._probing:
+                raise CircuitOpenError(f"Circuit open for {host}")
+            self._probing.add(host)
+    # End def before_call
+
+    def record_success(self, host: str) -> None:
+        with self._lock:
+            self._failures.pop(host, None)
+            self._opened_at.pop(host, None)
+            self._probing.discard(host)
+    # End def record_success
+
+    def record_failure(self, host: str) -> None:
+        with self._lock:
+            failures = self._failures.get(host, 0) + 1
+            self._failures[host] = failures
+            if host in self._probing or failures >= self.failure_threshold:
+                if host not in self._opened_at:
+                    logger.warning(f"[!] Opening circuit for {host} after {failures} failures")
+                self._opened_at[host] = time.monotonic()
+            self._probing.discard(host)
+    # End def record_failure
+# End class CircuitBreaker
+
+# ===========================================================================
+# RetryPolicy Class
+# ===========================================================================
+
+class RetryPolicy:
+    """
+    Retries with jittered exponential backoff ("full jitter").
+
+    With a circuit breaker, a call waits while the circuit of its host is
+    open, and counts once toward it: as a failure when its last error is a
+    failure of the host (`is_host_failure`), as a success otherwise, since
+    the host did answer, e.g. that a ticker does not exist.
+    """
+
+    def __init__(self, max_attempts: int = 4, base_delay: float = 0.5, max_delay: float = 30.0,
+                 retry_on: Tuple[Type[BaseException], ...] = (Exception,), wait_open: bool = True,
+                 host_failure: Callable[[BaseException], bool] = None) -> None:
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_on = retry_on
+        self.wait_open = wait_open
+        self.host_failure = host_failure or is_host_failure
+    # End def __init__
+
+    # ---------------------------------------------------------------------------------------------
+    # Public Methods
+    # ---------------------------------------------------------------------------------------------
+
+    def delay(self, attempt: int) -> float:
+        """Random delay before retry number `attempt` (starting at 0)."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+    # End def delay
+
+    def call(self, func: Callable[[], Any], host: str = None, rate_limiter: TokenBucket = None,
+             circuit_breaker: CircuitBreaker = None, on_retry: Callable[[int, Exception], None] = None) -> Any:
+        """Call `func` until it succeeds or the attempts are exhausted.
+
+        Args:
+            func (Callable): Function without arguments to call
+            host (str, optional): Host reached by `func`, used by the circuit breaker
+            rate_limiter (TokenBucket, optional): Bucket to take a token from before each attempt
+            circuit_breaker (CircuitBreaker, optional): Breaker consulted before the call and
+                updated once after it
+            on_retry (Callable, optional): Called with the attempt number and the error before each retry
+
+        Raises:
+            CircuitOpenError: If the circuit of the host is open and `wait_open` is False
+            Exception: The last error once every attempt failed
+        """
+        if circuit_breaker is None:
+            return self._attempts(func, host, rate_limiter, on_retry)
+
+        self._wait_for_circuit(circuit_breaker, host)
+        try:
+            result = self._attempts(func, host, rate_limiter, on_retry)
+        except Exception as e:
+            if self.host_failure(e):
+                circuit_breaker.record_failure(host)
+            else:
+                circuit_breaker.record_success(host)
+            raise
+        circuit_breaker.record_success(host)
+        return result
+    # End def call
+
+    # ---------------------------------------------------------------------------------------------
+    # Private Methods
+    # ---------------------------------------------------------------------------------------------
+
+    def _attempts(self, func: Callable[[], Any], host: str, rate_limiter: TokenBucket | None,
+                  on_retry: Callable[[int, Exception], None] | None) -> Any:
+        for attempt in range(self.max_attempts):
+            if rate_limiter is not None:
+                rate_limiter.acquire()
+
+            try:
+                return func()
+            except self.retry_on as e:
+                if attempt + 1 >= self.max_attempts:
+                    raise
+                if on_retry is not None:
+                    on_retry(attempt + 1, e)
+                delay = self.delay(attempt)
+                logger.debug(f"Attempt {attempt + 1} on {host} failed ({e}), retrying in {delay:.2f}s")
+                time.sleep(delay)
+    # End def _attempts
+
+    def _wait_for_circuit(self, circuit_breaker: CircuitBreaker, host: str) -> None:
+        """Return once the circuit of the host lets the call through, waiting while it is open."""
+        while True:
+            try:
+                circuit_breaker.before_call(host)
+                return
+            except CircuitOpenError:
+                if not self.wait_open:
+                    raise
+            delay = max(circuit_breaker.retry_after(host), PROBE_POLL_INTERVAL)
+            logger.debug(f"Circuit open for {host}, waiting {delay:.2f}s")
+            time.sleep(delay)
+    # End def _wait_for_circuit
+# End class RetryPolicy
+
+# ===========================================================================
+# DeadLetterQueue Class
+# ===========================================================================
+
+class DeadLetterQueue:
+    """
+    Persisted list of the tickers whose download still failed after every
+    retry. Backed by SQLite so that several importer processes can share it.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self.cursor = self.conn.cursor()
+
+        self.__initialize_db()
+    # End def __init__
+
+    # ---------------------------------------------------------------------------------------------
+    # Magic Methods
+    # ---------------------------------------------------------------------------------------------
+
+    def __len__(self) -> int:
+        with self._lock:
+            self.cursor.execute("SELECT COUNT(*) FROM dead_letters")
+            return self.cursor.fetchone()[0]
+    # End def __len__
+
+    def __contains__(self, ticker: str) -> bool:
+        return self.get(ticker) is not None
+    # End def __contains__
+
+    # ---------------------------------------------------------------------------------------------
+    # Accessors
+    # ---------------------------------------------------------------------------------------------
+
+    def tickers(self) -> List[str]:
+        with self._lock:
+            self.cursor.execute("SELECT ticker FROM dead_letters ORDER BY failed_at")
+            return [row[0] for row in self.cursor.fetchall()]
+    # End def tickers
+
+    def get(self, ticker: str) -> Dict[str, Any] | None:
+        with self._lock:
+            self.cursor.execute("""
+                SELECT failures, error, failed_at FROM dead_letters WHERE ticker = ?
+            """, (ticker,))
+            row = self.cursor.fetchone()
+        if row is None:
+            return None
+        return {"failures": row[0], "error": row[1], "failed_at": row[2]}
+    # End def get
+
+    # ---------------------------------------------------------------------------------------------
+    # Public Methods
+    # ---------------------------------------------------------------------------------------------
+
+    def add(self, ticker: str, error: Exception | str) -> None:
+        """Record a failed ticker, counting how many runs it failed in."""
+        message = f"{type(error).__name__}: {error}" if isinstance(error, Exception) else str(error)
+        with self._lock:
+            self.cursor.execute("""
+                INSERT INTO dead_letters (ticker, failures, error, failed_at)
+                VALUES (?, 1, ?, ?)
+                ON CONFLICT(ticker) DO UPDATE SET
+                    failures = failures + 1,
+                    error = excluded.error,
+                    failed_at = excluded.failed_at
+            """, (ticker, message, time.time()))
+            self.conn.commit()
+    # End def add
+
+    def discard(self, ticker: str) -> None:
+        """Remove a ticker once it was downloaded successfully."""
+        if ticker not in self:
+            return
+        with self._lock:
+            self.cursor.execute("DELETE FROM dead_letters WHERE ticker = ?", (ticker,))
+            self.conn.commit()
+    # End def discard
+
+    def close(self) -> None:
+        self.conn.close()
+    # End def close
+
+    # ---------------------------------------------------------------------------------------------
+    # Private Methods
+    # ---------------------------------------------------------------------------------------------
+
+    def __initialize_db(self) -> None:
+        self.cursor.execute("""
+            CREATE TABLE IF NOT EXISTS dead_letters (
+                ticker TEXT PRIMARY KEY,
+                failures INTEGER NOT NULL,
+                error TEXT,
+                failed_at REAL NOT NULL
+            );
+        """)
+        self.conn.commit()
+    # End def __initialize_db
+# End class DeadLetterQueue
+
+# ===========================================================================
+# Functions
+# ===========================================================================
+
+def is_host_failure(error: BaseException) -> bool:
+    """Whether an error is a failure of the host rather than of the request.
+
+    Network errors (`OSError`, which the requests and curl_cffi errors derive
+    from), 429 throttling and 5xx responses are; an HTTP 4xx or an error of
+    the data itself, e.g. an unknown ticker or a missing section, is not.
+    """
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    if isinstance(status, int):
+        return status == 429 or status >= 500
+    if isinstance(error, OSError):
+        return True
+    return "Too Many Requests" in str(error) or "RateLimit" in type(error).__name__
+# End def is_host_failure
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*- #
+"""
+Long-lived HTTP session shared by the importer workers
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+
+from curl_cffi import requests
+
+from financial_pipeline.importer.http_cache import CachedSession, HttpCache
+
+
+# ===========================================================================
+# Constant and global variables
+# ===========================================================================
+
+logger = logging.getLogger(__name__)
+
+# ===========================================================================
+# SharedSession Class
+# ===========================================================================
+
+class SharedSession:
+    """
+    One `curl_cffi` session shared by every worker thread of the process.
+
+    yfinance keeps its session, cookie and crumb in a process-wide singleton
+    (`YfData`): each `yf.Ticker(..., session=s)` installs `s` for every
+    thread, so per-worker sessions would not isolate anything and would only
+    race on the cookie and crumb. A single session keeps them consistent and
+    still reuses its TLS connections across tickers. The number of calls in
+    flight is bounded by the workers of the importer, not by the session.
+    With a `cache`, the session answers GET requests from it (see
+    `CachedSession`).
+    """
+
+    def __init__(self, impersonate: str = "chrome", cache: HttpCache = None) -> None:
+        self.impersonate = impersonate
+        self.cache = cache
+
+        self._session: requests.Session | None = None
+        self._lock = threading.Lock()
+    # End def __init__
+
+    # ---------------------------------------------------------------------------------------------
+    # Magic Methods
+    # ---------------------------------------------------------------------------------------------
+
+    def __len__(self) -> int:
+        """Number of open sessions, 0 or 1."""
+        return int(self._session is not None)
+    # End def __len__
+
+    # ---------------------------------------------------------------------------------------------
+    # Public Methods
+    # ---------------------------------------------------------------------------------------------
+
+    def get(self) -> requests.Session:
+        """Return the session, opening it on first use."""
+        with self._lock:
+            if self._session is None:
+                logger.debug("Opening the shared session")
+                if self.cache is not None:
+                    self._session = CachedSession(self.cache, impersonate=self.impersonate)
+                else:
+                    self._session = requests.Session(impersonate=self.impersonate)
+            return self._session
+    # End def get
+
+    def close(self) -> None:
+        """Close the session, the next `get` opens a new one."""
+        with self._lock:
+            if self._session is not None:
+                try:
+                    self._session.close()
+                except Exception as e:
+                    logger.debug(f"Error closing session: {e}")
+                self._session = None
+    # End def close
+# End class SharedSession
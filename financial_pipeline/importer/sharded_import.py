@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*- #
+"""
+Resumable import of large ticker universes over a pool of processes
+"""
+
+from __future__ import annotations
+
+import time
+import queue
+import sqlite3
+import logging
+import multiprocessing
+
+from tqdm import tqdm
+from typing import Any, Dict, List
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+
+# ===========================================================================
+# Constant and global variables
+# ===========================================================================
+
+logger = logging.getLogger(__name__)
+
+# ===========================================================================
+# ImportCheckpoint Class
+# ===========================================================================
+
+class ImportCheckpoint:
+    """
+    SQLite file recording the status of every ticker of a sharded import
+    (`pending`, `done` or `failed`), shared by all the worker processes.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.conn = sqlite3.connect(self.path, timeout=60)
+        self.cursor = self.conn.cursor()
+
+        self.__initialize_db()
+    # End def __init__
+
+    # ---------------------------------------------------------------------------------------------
+    # Accessors
+    # ---------------------------------------------------------------------------------------------
+
+    def remaining(self, tickers: List[str] = None) -> List[str]:
+        """Tickers not imported yet, in planning order, restricted to `tickers` when given.
+
+        The checkpoint keeps the tickers planned by earlier runs, which are
+        not part of the current import when its universe changed.
+        """
+        self.cursor.execute("SELECT ticker FROM progress WHERE status != 'done' ORDER BY rowid")
+        remaining = [row[0] for row in self.cursor.fetchall()]
+        if tickers is None:
+            return remaining
+        planned = set(tickers)
+        return [ticker for ticker in remaining if ticker in planned]
+    # End def remaining
+
+    def counts(self, tickers: List[str] = None) -> Dict[str, int]:
+        """Number of tickers per status, restricted to `tickers` when given."""
+        self.cursor.execute("SELECT ticker, status FROM progress")
+        planned = set(tickers) if tickers is not None else None
+        counts: Dict[str, int] = {}
+        for ticker, status in self.cursor.fetchall():
+            if planned is None or ticker in planned:
+                counts[status] = counts.get(status, 0) + 1
+        return counts
+    # End def counts
+
+    # ---------------------------------------------------------------------------------------------
+    # Public Methods
+    # ---------------------------------------------------------------------------------------------
+
+    def plan(self, tickers: List[str]) -> None:
+        """Add the tickers not known yet, keeping the status of the others."""
+        self.cursor.executemany("""
+            INSERT OR IGNORE INTO progress (ticker, status, updated_at) VALUES (?, 'pending', ?)
+        """, [(ticker, time.time()) for ticker in tickers])
+        self.conn.commit()
+    # End def plan
+
+    def mark(self, ticker: str, status: str) -> None:
+        self.cursor.execute("""
+            UPDATE progress SET status = ?, updated_at = ? WHERE ticker = ?
+        """, (status, time.time(), ticker))
+        self.conn.commit()
+    # End def mark
+
+    def close(self) -> None:
+        self.conn.close()
+    # End def close
+
+    # ---------------------------------------------------------------------------------------------
+    # Private Methods
+    # ---------------------------------------------------------------------------------------------
+
+    def __initialize_db(self) -> None:
+        self.cursor.execute("PRAGMA journal_mode=WAL")
+        self.cursor.execute("""
+            CREATE TABLE IF NOT EXISTS progress (
+                ticker TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                updated_at REAL
+            );
+        """)
+        self.conn.commit()
+    # End def __initialize_db
+# End class ImportCheckpoint
+
+# ===========================================================================
+# Functions
+# ===========================================================================
+
+def sharded_import(tickers: List[str], config: Dict[str, Any], state_path: str,
+                   processes: int = 4, concurrency: int = 8, force: bool = False) -> Dict[str, int]:
+    """Split the tickers across a process pool, each process running `concurrency` fetchers.
+
+    Progress is checkpointed in `state_path` after every ticker, so running
+    the same import again resumes with the tickers not done yet.
+
+    Args:
+        tickers (List[str]): Ticker universe
+        config (Dict[str, Any]): Keyword arguments building the importer of each process
+        state_path (str): SQLite checkpoint file
+        processes (int, optional): Number of worker processes
+        concurrency (int, optional): Number of fetcher threads per process
+        force (bool, optional): Re-download every section, even those still fresh
+
+    Returns:
+        Dict[str, int]: Number of tickers per status at the end of the run
+    """
+    checkpoint = ImportCheckpoint(state_path)
+    checkpoint.plan(tickers)
+    remaining = checkpoint.remaining(tickers)
+    logger.info(f"[+] {len(tickers) - len(remaining)} tickers already imported, {len(remaining)} to go")
+
+    # The rate limit of the importer is shared between the processes
+    config = dict(config)
+    config["rate_limit"] = config.get("rate_limit", 5.0) / processes
+
+    shards = [remaining[i::processes] for i in range(processes)]
+    shards = [shard for shard in shards if shard]
+
+    with multiprocessing.Manager() as manager:
+        progress = manager.Queue()
+        bars = [tqdm(total=len(shard), desc=f"shard {i}", position=i, unit="ticker")
+                for i, shard in enumerate(shards)]
+        failures = [0] * len(shards)
+
+        with ProcessPoolExecutor(max_workers=len(shards) or 1) as executor:
+            futures = [executor.submit(_run_shard, i, shard, config, state_path, concurrency, force, progress)
+                       for i, shard in enumerate(shards)]
+
+            while not all(future.done() for future in futures):
+                _drain(progress, bars, failures, timeout=0.5)
+            _drain(progress, bars, failures)
+
+            for future in futures:
+                future.result()
+
+        for bar in bars:
+            bar.close()
+
+    counts = checkpoint.counts(tickers)
+    checkpoint.close()
+    logger.info(f"[+] Sharded import finished: {counts}")
+    return counts
+# End def sharded_import
+
+def _drain(progress, bars: List[tqdm], failures: List[int], timeout: float = 0.0) -> None:
+    """Apply the progress messages of the shards to their bars."""
+    try:
+        message = progress.get(timeout=timeout)
+        while True:
+            shard, failed = message
+            if failed:
+                failures[shard] += 1
+                bars[shard].set_postfix(failed=failures[shard], refresh=False)
+            bars[shard].update(1)
+            message = progress.get_nowait()
+    except queue.Empty:
+        return
+# End def _drain
+
+def _run_shard(shard: int, tickers: List[str], config: Dict[str, Any], state_path: str,
+               concurrency: int, force: bool, progress) -> None:
+    """Body of one worker process: import a shard with a thread pool and checkpoint each ticker."""
+    from financial_pipeline.importer.financial_data_importer import FinancialDataImporter
+
+    importer = FinancialDataImporter(**config)
+    checkpoint = ImportCheckpoint(state_path)
+
+    def fetch(ticker: str) -> tuple[str, bool]:
+        return ticker, importer._fetch_ticker_data(ticker, force=force)
+    # End def fetch
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        # Results come back on this thread, which owns the checkpoint connection
+        for ticker, ok in executor.map(fetch, tickers):
+            checkpoint.mark(ticker, "done" if ok else "failed")
+            progress.put((shard, not ok))
+
+    importer._finish_run(report_suffix=f".shard{shard}")
+    checkpoint.close()
+# End def _run_shard
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*- #
+"""
+Columnar store of the raw statements of every ticker
+"""
+
+from __future__ import annotations
+
+import os
+import logging
+import threading
+import pandas as pd
+
+from datetime import date
+from typing import Any, Dict, Iterable, List
+
+from financial_pipeline.importer.tickers import exchange_of
+
+try:
+    import pyarrow
+except ImportError:  # Optional dependency, only needed by the statement store
+    pyarrow = None
+
+
+# ===========================================================================
+# Constant and global variables
+# ===========================================================================
+
+logger = logging.getLogger(__name__)
+
+# Snapshot sections appended to the store
+STATEMENT_SECTIONS = ("incomestmt", "balancesheet", "dividends", "quarterly_incomestmt", "quarterly_balancesheet")
+
+COLUMNS = ["ticker", "statement", "line_item", "period", "value"]
+PARTITIONS = ["fetch_date", "exchange"]
+
+# ===========================================================================
+# StatementStore Class
+# ===========================================================================
+
+class StatementStore:
+    """
+    Parquet dataset holding one row per (ticker, statement, line item, period),
+    partitioned by fetch date and exchange:
+
+        <root>/fetch_date=2024-05-01/exchange=PA/<part>.parquet
+
+    Rows are buffered by `append` and written as new part files by `flush`,
+    so concurrent importer workers never rewrite each other's files. Readers
+    scan a single line item for the whole universe with a column filter.
+    """
+
+    def __init__(self, root: str = "data/raw/statements", flush_every: int = 100_000) -> None:
+        if pyarrow is None:
+            raise ImportError("The statement store requires the 'pyarrow' package.")
+        self.root = root
+        self.flush_every = flush_every
+        os.makedirs(self.root, exist_ok=True)
+
+        self._buffer: List[tuple] = []
+        self._lock = threading.Lock()
+    # End def __init__
+
+    # ---------------------------------------------------------------------------------------------
+    # Magic Methods
+    # ---------------------------------------------------------------------------------------------
+
+    def __repr__(self) -> str:
+        return f"<StatementStore {self.root}>"
+    # End def __repr__
+
+    def __getstate__(self) -> dict:
+        # Each worker process gets an empty buffer of its own
+        return {"root": self.root, "flush_every": self.flush_every}
+    # End def __getstate__
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._buffer = []
+        self._lock = threading.Lock()
+    # End def __setstate__
+
+    # ---------------------------------------------------------------------------------------------
+    # Accessors
+    # ---------------------------------------------------------------------------------------------
+
+    def read(self, line_items: Iterable[str] = None, statements: Iterable[str] = None,
+             tickers: Iterable[str] = None, latest: bool = True) -> pd.DataFrame:
+        """Scan the dataset, only loading the rows matching the filters.
+
+        Args:
+            line_items (Iterable[str], optional): Line items to keep
+            statements (Iterable[str], optional): Statements to keep (incomestmt, balancesheet, dividends)
+            tickers (Iterable[str], optional): Tickers to keep
+            latest (bool, optional): Keep only the most recent fetch of each value
+
+        Returns:
+            pd.DataFrame: Long frame with the `COLUMNS` and `PARTITIONS` columns
+        """
+        filters = []
+        for column, values in (("line_item", line_items), ("statement", statements), ("ticker", tickers)):
+            if values is not None:
+                filters.append((column, "in", list(values)))
+
+        if not self._has_data():
+            return pd.DataFrame(columns=COLUMNS + PARTITIONS)
+
+        frame = pd.read_parquet(self.root, engine="pyarrow", filters=filters or None)
+        for column in PARTITIONS:
+            frame[column] = frame[column].astype(str)
+
+        if latest and not frame.empty:
+            frame = (frame.sort_values("fetch_date")
+                          .drop_duplicates(["ticker", "statement", "line_item", "period"], keep="last"))
+        return frame.reset_index(drop=True)
+    # End def read
+
+    def read_line_item(self, line_item: str, statement: str = None) -> pd.DataFrame:
+        """Values of one line item for every ticker, as a ticker x period frame."""
+        frame = self.read(line_items=[line_item], statements=[statement] if statement else None)
+        return frame.pivot_table(index="ticker", columns="period", values="value", aggfunc="last")
+    # End def read_line_item
+
+    # ---------------------------------------------------------------------------------------------
+    # Public Methods
+    # ---------------------------------------------------------------------------------------------
+
+    def append(self, ticker: str, parts: Dict[str, Any], exchange: str = None, fetch_date: str = None) -> int:
+        """Buffer the statements of a ticker, as fetched by the importer.
+
+        Args:
+            ticker (str): Ticker symbol
+            parts (Dict[str, Any]): Snapshot sections, statements are `line item -> date -> value`
+                and dividends `date -> value`
+            exchange (str, optional): Exchange partition, the ticker suffix by default
+            fetch_date (str, optional): Fetch date partition, today by default
+
+        Returns:
+            int: Number of rows buffered
+        """
+        exchange = exchange or exchange_of(ticker)
+        fetch_date = fetch_date or date.today().isoformat()
+
+        rows = []
+        for statement in STATEMENT_SECTIONS:
+            values = parts.get(statement)
+            if not values:
+                continue
+            if statement == "dividends":
+                values = {"Dividends": values}
+            for line_item, by_period in values.items():
+                for period, value in by_period.items():
+                    rows.append((ticker, statement, line_item, period, value, fetch_date, exchange))
+
+        with self._lock:
+            self._buffer.extend(rows)
+            full = len(self._buffer) >= self.flush_every
+        if full:
+            self.flush()
+        return len(rows)
+    # End def append
+
+    def flush(self) -> int:
+        """Write the buffered rows as new part files. Returns the number of rows written."""
+        with self._lock:
+            rows, self._buffer = self._buffer, []
+            if not rows:
+                return 0
+
+            frame = pd.DataFrame(rows, columns=COLUMNS + PARTITIONS)
+            frame["value"] = pd.to_numeric(frame["value"], errors="coerce").astype("float64")
+            frame.to_parquet(self.root, engine="pyarrow", partition_cols=PARTITIONS, index=False)
+        logger.debug(f"Flushed {len(rows)} statement rows to {self.root}")
+        return len(rows)
+    # End def flush
+
+    # ---------------------------------------------------------------------------------------------
+    # Private Methods
+    # ---------------------------------------------------------------------------------------------
+
+    def _has_data(self) -> bool:
+        return any(name.startswith("fetch_date=") for name in os.listdir(self.root))
+    # End def _has_data
+# End class StatementStore
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*- #
+"""
+Telemetry of the importer runs
+"""
+
+from __future__ import annotations
+
+import os
+import json
+import math
+import time
+import logging
+import threading
+
+from typing import Any, Dict, List
+from collections import Counter, defaultdict
+
+from financial_pipeline.importer.tickers import exchange_of
+
+
+# ===========================================================================
+# Constant and global variables
+# ===========================================================================
+
+logger = logging.getLogger(__name__)
+
+PERCENTILES = (50, 95, 99)
+
+# Number of slowest tickers listed in the report
+SLOWEST = 10
+
+# ===========================================================================
+# ImportTelemetry Class
+# ===========================================================================
+
+class ImportTelemetry:
+    """
+    One record per ticker fetch: wall time of each section call, retries,
+    bytes written and final status (`ok`, `fresh` when nothing was stale,
+    or `failed`). `report` summarizes the records of a run.
+    """
+
+    def __init__(self) -> None:
+        self.started_at = time.time()
+        self._records: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+    # End def __init__
+
+    # ---------------------------------------------------------------------------------------------
+    # Magic Methods
+    # ---------------------------------------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self._records)
+    # End def __len__
+
+    # ---------------------------------------------------------------------------------------------
+    # Public Methods
+    # ---------------------------------------------------------------------------------------------
+
+    def start(self, ticker: str) -> Dict[str, Any]:
+        """New record for a ticker fetch, passed to the other methods."""
+        record = {"ticker": ticker, "exchange": exchange_of(ticker), "sections": {}, "retries": 0,
+                  "bytes": 0, "status": None, "error": None, "seconds": None, "_start": time.perf_counter()}
+        with self._lock:
+            self._records.append(record)
+        return record
+    # End def start
+
+    def section(self, record: Dict[str, Any] | None, section: str, seconds: float, retries: int = 0,
+                error: Exception = None) -> None:
+        """Record one section call, retries included."""
+        if record is None:
+            return
+        with self._lock:
+            record["sections"][section] = {"seconds": seconds, "retries": retries,
+                                           "error": type(error).__name__ if error else None}
+            record["retries"] += retries
+    # End def section
+
+    def written(self, record: Dict[str, Any] | None, size: int) -> None:
+        if record is None:
+            return
+        with self._lock:
+            record["bytes"] += size
+    # End def written
+
+    def finish(self, record: Dict[str, Any] | None, status: str, error: Exception = None) -> None:
+        """Set the outcome of a fetch. A record finished twice keeps the last outcome."""
+        if record is None:
+            return
+        with self._lock:
+            record["status"] = status
+            record["error"] = f"{type(error).__name__}: {error}" if error else None
+            record["seconds"] = time.perf_counter() - record["_start"]
+    # End def finish
+
+    def report(self) -> Dict[str, Any]:
+        """Summary of the run: latency percentiles, throughput per exchange and errors."""
+        with self._lock:
+            records = [record for record in self._records if record["status"] is not None]
+        duration = time.time() - self.started_at
+
+        section_times = defaultdict(list)
+        section_errors = Counter()
+        for record in records:
+            for section, call in record["sections"].items():
+                section_times[section].append(call["seconds"])
+                if call["error"]:
+                    section_errors[section] += 1
+
+        exchanges = defaultdict(lambda: {"tickers": 0, "ok": 0, "fresh": 0, "failed": 0, "bytes": 0})
+        for record in records:
+            stats = exchanges[record["exchange"]]
+            stats["tickers"] += 1
+            stats[record["status"]] += 1
+            stats["bytes"] += record["bytes"]
+        for stats in exchanges.values():
+            stats["tickers_per_s"] = round(stats["tickers"] / duration, 3) if duration else None
+
+        fetched = [record for record in records if record["status"] != "fresh"]
+        slowest = sorted(fetched, key=lambda record: record["seconds"], reverse=True)[:SLOWEST]
+
+        return {
+            "started_at": self.started_at,
+            "duration_s": round(duration, 3),
+            "tickers": len(records),
+            "status": dict(Counter(record["status"] for record in records)),
+            "bytes_written": sum(record["bytes"] for record in records),
+            "retries": sum(record["retries"] for record in records),
+            "latency_s": {
+                "ticker": latency_summary([record["seconds"] for record in fetched]),
+                **{section: latency_summary(times) for section, times in section_times.items()},
+            },
+            "exchanges": dict(exchanges),
+            "errors": {
+                "by_type": dict(Counter(record["error"].split(":")[0] for record in records if record["error"])),
+                "by_section": dict(section_errors),
+                "tickers": {record["ticker"]: record["error"] for record in records if record["error"]},
+            },
+            "slowest": [{"ticker": record["ticker"], "seconds": round(record["seconds"], 3)} for record in slowest],
+        }
+    # End def report
+
+    def write_report(self, directory: str, suffix: str = "") -> str:
+        """Write the report as JSON in `directory`. Returns the path of the file.
+
+        The name holds the start time to the millisecond and the process id, so
+        that concurrent runs and worker processes do not overwrite each other.
+        """
+        os.makedirs(directory, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(self.started_at))
+        millis = int(self.started_at * 1000) % 1000
+        path = os.path.join(directory, f"import_{stamp}-{millis:03d}-{os.getpid()}{suffix}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, indent=2)
+        logger.info(f"[+] Import report written to {path}")
+        return path
+    # End def write_report
+# End class ImportTelemetry
+
+# ===========================================================================
+# Functions
+# ===========================================================================
+
+def percentile(values: List[float], q: float) -> float | None:
+    """Nearest-rank percentile of `values`, None if there are none."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
+# End def percentile
+
+def latency_summary(values: List[float]) -> Dict[str, Any]:
+    summary = {"count": len(values)}
+    for q in PERCENTILES:
+        value = percentile(values, q)
+        summary[f"p{q}"] = round(value, 4) if value is not None else None
+    summary["max"] = round(max(values), 4) if values else None
+    return summary
+# End def latency_summary
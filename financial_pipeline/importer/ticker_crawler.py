@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*- #
+"""
+Concurrent and resumable discovery of the Yahoo Finance symbols
+"""
+
+from __future__ import annotations
+
+import time
+import sqlite3
+import logging
+
+from typing import Dict, List, Tuple
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from financial_pipeline.importer.yh_get_tickers import SEARCH_SET, call_url, get_counts, hdr, process_one
+from financial_pipeline.storage.ticker_registry import TickerRegistry
+
+
+# ===========================================================================
+# Constant and global variables
+# ===========================================================================
+
+logger = logging.getLogger(__name__)
+
+LOOKUP_URL = "https://finance.yahoo.com/lookup/all?s={prefix}&t=A&b={start}&c={count}"
+
+# Page number of the request counting the results of a prefix (it also reads the first page)
+COUNT_PAGE = -1
+
+# The lookup pages stop after this many results, longer prefixes are needed above
+MAX_RESULTS = 9000
+MAX_DEPTH = 4
+PAGE_SIZE = 100
+LAST_PAGE = 9999
+
+Task = Tuple[str, int]
+
+# ===========================================================================
+# CrawlFrontier Class
+# ===========================================================================
+
+class CrawlFrontier:
+    """
+    SQLite file holding every lookup request of a crawl, as (prefix, page)
+    with a status (`pending`, `done` or `failed`). A request is marked done
+    together with the requests it discovered, so an interrupted crawl
+    resumes exactly where it stopped.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.conn = sqlite3.connect(self.path, timeout=60)
+        self.cursor = self.conn.cursor()
+
+        self.__initialize_db()
+    # End def __init__
+
+    # ---------------------------------------------------------------------------------------------
+    # Accessors
+    # ---------------------------------------------------------------------------------------------
+
+    def results(self, prefix: str) -> int | None:
+        """Result count of a prefix, None if it was not counted yet."""
+        self.cursor.execute("SELECT results FROM frontier WHERE prefix = ? AND page = ?", (prefix, COUNT_PAGE))
+        row = self.cursor.fetchone()
+        return row[0] if row else None
+    # End def results
+
+    def remaining(self) -> List[Task]:
+        """Requests not done yet, failed ones included, in discovery order."""
+        self.cursor.execute("SELECT prefix, page FROM frontier WHERE status != 'done' ORDER BY rowid")
+        return self.cursor.fetchall()
+    # End def remaining
+
+    def counts(self) -> Dict[str, int]:
+        self.cursor.execute("SELECT status, COUNT(*) FROM frontier GROUP BY status")
+        return dict(self.cursor.fetchall())
+    # End def counts
+
+    def completed(self) -> Dict[str, int]:
+        """Result count of the prefixes whose requests, and those of their longer prefixes, are all done."""
+        self.cursor.execute("""
+            SELECT f.prefix, f.results FROM frontier AS f
+            WHERE f.page = ? AND f.status = 'done' AND f.results IS NOT NULL AND NOT EXISTS (
+                SELECT 1 FROM frontier AS g
+                WHERE g.status != 'done' AND substr(g.prefix, 1, length(f.prefix)) = f.prefix
+            )
+        """, (COUNT_PAGE,))
+        return dict(self.cursor.fetchall())
+    # End def completed
+
+    # ---------------------------------------------------------------------------------------------
+    # Public Methods
+    # ---------------------------------------------------------------------------------------------
+
+    def add(self, tasks: List[Task]) -> None:
+        """Add the requests not known yet, keeping the status of the others."""
+        self.cursor.executemany("""
+            INSERT OR IGNORE INTO frontier (prefix, page, status, updated_at) VALUES (?, ?, 'pending', ?)
+        """, [(prefix, page, time.time()) for prefix, page in tasks])
+        self.conn.commit()
+    # End def add
+
+    def complete(self, task: Task, children: List[Task], results: int = None) -> None:
+        """Mark a request done and add the requests it led to, in one transaction.
+
+        Args:
+            task (Task): Request done
+            children (List[Task]): Requests it led to
+            results (int, optional): Result count of the prefix, for count requests
+        """
+        with self.conn:
+            self.cursor.executemany("""
+                INSERT OR IGNORE INTO frontier (prefix, page, status, updated_at) VALUES (?, ?, 'pending', ?)
+            """, [(prefix, page, time.time()) for prefix, page in children])
+            self.cursor.execute("""
+                UPDATE frontier SET status = 'done', results = ?, updated_at = ? WHERE prefix = ? AND page = ?
+            """, (results, time.time(), *task))
+    # End def complete
+
+    def mark(self, task: Task, status: str) -> None:
+        self.cursor.execute("""
+            UPDATE frontier SET status = ?, updated_at = ? WHERE prefix = ? AND page = ?
+        """, (status, time.time(), *task))
+        self.conn.commit()
+    # End def mark
+
+    def close(self) -> None:
+        self.conn.close()
+    # End def close
+
+    # ---------------------------------------------------------------------------------------------
+    # Private Methods
+    # ---------------------------------------------------------------------------------------------
+
+    def __initialize_db(self) -> None:
+        self.cursor.execute("PRAGMA journal_mode=WAL")
+        self.cursor.execute("""
+            CREATE TABLE IF NOT EXISTS frontier (
+                prefix TEXT NOT NULL,
+                page INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                results INTEGER,
+                updated_at REAL,
+                PRIMARY KEY (prefix, page)
+            );
+        """)
+        # Frontiers created before the result counts were kept
+        self.cursor.execute("PRAGMA table_info(frontier)")
+        if "results" not in [row[1] for row in self.cursor.fetchall()]:
+            self.cursor.execute("ALTER TABLE frontier ADD COLUMN results INTEGER")
+        self.conn.commit()
+    # End def __initialize_db
+# End class CrawlFrontier
+
+# ===========================================================================
+# Functions
+# ===========================================================================
+
+def crawl(state_path: str, registry: TickerRegistry = None, workers: int = 8,
+          alphabet: List[str] = SEARCH_SET) -> Dict[str, int]:
+    """Discover the symbols of every prefix, `workers` lookup requests at a time.
+
+    The prefixes form a trie grown from the single characters of `alphabet`:
+    each prefix is counted (see `plan_prefix`), and only split into longer
+    prefixes when its results do not fit the pages. Symbols are upserted in
+    the registry page by page, and the frontier is persisted in `state_path`:
+    running the same crawl again (after an interruption, or to retry failed
+    requests) resumes it. The prefixes whose subtree was fully crawled are
+    recorded in the registry, so that a new crawl skips them while their
+    result count does not grow.
+
+    Args:
+        state_path (str): SQLite frontier file
+        registry (TickerRegistry, optional): Registry receiving the symbols, the default one if None
+        workers (int, optional): Number of requests in flight
+        alphabet (List[str], optional): Characters the prefixes are made of
+
+    Returns:
+        Dict[str, int]: Number of requests per status at the end of the crawl
+    """
+    registry = registry if registry is not None else TickerRegistry()
+    frontier = CrawlFrontier(state_path)
+    frontier.add([(char, COUNT_PAGE) for char in alphabet])
+
+    pending = deque(frontier.remaining())
+    logger.info(f"[+] {len(pending)} lookup requests to go, {len(registry)} symbols known")
+
+    in_flight = {}
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        while pending or in_flight:
+            while pending and len(in_flight) < workers:
+                task = pending.popleft()
+                in_flight[executor.submit(_visit, task, registry, alphabet)] = task
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            # Results come back on this thread, which owns the frontier connection
+            for future in done:
+                task = in_flight.pop(future)
+                try:
+                    children, results = future.result()
+                except Exception as e:
+                    logger.error(f"[✗] Lookup {task} failed: {e}")
+                    frontier.mark(task, "failed")
+                    continue
+                frontier.complete(task, children, results)
+                pending.extend(children)
+    except KeyboardInterrupt:
+        logger.info("[!] Crawl paused, run it again to resume")
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+    registry.record_crawled(frontier.completed())
+    counts = frontier.counts()
+    frontier.close()
+    logger.info(f"[+] Crawl finished: {counts}, {len(registry)} symbols known")
+    return counts
+# End def crawl
+
+def plan_prefix(prefix: str, total: int, covered: int = None, alphabet: List[str] = SEARCH_SET) -> List[Task]:
+    """Requests following the count of a prefix, whose first page was read with the count.
+
+    Args:
+        prefix (str): Prefix counted
+        total (int): Its "All (N)" result count
+        covered (int, optional): Its result count when its whole subtree was last crawled
+            (see `TickerRegistry.crawled_results`), None if it never was
+        alphabet (List[str], optional): Characters the prefixes are made of
+
+    Returns:
+        List[Task]: Nothing when the subtree was already crawled with as many results, else
+            longer prefixes to count if the results exceed the pages, otherwise the remaining pages
+    """
+    if covered is not None and covered >= total:
+        return []
+    if total >= MAX_RESULTS and len(prefix) < MAX_DEPTH:
+        return [(prefix + char, COUNT_PAGE) for char in alphabet]
+    if total <= PAGE_SIZE:
+        return []
+    return [(prefix, start) for start in range(PAGE_SIZE, min(total, LAST_PAGE), PAGE_SIZE)]
+# End def plan_prefix
+
+def _visit(task: Task, registry: TickerRegistry, alphabet: List[str]) -> Tuple[List[Task], int | None]:
+    """Run one lookup request. Returns the requests it leads to and the result count of count requests."""
+    prefix, page = task
+
+    if page == COUNT_PAGE:
+        # The count comes with the first page of results, which is kept whatever the plan
+        url = LOOKUP_URL.format(prefix=prefix, start=0, count=PAGE_SIZE)
+        body = call_url(url, dict(hdr, path=url))
+        total = int(get_counts(body, prefix))
+        if total > 0:
+            process_one(body, prefix, {}, registry)
+        return plan_prefix(prefix, total, registry.crawled_results(prefix), alphabet), total
+
+    url = LOOKUP_URL.format(prefix=prefix, start=page, count=PAGE_SIZE)
+    process_one(call_url(url, dict(hdr, path=url)), prefix, {}, registry)
+    return [], None
+# End def _visit
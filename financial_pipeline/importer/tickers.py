@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*- #
+"""
+Ticker symbol helpers, free of any dependency so that the storage, the
+telemetry and the importers can share them without import cycles.
+"""
+
+
+def exchange_of(ticker: str) -> str:
+    """Exchange suffix of a Yahoo ticker, `US` for the suffix-less US listings."""
+    return ticker.rsplit(".", 1)[1] if "." in ticker else "US"
+# End def exchange_of
@@ -0,0 +1,327 @@
+# -*- coding: utf-8 -*- #
+"""
+Lease-based work queue spreading an import over the processes of several machines
+"""
+
+from __future__ import annotations
+
+import os
+import time
+import socket
+import sqlite3
+import logging
+import threading
+
+from typing import Any, Dict, List
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+
+# ===========================================================================
+# Constant and global variables
+# ===========================================================================
+
+logger = logging.getLogger(__name__)
+
+LEASE_SECONDS = 300.0
+
+# ===========================================================================
+# WorkQueue Class
+# ===========================================================================
+
+class WorkQueue:
+    """
+    SQLite file of tickers claimed in batches by workers under a time-limited
+    lease. A worker extends its leases with `heartbeat` while it works; the
+    leases of a worker that stopped sending heartbeats expire and their
+    tickers go back to `pending` for another worker, as do the tickers whose
+    import failed. A ticker that expired or failed `max_attempts` times is
+    marked `failed`.
+
+    The file is the only coordination between the workers: machines share it
+    through a common directory, whose file system must support SQLite locking.
+    """
+
+    def __init__(self, path: str, lease_seconds: float = LEASE_SECONDS, max_attempts: int = 3) -> None:
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+        # Transactions are opened explicitly, so that a claim is atomic across processes
+        self.conn = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        self.cursor = self.conn.cursor()
+
+        self.__initialize_db()
+    # End def __init__
+
+    # ---------------------------------------------------------------------------------------------
+    # Accessors
+    # ---------------------------------------------------------------------------------------------
+
+    def counts(self, tickers: List[str] = None) -> Dict[str, int]:
+        """Number of tickers per status, restricted to `tickers` when given."""
+        self.cursor.execute("SELECT ticker, status FROM tasks")
+        planned = set(tickers) if tickers is not None else None
+        counts: Dict[str, int] = {}
+        for ticker, status in self.cursor.fetchall():
+            if planned is None or ticker in planned:
+                counts[status] = counts.get(status, 0) + 1
+        return counts
+    # End def counts
+
+    def unfinished(self) -> int:
+        """Number of tickers pending or leased."""
+        self.cursor.execute("SELECT COUNT(*) FROM tasks WHERE status IN ('pending', 'leased')")
+        return self.cursor.fetchone()[0]
+    # End def unfinished
+
+    # ---------------------------------------------------------------------------------------------
+    # Public Methods
+    # ---------------------------------------------------------------------------------------------
+
+    def add(self, tickers: List[str], reset: bool = False) -> None:
+        """Queue the tickers not known yet, keeping the status of the others.
+
+        Args:
+            tickers (List[str]): Tickers to queue
+            reset (bool, optional): Start a new run: the `done` and `failed` tickers among
+                `tickers` go back to `pending`, the leased ones are left to their worker
+        """
+        conflict = """DO UPDATE SET status = 'pending', owner = NULL, lease_until = NULL, attempts = 0,
+                    error = NULL, updated_at = excluded.updated_at
+                WHERE status IN ('done', 'failed')""" if reset else "DO NOTHING"
+        with self._transaction():
+            self.cursor.executemany(f"""
+                INSERT INTO tasks (ticker, status, attempts, updated_at) VALUES (?, 'pending', 0, ?)
+                ON CONFLICT(ticker) {conflict}
+            """, [(ticker, time.time()) for ticker in tickers])
+    # End def add
+
+    def claim(self, worker: str, size: int) -> List[str]:
+        """Lease up to `size` pending tickers to a worker, after re-queuing the expired leases.
+
+        Returns:
+            List[str]: Claimed tickers, empty if nothing is pending
+        """
+        now = time.time()
+        with self._transaction():
+            self._requeue_expired(now)
+            self.cursor.execute("SELECT ticker FROM tasks WHERE status = 'pending' ORDER BY rowid LIMIT ?", (size,))
+            tickers = [row[0] for row in self.cursor.fetchall()]
+            self.cursor.executemany("""
+                UPDATE tasks SET status = 'leased', owner = ?, lease_until = ?, attempts = attempts + 1,
+                    updated_at = ?
+                WHERE ticker = ?
+            """, [(worker, now + self.lease_seconds, now, ticker) for ticker in tickers])
+        return tickers
+    # End def claim
+
+    def heartbeat(self, worker: str) -> int:
+        """Extend the leases of a worker. Returns the number of leases it still holds."""
+        with self._transaction():
+            self.cursor.execute("""
+                UPDATE tasks SET lease_until = ? WHERE status = 'leased' AND owner = ?
+            """, (time.time() + self.lease_seconds, worker))
+            return self.cursor.rowcount
+    # End def heartbeat
+
+    def complete(self, worker: str, ticker: str, ok: bool, error: str = None) -> bool:
+        """Record the result of a leased ticker. A failed ticker is queued again until `max_attempts`.
+
+        Returns:
+            bool: False if the lease was lost meanwhile (expired and claimed by another worker)
+        """
+        with self._transaction():
+            self.cursor.execute("""
+                UPDATE tasks SET status = CASE WHEN ? THEN 'done' WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                    error = ?, lease_until = NULL, updated_at = ?
+                WHERE ticker = ? AND status = 'leased' AND owner = ?
+            """, (ok, self.max_attempts, error, time.time(), ticker, worker))
+            return self.cursor.rowcount == 1
+    # End def complete
+
+    def release(self, worker: str) -> None:
+        """Give the leases of a stopping worker back to the queue."""
+        with self._transaction():
+            self.cursor.execute("""
+                UPDATE tasks SET status = 'pending', owner = NULL, lease_until = NULL, attempts = attempts - 1
+                WHERE status = 'leased' AND owner = ?
+            """, (worker,))
+    # End def release
+
+    def retry_failed(self) -> None:
+        """Queue the failed tickers again."""
+        with self._transaction():
+            self.cursor.execute("UPDATE tasks SET status = 'pending', attempts = 0 WHERE status = 'failed'")
+    # End def retry_failed
+
+    def close(self) -> None:
+        self.conn.close()
+    # End def close
+
+    # ---------------------------------------------------------------------------------------------
+    # Private Methods
+    # ---------------------------------------------------------------------------------------------
+
+    @contextmanager
+    def _transaction(self):
+        """`BEGIN IMMEDIATE` ... `COMMIT`: the write lock is taken before reading, rolled back on error."""
+        self.cursor.execute("BEGIN IMMEDIATE")
+        try:
+            yield self.cursor
+        except BaseException:
+            self.cursor.execute("ROLLBACK")
+            raise
+        self.cursor.execute("COMMIT")
+    # End def _transaction
+
+    def _requeue_expired(self, now: float) -> None:
+        """Leases past their deadline go back to pending, or to failed after `max_attempts` (in a transaction)."""
+        self.cursor.execute("""
+            UPDATE tasks SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                owner = NULL, lease_until = NULL, error = 'lease expired', updated_at = ?
+            WHERE status = 'leased' AND lease_until < ?
+        """, (self.max_attempts, now, now))
+        if self.cursor.rowcount:
+            logger.warning(f"[!] Re-queued {self.cursor.rowcount} tickers of expired leases")
+    # End def _requeue_expired
+
+    def __initialize_db(self) -> None:
+        self.cursor.execute("PRAGMA journal_mode=WAL")
+        self.cursor.execute("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                ticker TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                owner TEXT,
+                lease_until REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                updated_at REAL
+            );
+        """)
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks (status);")
+    # End def __initialize_db
+# End class WorkQueue
+
+# ===========================================================================
+# Functions
+# ===========================================================================
+
+def run_worker(config: Dict[str, Any], queue_path: str, worker: str = None, batch_size: int = 50,
+               concurrency: int = 8, force: bool = False, lease_seconds: float = LEASE_SECONDS,
+               poll_interval: float = 5.0) -> Dict[str, int]:
+    """Claim batches of tickers from a work queue and import them until the queue is drained.
+
+    Can be started on any machine sharing the queue file, as many times as
+    wanted. While the other workers still hold leases, an idle worker waits
+    for them to finish or expire. A worker started on a queue with nothing
+    pending or leased, e.g. before `queued_import` filled it, returns at once.
+
+    Args:
+        config (Dict[str, Any]): Keyword arguments building the importer
+        queue_path (str): SQLite work queue file
+        worker (str, optional): Worker name, `<host>:<pid>` by default
+        batch_size (int, optional): Number of tickers claimed at once
+        concurrency (int, optional): Number of fetcher threads
+        force (bool, optional): Re-download every section, even those still fresh
+        lease_seconds (float, optional): Lease duration, extended by a heartbeat every third of it
+        poll_interval (float, optional): Seconds between two claims while the queue has nothing pending
+
+    Returns:
+        Dict[str, int]: Number of tickers imported by this worker, per status
+    """
+    from financial_pipeline.importer.financial_data_importer import FinancialDataImporter
+
+    worker = worker or f"{socket.gethostname()}:{os.getpid()}"
+    importer = FinancialDataImporter(**config)
+    work_queue = WorkQueue(queue_path, lease_seconds=lease_seconds)
+    stop = threading.Event()
+    heartbeat = threading.Thread(target=_heartbeat, args=(queue_path, worker, lease_seconds, stop), daemon=True)
+    heartbeat.start()
+
+    def fetch(ticker: str) -> tuple[str, bool]:
+        return ticker, importer._fetch_ticker_data(ticker, force=force)
+    # End def fetch
+
+    counts = {"done": 0, "failed": 0, "lost": 0}
+    if work_queue.unfinished() == 0:
+        logger.warning(f"[!] Nothing to import in {queue_path}, the queue is empty or not filled yet")
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            while True:
+                tickers = work_queue.claim(worker, batch_size)
+                if not tickers:
+                    if work_queue.unfinished() == 0:
+                        break
+                    time.sleep(poll_interval)
+                    continue
+
+                # Results come back on this thread, which owns the queue connection
+                for ticker, ok in executor.map(fetch, tickers):
+                    if not work_queue.complete(worker, ticker, ok, None if ok else "import failed"):
+                        counts["lost"] += 1
+                    else:
+                        counts["done" if ok else "failed"] += 1
+    finally:
+        stop.set()
+        heartbeat.join()
+        work_queue.release(worker)
+        work_queue.close()
+        importer._finish_run(report_suffix=f".{worker.replace(':', '_')}")
+
+    logger.info(f"[+] Worker {worker} finished: {counts}")
+    return counts
+# End def run_worker
+
+def queued_import(tickers: List[str], config: Dict[str, Any], queue_path: str, processes: int = 4,
+                  concurrency: int = 8, batch_size: int = 50, force: bool = False,
+                  lease_seconds: float = LEASE_SECONDS) -> Dict[str, int]:
+    """Queue the tickers, then run `processes` local workers until the queue is drained.
+
+    Every call starts a new run: the tickers done or failed in a previous run
+    of the same queue file are imported again. Workers started with
+    `run_worker` on other machines sharing `queue_path` take part in the same
+    import.
+
+    Args:
+        tickers (List[str]): Ticker universe
+        config (Dict[str, Any]): Keyword arguments building the importer of each process
+        queue_path (str): SQLite work queue file
+        processes (int, optional): Number of local worker processes
+        concurrency (int, optional): Number of fetcher threads per process
+        batch_size (int, optional): Number of tickers claimed at once
+        force (bool, optional): Re-download every section, even those still fresh
+        lease_seconds (float, optional): Lease duration
+
+    Returns:
+        Dict[str, int]: Number of `tickers` per status at the end of the run
+    """
+    work_queue = WorkQueue(queue_path, lease_seconds=lease_seconds)
+    work_queue.add(tickers, reset=True)
+    logger.info(f"[+] {work_queue.unfinished()} tickers to import through {queue_path}")
+
+    # The rate limit of the importer is shared between the local processes
+    config = dict(config)
+    config["rate_limit"] = config.get("rate_limit", 5.0) / processes
+
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = [executor.submit(run_worker, config, queue_path, None, batch_size, concurrency, force, lease_seconds)
+                   for _ in range(processes)]
+        for future in futures:
+            future.result()
+
+    counts = work_queue.counts(tickers)
+    work_queue.close()
+    logger.info(f"[+] Queued import finished: {counts}")
+    return counts
+# End def queued_import
+
+def _heartbeat(queue_path: str, worker: str, lease_seconds: float, stop: threading.Event) -> None:
+    """Extend the leases of a worker every third of the lease, on a connection of its own."""
+    work_queue = WorkQueue(queue_path, lease_seconds=lease_seconds)
+    try:
+        while not stop.wait(lease_seconds / 3):
+            work_queue.heartbeat(worker)
+    finally:
+        work_queue.close()
+# End def _heartbeat
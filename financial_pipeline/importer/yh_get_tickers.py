@@ -5,10 +5,10 @@ import json
 import logging
 #import os
 #from html.parser import HTMLParser
-import time
 
-logging.basicConfig(level=logging.DEBUG, filename='yh_get_all_sym.log', 
-    filemode='w', format='%(asctime)s - %(levelname)s - %(message)s')
+from financial_pipeline.importer.lookup_parser import parse_lookup
+from financial_pipeline.importer.resilience import CircuitBreaker, RetryPolicy, TokenBucket
+from financial_pipeline.storage.ticker_registry import TickerRegistry
 
 hdr = {
     "authority": "finance.yahoo.com",
@@ -27,6 +27,17 @@ hdr = {
     "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/71.0.3578.98 Safari/537.36"
 }
 
+YAHOO_HOST = "finance.yahoo.com"
+
+# Characters the lookup prefixes are made of
+SEARCH_SET = [chr(x) for x in range(65, 91)] + [chr(x) for x in range(48, 58)]
+
+# Shared by every request of the crawl
+rate_limiter = TokenBucket(rate=2.0)
+circuit_breaker = CircuitBreaker(failure_threshold=10, reset_timeout=120.0)
+retry_policy = RetryPolicy(max_attempts=6, base_delay=1.0, max_delay=60.0,
+                           retry_on=(requests.exceptions.RequestException,))
+
 def get_counts(body, srch):
     count_beg = body.find('All (')
     #print(count_beg)
@@ -39,104 +50,76 @@ def get_counts(body, srch):
     return count_all
 
 def call_url(url,hdr):
-    confirmed = False
-    while not confirmed:
-        try:
-            r = requests.get(url, headers=hdr)
-            r.raise_for_status()
-
-            #if r.text.find('Something went wrong') > -1:
-            #    logging.warning("Found:" + 'Something went wrong')
-            #else:
-            confirmed = True
-        except requests.exceptions.HTTPError as errh:
-            print("Http Error:", errh)
-            logging.warning("Http Error:" + str(errh))
-        except requests.exceptions.ConnectionError as errc:
-            print("Error Connecting:", errc)
-            logging.warning("Error Connecting" + str(errc.status_code))
-        except requests.exceptions.Timeout as errt:
-            print("Timeout Error:", str(errt.status_code))
-            logging.warning("Timeout Error:" + errt)
-        except requests.exceptions.RequestException as err:
-            print("Something Other Request Error", err)
-            logging.warning("Something Other Request Error" + str(err.status_code))
-
-        if not confirmed:
-            print("Waiting 1 sec to see if problem resolved then retry")
-            time.sleep(1)
-
-    #print()
-    # special debug
-    #f=open("yh_data/yhallsym.txt","w",encoding='UTF-8')
-    #f.write( r.text )
-    #f.close()
-    return r.text
-
-
-def process_one(body, srch, yh_all_sym):
-    # {"lookupData":{"start":0,"count":100,"total":100,"documents":
-    pos_start = body.find('"lookupData":')
-    pos_beg = body.find('"documents":')
+    def get():
+        r = requests.get(url, headers=hdr, timeout=30)
+        r.raise_for_status()
+        return r.text
+
+    def warn(attempt, err):
+        print("Request error, retrying (attempt " + str(attempt) + "):", err)
+        logging.warning("Request error, retrying (attempt " + str(attempt) + "): " + str(err))
 
+    # Bounded retries with jittered backoff instead of looping forever
+    try:
+        return retry_policy.call(get, host=YAHOO_HOST, rate_limiter=rate_limiter,
+                                 circuit_breaker=circuit_breaker, on_retry=warn)
+    except Exception as err:
+        logging.error("Giving up on " + url + ": " + str(err))
+        raise
+
+
+def process_one(body, srch, yh_all_sym, registry=None):
+    # {"lookupData":{"start":0,"count":100,"total":100,"documents":
     look_for_end = "No Results for '" + srch + "'</span>"
     if body.find(look_for_end) > 0:
         print('End of data for ' + srch)
         return -1
 
-    pos_end = body.find('"searchString":', pos_beg+1)
+    try:
+        page = parse_lookup(body)
+    except ValueError as err:
+        logging.error("Decoding the lookup data failed: " + str(err))
+        print('***** Decoding the lookup data failed')
+        return -1
 
-    if pos_start == -1:
+    if page is None:
         logging.warning("Couldn't find any search data ")
         print('No data for ' + srch)
         return -1
 
-    chunk = body[pos_beg+12: pos_end-1]
-
-    all_rows = ''
-    try:
-        all_rows = eval(chunk)
-    except:
-        logging.error("Eval on chunk failed ")
-        print('***** Eval on chunk failed')
-        return -1
-
-    if len(all_rows) == 0:
+    if len(page.records) == 0:
         print('End of data for ' + srch)
         return -1
-    #else:
-        #print('Batch of ' + str(len(all_rows)))
 
-    for one in all_rows:
-        #print(one.get('symbol'), one.get('industryName'),  one.get('exchange'), one.get('type'))
-        #print(one)
-        yh_all_sym[one.get('symbol')] = one.get('shortName')
+    for record in page.records:
+        yh_all_sym[record.symbol] = record.short_name
+
+    # Keep the whole record, indexed, so a subset can be selected without the text dump
+    if registry is not None:
+        registry.upsert(record.to_registry() for record in page.records)
 
     return 0
 
 
-def process_block(body, srch, yh_all_sym, hdr):
+def process_block(body, srch, yh_all_sym, hdr, registry=None):
     for block in range(0, 9999, 100):
         url = "https://finance.yahoo.com/lookup/all?s=" + srch + "&t=A&b=" + str(block) + "&c=100"
         print('Processing: ', srch, block)
         logging.info('Processing: ' + srch + str(block))
         body = call_url(url,hdr)
-        result = process_one(body, srch, yh_all_sym)
+        result = process_one(body, srch, yh_all_sym, registry)
         if result == -1:
             break
 
 def main():
-    search_set = []
-    print(ord('0'), ord('9'), ord('A'), ord('Z'))
-
-    for x in range(65, 91):
-        search_set.append(chr(x))
+    logging.basicConfig(level=logging.DEBUG, filename='yh_get_all_sym.log', 
+        filemode='w', format='%(asctime)s - %(levelname)s - %(message)s')
 
-    for x in range(48, 58):
-        search_set.append(chr(x))
+    search_set = list(SEARCH_SET)
 
     #print(search_set)
     yh_all_sym = {}
+    registry = TickerRegistry()
 
     #sector_set = [ 'equity', 'mutualfund', 'etf', 'index', 'future', 'currency']
     #sector_set = ['all']
@@ -146,38 +129,43 @@ def main():
 
     for term_1 in search_set:
         for term_2 in search_set:
-            search_term = term_1 + term_2
-
-            url = "https://finance.yahoo.com/lookup/all?s=" + search_term + "&t=A&b=0&c=25"
-            print("calling URL: ", url)
-
-            global hdr
-            hdr["path"]=url
-
-            body = call_url(url,hdr)
-            all_num = get_counts(body, search_term)
-            all_num = int(all_num)
-            print(search_term, 'Total:', all_num)
-
-            if all_num < 9000:
-                process_block(body, search_term, yh_all_sym,hdr)
-            else:
-                for term_3 in search_set:
-                    search_term = term_1 + term_2 + term_3
-                    url = "https://finance.yahoo.com/lookup/all?s=" + search_term + "&t=A&b=0&c=25"
-                    hdr["path"] = url
-
-                    body = call_url(url, hdr)
-                    all_num= get_counts(body, search_term)
-                    all_num = int(all_num)
-                    print(search_term, 'Total:', all_num)
-
-                    if all_num < 9000:
-                        process_block(body, search_term, yh_all_sym,hdr)
-                    else:
-                        for term_4 in search_set:
-                            search_term = term_1 + term_2 + term_3 + term_4
-                            process_block(body, search_term, yh_all_sym, hdr)
+            # A request failing after its retries skips the prefix instead of ending the crawl
+            try:
+                search_term = term_1 + term_2
+
+                url = "https://finance.yahoo.com/lookup/all?s=" + search_term + "&t=A&b=0&c=25"
+                print("calling URL: ", url)
+
+                global hdr
+                hdr["path"]=url
+
+                body = call_url(url,hdr)
+                all_num = get_counts(body, search_term)
+                all_num = int(all_num)
+                print(search_term, 'Total:', all_num)
+
+                if all_num < 9000:
+                    process_block(body, search_term, yh_all_sym, hdr, registry)
+                else:
+                    for term_3 in search_set:
+                        search_term = term_1 + term_2 + term_3
+                        url = "https://finance.yahoo.com/lookup/all?s=" + search_term + "&t=A&b=0&c=25"
+                        hdr["path"] = url
+
+                        body = call_url(url, hdr)
+                        all_num= get_counts(body, search_term)
+                        all_num = int(all_num)
+                        print(search_term, 'Total:', all_num)
+
+                        if all_num < 9000:
+                            process_block(body, search_term, yh_all_sym, hdr, registry)
+                        else:
+                            for term_4 in search_set:
+                                search_term = term_1 + term_2 + term_3 + term_4
+                                process_block(body, search_term, yh_all_sym, hdr, registry)
+            except Exception as err:
+                logging.error("Skipping " + search_term + ": " + str(err))
+                print('Skipping ' + search_term + ':', err)
 
             print("Symbols stored so far: ", len(yh_all_sym))
         print("Symbols stored so far: ", len(yh_all_sym))
@@ -187,6 +175,21 @@ def main():
     # thefile.write. thefile.write('\n'.join(thelist)) or thefile.write(str(item) + "\n")
     f.write(str(yh_all_sym))
     f.close()
+    registry.close()
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    import argparse
+    from financial_pipeline.importer.ticker_crawler import crawl
+
+    parser = argparse.ArgumentParser(description="Discover every Yahoo Finance symbol")
+    parser.add_argument("--concurrent", action="store_true", help="resumable crawl over several prefixes at once")
+    parser.add_argument("--workers", type=int, default=8, help="requests in flight in concurrent mode")
+    parser.add_argument("--state", default="data/raw/crawl_state.db", help="frontier file of the concurrent crawl")
+    args = parser.parse_args()
+
+    if args.concurrent:
+        logging.basicConfig(level=logging.INFO, filename='yh_get_all_sym.log',
+            filemode='a', format='%(asctime)s - %(levelname)s - %(message)s')
+        print(crawl(args.state, workers=args.workers))
+    else:
+        main()
\ No newline at end of file
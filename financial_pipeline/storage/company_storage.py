@@ -10,6 +10,8 @@ import csv
 import sqlite3
 import logging
 
+from typing import Any, Dict, List
+
 # ===========================================================================
 # Constant and global variables
 # ===========================================================================
@@ -17,6 +19,18 @@ import logging
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.DEBUG)
 
+# Fields of a cleaned row stored in the companies table, the others go to financials
+COMPANY_FIELDS = ["country", "phone", "website", "industry", "sector", "region", "full_exchange_name",
+                  "exchange_timezone", "isin", "full_time_employees"]
+
+# Columns of the financials table read by `get_financials`, the fiscal year end is read by `get_period_end`
+FINANCIAL_COLUMNS = ["id", "company_id", "last_update", "year", "share_price", "sales", "shares_issued",
+                     "current_assets", "current_liabilities", "financial_debts", "equity", "intangible_assets",
+                     "net_income", "dividends", "eps"]
+
+# Columns of the quarterly_financials table read by `get_quarterly`
+QUARTERLY_COLUMNS = ["period", "sales", "net_income", "eps", "equity", "ttm_sales", "ttm_net_income", "ttm_eps"]
+
 # ===========================================================================
 # CompanyStorage Class
 # ===========================================================================
@@ -61,19 +75,68 @@ class CompanyStorage:
         if not company_id:
             return None
         if year:
-            self.cursor.execute("""
-                SELECT * FROM financials
+            self.cursor.execute(f"""
+                SELECT {", ".join(FINANCIAL_COLUMNS)} FROM financials
                 WHERE company_id = ? AND year = ?
             """, (company_id, year))
         else:
-            self.cursor.execute("""
-                SELECT * FROM financials
+            self.cursor.execute(f"""
+                SELECT {", ".join(FINANCIAL_COLUMNS)} FROM financials
                 WHERE company_id = ?
                 ORDER BY year
             """, (company_id,))
         return self.cursor.fetchall()
     # End def get_financials
 
+    def get_period_end(self, name, year) -> str | None:
+        """Date a fiscal year of a company ends, None if it was stored without it."""
+        self.cursor.execute("""
+            SELECT f.period_end FROM financials AS f JOIN companies AS c ON c.id = f.company_id
+            WHERE c.name = ? AND f.year = ?
+        """, (name, year))
+        row = self.cursor.fetchone()
+        return row[0] if row else None
+    # End def get_period_end
+
+    def get_quarterly(self, name) -> List[Dict[str, Any]] | None:
+        """Quarterly financials of a company, by period, None if the company is unknown."""
+        company_id = self.get_company_id(name)
+        if not company_id:
+            return None
+        self.cursor.execute(f"""
+            SELECT {", ".join(QUARTERLY_COLUMNS)} FROM quarterly_financials
+            WHERE company_id = ?
+            ORDER BY period
+        """, (company_id,))
+        return [dict(zip(QUARTERLY_COLUMNS, row)) for row in self.cursor.fetchall()]
+    # End def get_quarterly
+
+    def get_latest_ttm(self, name) -> Dict[str, Any] | None:
+        """Latest quarter of a company having its trailing twelve months sales, None if there is none."""
+        company_id = self.get_company_id(name)
+        if not company_id:
+            return None
+        self.cursor.execute(f"""
+            SELECT {", ".join(QUARTERLY_COLUMNS)} FROM quarterly_financials
+            WHERE company_id = ? AND ttm_sales IS NOT NULL
+            ORDER BY period DESC
+            LIMIT 1
+        """, (company_id,))
+        row = self.cursor.fetchone()
+        return dict(zip(QUARTERLY_COLUMNS, row)) if row else None
+    # End def get_latest_ttm
+
+    def get_quarantine(self, name=None) -> List[Dict[str, Any]]:
+        """Quarantined years, of one company or of all, with the reasons of their rejection."""
+        where, values = ("WHERE name = ?", (name,)) if name else ("", ())
+        self.cursor.execute(f"""
+            SELECT name, year, reasons, data, quarantined_at FROM quarantine {where}
+            ORDER BY name, year
+        """, values)
+        columns = ["name", "year", "reasons", "data", "quarantined_at"]
+        return [dict(zip(columns, row)) for row in self.cursor.fetchall()]
+    # End def get_quarantine
+
     # ---------------------------------------------------------------------------------------------
     # Public Methods 
     # ---------------------------------------------------------------------------------------------
@@ -133,6 +196,93 @@ class CompanyStorage:
         self.conn.commit()
     # End def update_financials
     
+    def insert_rows(self, rows: List[Dict[str, Any]]) -> int:
+        """Insert or update a batch of cleaned rows in a single transaction.
+
+        Each row holds a `name`, a `year`, optional `COMPANY_FIELDS` and financial
+        columns. Existing companies are kept as they are, like `add_company`, and
+        existing (company, year) financials are updated, like `update_financials`.
+
+        Returns:
+            int: Number of financial rows written
+        """
+        companies: Dict[str, Dict[str, Any]] = {}
+        financials: Dict[tuple, list] = {}
+        for row in rows:
+            name = row["name"]
+            companies.setdefault(name, {key: row[key] for key in COMPANY_FIELDS if key in row})
+            fields = {key: value for key, value in row.items() if key not in COMPANY_FIELDS and key not in ("name", "year")}
+            financials.setdefault(tuple(fields), []).append((name, row["year"], list(fields.values())))
+        return self.__upsert(companies, financials)
+    # End def insert_rows
+
+    def insert_records(self, records) -> int:
+        """Insert or update columnar companies (see `CompanyRecord`) in a single transaction.
+
+        The metadata of each company is inserted once, its financials block in
+        bulk; missing values (NaN) are stored as NULL. Same rules as `insert_rows`.
+        The quarters of a record, if any, are upserted by (company, period) in
+        the quarterly_financials table.
+
+        Args:
+            records (Iterable[CompanyRecord]): Records with a `name`, a `company` dict
+                of `COMPANY_FIELDS`, a `financials` DataFrame with a `year` column and
+                an optional `quarters` DataFrame with a `period` column
+
+        Returns:
+            int: Number of financial rows written
+        """
+        companies: Dict[str, Dict[str, Any]] = {}
+        financials: Dict[tuple, list] = {}
+        quarters: Dict[tuple, list] = {}
+        for record in records:
+            companies.setdefault(record.name, record.company)
+            self.__group_frame(record.name, record.financials, "year", int, financials)
+            if getattr(record, "quarters", None) is not None:
+                self.__group_frame(record.name, record.quarters, "period", str, quarters)
+        return self.__upsert(companies, financials, quarters)
+    # End def insert_records
+
+    def insert_quarantine(self, quarantine) -> int:
+        """Store the years rejected by the validation (see `ValidationResult`), replacing older rejections.
+
+        Args:
+            quarantine (pd.DataFrame): name, year, reasons and data (JSON of the rejected values) columns
+
+        Returns:
+            int: Number of quarantined rows written
+        """
+        rows = list(quarantine[["name", "year", "reasons", "data"]].itertuples(index=False, name=None))
+        with self.conn:
+            self.cursor.executemany("""
+                INSERT INTO quarantine (name, year, reasons, data) VALUES (?, ?, ?, ?)
+                ON CONFLICT(name, year) DO UPDATE SET
+                    reasons = excluded.reasons,
+                    data = excluded.data,
+                    quarantined_at = CURRENT_TIMESTAMP
+            """, [(name, int(year), reasons, data) for name, year, reasons, data in rows])
+        return len(rows)
+    # End def insert_quarantine
+
+    def update_share_prices(self, prices: Dict[str, float]) -> int:
+        """Set the share price of the latest year of each company, in a single statement.
+
+        Args:
+            prices (Dict[str, float]): Company name -> share price
+
+        Returns:
+            int: Number of financial rows updated
+        """
+        with self.conn:
+            self.cursor.executemany("""
+                UPDATE financials
+                SET share_price = ?
+                WHERE company_id = (SELECT id FROM companies WHERE name = ?)
+                  AND year = (SELECT MAX(year) FROM financials AS f WHERE f.company_id = financials.company_id)
+            """, [(price, name) for name, price in prices.items()])
+        return self.cursor.rowcount
+    # End def update_share_prices
+
     def list_companies(self):
         self.cursor.execute("SELECT id, name, industry, country FROM companies ORDER BY name;")
         return self.cursor.fetchall()
@@ -144,6 +294,7 @@ class CompanyStorage:
             logger.debug(f"No such company: {name}")
             return
         self.cursor.execute("DELETE FROM financials WHERE company_id = ?", (company_id,))
+        self.cursor.execute("DELETE FROM quarterly_financials WHERE company_id = ?", (company_id,))
         self.cursor.execute("DELETE FROM companies WHERE id = ?", (company_id,))
         self.conn.commit()
         logger.info(f"Deleted company '{name}' and associated financials.")
@@ -187,6 +338,51 @@ class CompanyStorage:
     # Private Methods 
     # ---------------------------------------------------------------------------------------------
     
+    def __group_frame(self, name: str, frame, key: str, cast, groups: Dict[tuple, list]) -> None:
+        """Append the rows of a company frame to `groups` ((columns) -> [(name, cast(key value), values)]), NaN as None."""
+        frame = frame.astype(object).where(frame.notna(), None)
+        keys = tuple(column for column in frame.columns if column != key)
+        values = groups.setdefault(keys, [])
+        for value, *row in frame[[key, *keys]].itertuples(index=False, name=None):
+            values.append((name, cast(value), row))
+    # End def __group_frame
+
+    def __upsert(self, companies: Dict[str, Dict[str, Any]], financials: Dict[tuple, list],
+                 quarters: Dict[tuple, list] = None) -> int:
+        """Write companies (name -> fields), financials ((columns) -> [(name, year, values)])
+        and quarters ((columns) -> [(name, period, values)]) in one transaction."""
+        try:
+            with self.conn:
+                for name, fields in companies.items():
+                    columns = ", ".join(["name"] + list(fields))
+                    placeholders = ", ".join(["?"] * (len(fields) + 1))
+                    self.cursor.execute(f"""
+                        INSERT OR IGNORE INTO companies ({columns})
+                        VALUES ({placeholders})
+                    """, [name] + list(fields.values()))
+
+                company_ids = self.__company_ids(list(companies))
+                for table, key, groups in (("financials", "year", financials),
+                                           ("quarterly_financials", "period", quarters or {})):
+                    for keys, values in groups.items():
+                        columns = ", ".join(["company_id", key] + list(keys))
+                        placeholders = ", ".join(["?"] * (len(keys) + 2))
+                        update_stmt = ", ".join(f"{k} = excluded.{k}" for k in keys)
+                        conflict = f"DO UPDATE SET {update_stmt}" if keys else "DO NOTHING"
+                        self.cursor.executemany(f"""
+                            INSERT INTO {table} ({columns})
+                            VALUES ({placeholders})
+                            ON CONFLICT(company_id, {key}) {conflict}
+                        """, [[company_ids[name], value] + row for name, value, row in values])
+
+                # A year stored now passed the validation, its older rejection no longer holds
+                self.cursor.executemany("DELETE FROM quarantine WHERE name = ? AND year = ?",
+                                        [(name, year) for values in financials.values() for name, year, _ in values])
+        except sqlite3.OperationalError as e:
+            raise ValueError(f"Invalid column or value: {e}")
+        return sum(len(values) for values in financials.values())
+    # End def __upsert
+
     def __initialize_db(self) -> None:
         # Create if not exists the static companies table
         self.cursor.execute("""
@@ -225,11 +421,49 @@ class CompanyStorage:
                 net_income REAL,
                 dividends REAL,
                 eps REAL,
+                period_end TEXT, -- Date the fiscal year ends, e.g. 2024-06-30
                 FOREIGN KEY (company_id) REFERENCES companies(id),
                 UNIQUE(company_id, year) -- Prevents duplicate yearly entries per company
             );
         """)
 
+        # Databases created before the fiscal year end was stored
+        self.cursor.execute("PRAGMA table_info(financials)")
+        if "period_end" not in {row[1] for row in self.cursor.fetchall()}:
+            self.cursor.execute("ALTER TABLE financials ADD COLUMN period_end TEXT")
+
+        # Create if not exists the table of the yearly rows rejected by the validation
+        self.cursor.execute("""
+            CREATE TABLE IF NOT EXISTS quarantine (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                year INTEGER NOT NULL,
+                reasons TEXT NOT NULL,
+                data TEXT,
+                quarantined_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE(name, year)
+            );
+        """)
+
+        # Create if not exists the quarterly financials table, keyed by quarter end
+        self.cursor.execute("""
+            CREATE TABLE IF NOT EXISTS quarterly_financials (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                company_id INTEGER NOT NULL,
+                last_update DATETIME DEFAULT CURRENT_TIMESTAMP,
+                period TEXT NOT NULL,
+                sales REAL,
+                net_income REAL,
+                eps REAL,
+                equity REAL,
+                ttm_sales REAL,
+                ttm_net_income REAL,
+                ttm_eps REAL,
+                FOREIGN KEY (company_id) REFERENCES companies(id),
+                UNIQUE(company_id, period)
+            );
+        """)
+
         self.cursor.execute(f"""
             CREATE TRIGGER IF NOT EXISTS update_last_update
             AFTER UPDATE ON financials
@@ -243,6 +477,17 @@ class CompanyStorage:
 
         self.conn.commit()
     # End def __initialize_db
+
+    def __company_ids(self, names: List[str], chunk: int = 500) -> Dict[str, int]:
+        ids = {}
+        for start in range(0, len(names), chunk):
+            part = names[start:start + chunk]
+            self.cursor.execute(f"""
+                SELECT name, id FROM companies WHERE name IN ({", ".join(["?"] * len(part))})
+            """, part)
+            ids.update(self.cursor.fetchall())
+        return ids
+    # End def __company_ids
 # End class CompanyStorage
 
 
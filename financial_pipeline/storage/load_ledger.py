@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*- #
+"""
+Ledger of the raw snapshot files loaded into the database, for incremental cleaning.
+"""
+
+from __future__ import annotations
+
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+
+from typing import Dict, Iterable, List, Tuple
+
+# ===========================================================================
+# Constant and global variables
+# ===========================================================================
+
+logger = logging.getLogger(__name__)
+
+HASH_BLOCK_SIZE = 1 << 20
+
+# ===========================================================================
+# LoadLedger Class
+# ===========================================================================
+
+class LoadLedger:
+    """
+    Record, for every raw snapshot file loaded into the database, the hash of
+    its content and the version of the field mapping it was cleaned with, so
+    that a later run only cleans the files that changed since.
+
+    The ledger is a table of the processed database itself: a rebuilt
+    database starts with an empty ledger and is fully loaded again.
+    """
+
+    def __init__(self, source=None) -> None:
+        db_source = source or "data/processed/test.db"
+        self.conn = sqlite3.connect(db_source)
+        self.cursor = self.conn.cursor()
+
+        # path -> (size, mtime_ns, content hash) of the files returned by `changed`, until recorded
+        self._pending: Dict[str, Tuple[int, int, str]] = {}
+
+        self.__initialize_db()
+    # End def __init__
+
+    # ---------------------------------------------------------------------------------------------
+    # Magic Methods
+    # ---------------------------------------------------------------------------------------------
+
+    def __len__(self) -> int:
+        self.cursor.execute("SELECT COUNT(*) FROM source_files")
+        return self.cursor.fetchone()[0]
+    # End def __len__
+
+    # ---------------------------------------------------------------------------------------------
+    # Public Methods
+    # ---------------------------------------------------------------------------------------------
+
+    def changed(self, paths: Iterable[str], spec_version: str) -> List[str]:
+        """Files to clean: new ones, those whose content changed and those loaded with another mapping.
+
+        The content of a file is only hashed when its size or modification
+        time differs from the ledger, so unchanged files cost a `stat` each.
+
+        Args:
+            paths (Iterable[str]): Raw snapshot files
+            spec_version (str): Version of the mapping of the cleaner, see `FinancialDataCleaner.version`
+
+        Returns:
+            List[str]: Changed files, in the order of `paths`
+        """
+        self.cursor.execute("SELECT path, size, mtime_ns, content_hash, spec_version FROM source_files")
+        known = {path: rest for path, *rest in self.cursor.fetchall()}
+
+        changed = []
+        for path in paths:
+            stat = os.stat(path)
+            entry = known.get(path)
+            if entry is not None and entry[3] == spec_version and entry[:2] == [stat.st_size, stat.st_mtime_ns]:
+                continue
+
+            content_hash = file_hash(path)
+            self._pending[path] = (stat.st_size, stat.st_mtime_ns, content_hash)
+            if entry is None or entry[2] != content_hash or entry[3] != spec_version:
+                changed.append(path)
+        # Touched but identical files only need their size and mtime updated
+        pending = set(changed)
+        self.record([path for path in list(self._pending) if path not in pending], spec_version)
+        return changed
+    # End def changed
+
+    def record(self, paths: Iterable[str], spec_version: str) -> int:
+        """Mark files returned by `changed` as loaded, once their records are stored.
+
+        Returns:
+            int: Number of files recorded
+        """
+        rows = []
+        for path in paths:
+            size, mtime_ns, content_hash = self._pending.pop(path, None) or self._stat_and_hash(path)
+            rows.append((path, size, mtime_ns, content_hash, spec_version, time.time()))
+
+        with self.conn:
+            self.cursor.executemany("""
+                INSERT INTO source_files (path, size, mtime_ns, content_hash, spec_version, loaded_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(path) DO UPDATE SET
+                    size = excluded.size,
+                    mtime_ns = excluded.mtime_ns,
+                    content_hash = excluded.content_hash,
+                    spec_version = excluded.spec_version,
+                    loaded_at = excluded.loaded_at
+            """, rows)
+        return len(rows)
+    # End def record
+
+    def clear(self) -> None:
+        """Forget every file, so that the next run cleans everything."""
+        with self.conn:
+            self.cursor.execute("DELETE FROM source_files")
+        self._pending.clear()
+    # End def clear
+
+    def close(self) -> None:
+        self.conn.close()
+    # End def close
+
+    # ---------------------------------------------------------------------------------------------
+    # Private Methods
+    # ---------------------------------------------------------------------------------------------
+
+    def _stat_and_hash(self, path: str) -> Tuple[int, int, str]:
+        stat = os.stat(path)
+        return stat.st_size, stat.st_mtime_ns, file_hash(path)
+    # End def _stat_and_hash
+
+    def __initialize_db(self) -> None:
+        self.cursor.execute("""
+            CREATE TABLE IF NOT EXISTS source_files (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                content_hash TEXT NOT NULL,
+                spec_version TEXT NOT NULL,
+                loaded_at REAL
+            );
+        """)
+        self.conn.commit()
+    # End def __initialize_db
+# End class LoadLedger
+
+# ===========================================================================
+# Functions
+# ===========================================================================
+
+def file_hash(path: str) -> str:
+    """SHA-1 of the content of a file, read by blocks."""
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+# End def file_hash
@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*- #
+"""
+Module containing the registry of the known tickers.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import time
+import sqlite3
+import logging
+import threading
+
+from typing import Any, Dict, Iterable, List, Tuple
+
+from financial_pipeline.importer.tickers import exchange_of
+
+# ===========================================================================
+# Constant and global variables
+# ===========================================================================
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ["symbol", "short_name", "exchange", "type", "yahoo_exchange", "industry"]
+
+ISIN_RE = re.compile(r"^[A-Z]{2}[A-Z0-9]{9}[0-9]$")
+
+# Exchange suffixes of the home market of an ISIN country, preferred as primary listing
+HOME_EXCHANGES = {
+    "US": ("US",), "CA": ("TO", "V"), "FR": ("PA",), "DE": ("DE", "F"), "GB": ("L",), "NL": ("AS",),
+    "BE": ("BR",), "IT": ("MI",), "ES": ("MC",), "PT": ("LS",), "CH": ("SW",), "SE": ("ST",),
+    "NO": ("OL",), "DK": ("CO",), "FI": ("HE",), "AT": ("VI",), "IE": ("IR",), "JP": ("T",),
+    "HK": ("HK",), "AU": ("AX",), "IN": ("NS", "BO"), "BR": ("SA",), "KR": ("KS",), "CN": ("SS", "SZ"),
+}
+
+# ===========================================================================
+# TickerRegistry Class
+# ===========================================================================
+
+class TickerRegistry:
+    """
+    Indexed SQLite table of every ticker found by the discovery, so that
+    subsets (an exchange, a security type) are selected without re-parsing
+    the whole universe.
+    """
+
+    def __init__(self, source=None) -> None:
+        db_source = source or "data/raw/tickers.db"
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_source, timeout=30, check_same_thread=False)
+        self.cursor = self.conn.cursor()
+
+        self.__initialize_db()
+    # End def __init__
+
+    # ---------------------------------------------------------------------------------------------
+    # Magic Methods
+    # ---------------------------------------------------------------------------------------------
+
+    def __len__(self) -> int:
+        with self._lock:
+            self.cursor.execute("SELECT COUNT(*) FROM tickers")
+            return self.cursor.fetchone()[0]
+    # End def __len__
+
+    def __contains__(self, symbol: str) -> bool:
+        return self.get(symbol) is not None
+    # End def __contains__
+
+    # ---------------------------------------------------------------------------------------------
+    # Accessors
+    # ---------------------------------------------------------------------------------------------
+
+    def get(self, symbol: str) -> Dict[str, Any] | None:
+        with self._lock:
+            self.cursor.execute(f"SELECT {', '.join(COLUMNS)} FROM tickers WHERE symbol = ?", (symbol,))
+            row = self.cursor.fetchone()
+        return dict(zip(COLUMNS, row)) if row else None
+    # End def get
+
+    def isin_of(self, symbol: str) -> str | None:
+        with self._lock:
+            self.cursor.execute("SELECT isin FROM listings WHERE symbol = ?", (symbol,))
+            row = self.cursor.fetchone()
+        return row[0] if row else None
+    # End def isin_of
+
+    def listings(self, isin: str) -> List[Tuple[str, str]]:
+        """(symbol, exchange) of the listings sharing an ISIN, in registration order."""
+        with self._lock:
+            self.cursor.execute("SELECT symbol, exchange FROM listings WHERE isin = ? ORDER BY rowid", (isin,))
+            return self.cursor.fetchall()
+    # End def listings
+
+    def primary_of(self, symbol: str) -> str | None:
+        """Primary listing of the company behind `symbol`, None if its ISIN is not known.
+
+        The primary is the first listing registered on the home market of the
+        ISIN country (see `HOME_EXCHANGES`), else the first listing registered.
+        """
+        isin = self.isin_of(symbol)
+        if isin is None:
+            return None
+        listings = self.listings(isin)
+        home = HOME_EXCHANGES.get(isin[:2], ())
+        return next((symbol for symbol, exchange in listings if exchange in home), listings[0][0])
+    # End def primary_of
+
+    def count(self, prefix: str = "") -> int:
+        """Number of symbols starting with `prefix`, through the primary key index."""
+        if not prefix:
+            return len(self)
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        with self._lock:
+            self.cursor.execute("SELECT COUNT(*) FROM tickers WHERE symbol >= ? AND symbol < ?", (prefix, upper))
+            return self.cursor.fetchone()[0]
+    # End def count
+
+    def select(self, exchange: str = None, type: str = None) -> List[str]:
+        """Symbols of the registry, optionally filtered on the exchange suffix and the type."""
+        clauses, values = [], []
+        if exchange is not None:
+            clauses.append("exchange = ?")
+            values.append(exchange)
+        if type is not None:
+            clauses.append("type = ?")
+            values.append(type.lower())
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        with self._lock:
+            self.cursor.execute(f"SELECT symbol FROM tickers {where} ORDER BY symbol", values)
+            return [row[0] for row in self.cursor.fetchall()]
+    # End def select
+
+    def crawled_results(self, prefix: str) -> int | None:
+        """Lookup result count of a prefix when its whole subtree was last crawled, None if never."""
+        value = self.get_meta(f"crawled:{prefix}")
+        return int(value) if value is not None else None
+    # End def crawled_results
+
+    def get_meta(self, key: str) -> str | None:
+        with self._lock:
+            self.cursor.execute("SELECT value FROM meta WHERE key = ?", (key,))
+            row = self.cursor.fetchone()
+        return row[0] if row else None
+    # End def get_meta
+
+    # ---------------------------------------------------------------------------------------------
+    # Public Methods
+    # ---------------------------------------------------------------------------------------------
+
+    def upsert(self, records: Iterable[Dict[str, Any]]) -> int:
+        """Insert or complete tickers. Known fields are never overwritten by missing ones.
+
+        Args:
+            records (Iterable[Dict[str, Any]]): Dicts with a `symbol` and any of `short_name`,
+                `type`, `yahoo_exchange` and `industry`
+
+        Returns:
+            int: Number of records processed
+        """
+        rows = [(
+            record["symbol"],
+            record.get("short_name"),
+            exchange_of(record["symbol"]),
+            record["type"].lower() if record.get("type") else None,
+            record.get("yahoo_exchange"),
+            record.get("industry"),
+            time.time(),
+        ) for record in records if record.get("symbol")]
+
+        with self._lock:
+            self.cursor.executemany("""
+                INSERT INTO tickers (symbol, short_name, exchange, type, yahoo_exchange, industry, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(symbol) DO UPDATE SET
+                    short_name = COALESCE(excluded.short_name, short_name),
+                    type = COALESCE(excluded.type, type),
+                    yahoo_exchange = COALESCE(excluded.yahoo_exchange, yahoo_exchange),
+                    industry = COALESCE(excluded.industry, industry),
+                    updated_at = excluded.updated_at
+            """, rows)
+            self.conn.commit()
+        return len(rows)
+    # End def upsert
+
+    def load_mapping(self, mapping: Dict[str, str], source: str = None, version: str = None) -> int:
+        """Load a `symbol -> short name` dictionary, such as yh_tickers.json.
+
+        Args:
+            mapping (Dict[str, str]): Symbol -> short name
+            source (str, optional): File the mapping comes from
+            version (str, optional): Version of that file (e.g. its mtime), see `loaded_version`
+        """
+        count = self.upsert({"symbol": symbol, "short_name": name} for symbol, name in mapping.items())
+        if source is not None:
+            self.set_meta(f"loaded:{os.path.abspath(source)}", version)
+        logger.info(f"[+] Loaded {count} tickers into the registry")
+        return count
+    # End def load_mapping
+
+    def loaded_version(self, source: str) -> str | None:
+        """Version of `source` recorded by the last `load_mapping`, None if never loaded."""
+        return self.get_meta(f"loaded:{os.path.abspath(source)}")
+    # End def loaded_version
+
+    def set_isin(self, symbol: str, isin: str) -> bool:
+        """Record the ISIN of a symbol. Returns False, recording nothing, if it is not a valid ISIN."""
+        if not isinstance(isin, str) or not ISIN_RE.match(isin):
+            return False
+        with self._lock:
+            self.cursor.execute("""
+                INSERT INTO listings (symbol, isin, exchange) VALUES (?, ?, ?)
+                ON CONFLICT(symbol) DO UPDATE SET isin = excluded.isin
+            """, (symbol, isin, exchange_of(symbol)))
+            self.conn.commit()
+        return True
+    # End def set_isin
+
+    def record_crawled(self, results: Dict[str, int]) -> None:
+        """Record the lookup result count of prefixes whose subtree was fully crawled, see `crawled_results`."""
+        with self._lock:
+            self.cursor.executemany("""
+                INSERT INTO meta (key, value) VALUES (?, ?)
+                ON CONFLICT(key) DO UPDATE SET value = excluded.value
+            """, [(f"crawled:{prefix}", str(count)) for prefix, count in results.items()])
+            self.conn.commit()
+    # End def record_crawled
+
+    def set_meta(self, key: str, value: str) -> None:
+        with self._lock:
+            self.cursor.execute("""
+                INSERT INTO meta (key, value) VALUES (?, ?)
+                ON CONFLICT(key) DO UPDATE SET value = excluded.value
+            """, (key, value))
+            self.conn.commit()
+    # End def set_meta
+
+    def close(self) -> None:
+        self.conn.close()
+    # End def close
+
+    # ---------------------------------------------------------------------------------------------
+    # Private Methods
+    # ---------------------------------------------------------------------------------------------
+
+    def __initialize_db(self) -> None:
+        self.cursor.execute("""
+            CREATE TABLE IF NOT EXISTS tickers (
+                symbol TEXT PRIMARY KEY,
+                short_name TEXT,
+                exchange TEXT NOT NULL,
+                type TEXT,
+                yahoo_exchange TEXT,
+                industry TEXT,
+                updated_at REAL
+            );
+        """)
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_tickers_exchange_type ON tickers (exchange, type);")
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_tickers_type ON tickers (type);")
+
+        # ISIN of the fetched tickers, kept apart so that it does not add tickers to the universe
+        self.cursor.execute("""
+            CREATE TABLE IF NOT EXISTS listings (
+                symbol TEXT PRIMARY KEY,
+                isin TEXT NOT NULL,
+                exchange TEXT NOT NULL
+            );
+        """)
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_listings_isin ON listings (isin);")
+
+        self.cursor.execute("""
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+        """)
+        self.conn.commit()
+    # End def __initialize_db
+# End class TickerRegistry
@@ -1,33 +1,43 @@
+import pandas as pd
+
 from typing import List, Dict
-from financial_pipeline.storage.company_storage import CompanyStorage
+from financial_pipeline.storage.company_storage import COMPANY_FIELDS, CompanyStorage
+from financial_pipeline.cleaner.financial_data_cleaner import CompanyRecord
+from financial_pipeline.cleaner.validator import FinancialValidator
 
 
-def insert_cleaned_financials(rows: List[Dict], db_path=None):
+def insert_cleaned_financials(rows: List[Dict], db_path=None, validator=None) -> int:
     """
     Insert a list of cleaned financial rows into the SQLite database.
     Each row should include all required fields (name, year, financial metrics).
+    The rows go through the same validation as `insert_company_records`.
     """
-    db = CompanyStorage(db_path)
-
-    
-
+    companies: Dict[str, List[Dict]] = {}
     for row in rows:
-        name = row.pop("name")
-        year = row.pop("year")
-
-        keys_to_extract = ["country", "phone", "website", "industry", "sector", "region", "full_exchange_name", 
-                           "exchange_timezone", "isin", "full_time_employees"]
-        
-        companies_row = {key: row.pop(key) for key in keys_to_extract}
-        
-        # Ensure company exists
-        db.add_company(name, **companies_row)
-        
-        # Insert or update the financial data
-        db.update_financials(name, year, **row)
+        companies.setdefault(row["name"], []).append(row)
+
+    records = []
+    for name, company_rows in companies.items():
+        company = {field: company_rows[0][field] for field in COMPANY_FIELDS if field in company_rows[0]}
+        financials = pd.DataFrame([{key: value for key, value in row.items() if key != "name" and key not in company}
+                                   for row in company_rows])
+        records.append(CompanyRecord(name, company, financials))
+    return insert_company_records(records, db_path, validator)
+# End def insert_cleaned_financials
 
+def insert_company_records(records: List, db_path=None, validator=None) -> int:
+    """
+    Insert columnar companies (`CompanyRecord`) into the SQLite database,
+    each company once and its yearly financials in bulk. The years rejected
+    by the validation go to the quarantine table instead.
+    """
+    result = (validator or FinancialValidator()).split(records)
+    db = CompanyStorage(db_path)
+    db.insert_quarantine(result.quarantine)
+    written = db.insert_records(result.records)
     db.close()
-# End def insert_cleaned_financials
+    return written
+# End def insert_company_records
 
 def chrono(message: str = "") -> None:
     from datetime import datetime
@@ -35,4 +45,4 @@ def chrono(message: str = "") -> None:
     now = datetime.now()
     # now_str = now.strftime("%d-%m-%Y %H:%M:%s")
     print(f"{now} - {message}\n")
-# End def chrono
\ No newline at end of file
+# End def chrono
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*- #
+"""
+Streaming fetch -> clean -> store pipeline
+"""
+
+from __future__ import annotations
+
+import time
+import queue
+import logging
+import threading
+
+from typing import Any, Dict, List, Tuple
+from concurrent.futures import ThreadPoolExecutor
+
+from financial_pipeline.storage.company_storage import CompanyStorage
+from financial_pipeline.cleaner.validator import FinancialValidator
+
+
+# ===========================================================================
+# Constant and global variables
+# ===========================================================================
+
+logger = logging.getLogger(__name__)
+
+# Marks the end of a stage's output
+_DONE = object()
+
+# ===========================================================================
+# Functions
+# ===========================================================================
+
+def stream_pipeline(importer, cleaner, tickers: List[str], db_path: str = None, fetch_workers: int = 8,
+                    queue_size: int = 64, batch_size: int = 500, flush_interval: float = 2.0,
+                    force: bool = False, validator: FinancialValidator = None) -> Dict[str, int]:
+    """Download, clean and store the tickers as a stream instead of one stage after the other.
+
+    Fetcher threads hand each snapshot to a cleaner thread, which hands the
+    columnar company records to the calling thread, the only writer of the database. The queues between
+    the stages are bounded, so a slow stage holds the previous ones back and
+    memory stays flat whatever the size of the universe. Rows are written in
+    batches of `batch_size`, or after `flush_interval` seconds, so the first
+    companies are queryable while the import is still running.
+
+    Args:
+        importer (FinancialDataImporter): Importer fetching the snapshots
+        cleaner (FinancialDataCleaner): Cleaner turning a snapshot into a `CompanyRecord`
+        tickers (List[str]): Tickers to process
+        db_path (str, optional): Company database, the `CompanyStorage` default if None
+        fetch_workers (int, optional): Number of fetcher threads
+        queue_size (int, optional): Capacity of each queue between two stages
+        batch_size (int, optional): Number of yearly rows per database transaction
+        flush_interval (float, optional): Maximum delay in seconds before buffered rows are written
+        force (bool, optional): Re-download every section, even those still fresh
+        validator (FinancialValidator, optional): Checks of each batch before it is written,
+            the default checks if None; rejected years go to the quarantine table
+
+    Returns:
+        Dict[str, int]: Number of tickers fetched, failed and cleaned, and of rows written and quarantined
+
+    Raises:
+        BaseException: The error a fetch or clean stage died of, once the records
+            that reached the writer are stored
+    """
+    snapshots = queue.Queue(maxsize=queue_size)
+    records = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    counts = {"fetched": 0, "failed": 0, "cleaned": 0, "rows": 0, "quarantined": 0}
+    lock = threading.Lock()
+    pending = iter(tickers)
+    errors: List[BaseException] = []
+
+    def count(key: str) -> None:
+        with lock:
+            counts[key] += 1
+    # End def count
+
+    def fetch() -> None:
+        while not stop.is_set():
+            with lock:
+                ticker = next(pending, None)
+            if ticker is None:
+                return
+            snapshot = importer.fetch_snapshot(ticker, force=force)
+            if snapshot is None:
+                count("failed")
+                continue
+            count("fetched")
+            _put(snapshots, (ticker, snapshot), stop)
+    # End def fetch
+
+    def clean() -> None:
+        try:
+            while not stop.is_set():
+                try:
+                    item = snapshots.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if item is _DONE:
+                    break
+                ticker, snapshot = item
+                try:
+                    record = cleaner.extract_company(snapshot, ticker)
+                except Exception as e:
+                    logger.error(f"[✗] Failed to clean {ticker}: {e}")
+                    continue
+                count("cleaned")
+                if record is not None:
+                    _put(records, record, stop)
+        except BaseException as e:
+            logger.error(f"[✗] Clean stage failed: {e!r}")
+            errors.append(e)
+        finally:
+            # The writer waits for the end marker, even if this stage dies
+            _put(records, _DONE, stop)
+    # End def clean
+
+    def fetch_all() -> None:
+        with ThreadPoolExecutor(max_workers=fetch_workers) as executor:
+            futures = [executor.submit(fetch) for _ in range(fetch_workers)]
+        for future in futures:
+            if future.exception() is not None:
+                logger.error(f"[✗] Fetch stage failed: {future.exception()!r}")
+                errors.append(future.exception())
+        _put(snapshots, _DONE, stop)
+    # End def fetch_all
+
+    stages = [threading.Thread(target=fetch_all, name="pipeline-fetch", daemon=True),
+              threading.Thread(target=clean, name="pipeline-clean", daemon=True)]
+    for stage in stages:
+        stage.start()
+
+    storage = CompanyStorage(db_path)
+    try:
+        counts["rows"], counts["quarantined"] = _write(storage, records, batch_size, flush_interval,
+                                                       validator or FinancialValidator())
+    finally:
+        # Unblock the other stages if the writer failed
+        stop.set()
+        for stage in stages:
+            stage.join()
+        storage.close()
+        importer._finish_run()
+
+    if errors:
+        raise errors[0]
+    logger.info(f"[+] Streaming pipeline finished: {counts}")
+    return counts
+# End def stream_pipeline
+
+def _write(storage: CompanyStorage, records: queue.Queue, batch_size: int, flush_interval: float,
+           validator: FinancialValidator) -> Tuple[int, int]:
+    """Writer stage: validate and batch the cleaned companies into the database until the end marker.
+
+    Returns:
+        Tuple[int, int]: Number of rows written and quarantined
+    """
+    batch: List[Any] = []
+    batch_rows = 0
+    written = quarantined = 0
+    last_flush = time.monotonic()
+
+    while True:
+        try:
+            item = records.get(timeout=flush_interval)
+        except queue.Empty:
+            item = None
+
+        if item is not None and item is not _DONE:
+            batch.append(item)
+            batch_rows += len(item.financials)
+
+        due = time.monotonic() - last_flush >= flush_interval
+        if batch and (item is _DONE or batch_rows >= batch_size or due):
+            result = validator.split(batch)
+            quarantined += storage.insert_quarantine(result.quarantine)
+            written += storage.insert_records(result.records)
+            logger.debug(f"Wrote {batch_rows} rows of {len(batch)} companies ({written} so far)")
+            batch, batch_rows = [], 0
+            last_flush = time.monotonic()
+
+        if item is _DONE:
+            return written, quarantined
+# End def _write
+
+def _put(target: queue.Queue, item: Any, stop: threading.Event) -> None:
+    """Blocking put that gives up once the pipeline is stopped."""
+    while not stop.is_set():
+        try:
+            target.put(item, timeout=0.1)
+            return
+        except queue.Full:
+            continue
+# End def _put
@@ -0,0 +1,79 @@
+import time
+import argparse
+
+from financial_pipeline.cleaner.financial_data_cleaner import FinancialDataCleaner
+
+# Previous hard-coded mapping: column -> (statement, line items summed)
+STATEMENT_FIELDS = {
+    "sales": ("incomestmt", ["Operating Revenue"]),
+    "current_assets": ("balancesheet", ["Current Assets", "Other Current Assets"]),
+    "current_liabilities": ("balancesheet", ["Current Liabilities", "Other Current Liabilities"]),
+    "financial_debts": ("balancesheet", ["Derivative Product Liabilities", "Long Term Debt And Capital Lease Obligation"]),
+    "equity": ("balancesheet", ["Stockholders Equity"]),
+    "intangible_assets": ("balancesheet", ["Goodwill And Other Intangible Assets"]),
+    "net_income": ("incomestmt", ["Net Income Continuous Operations"]),
+    "eps": ("incomestmt", ["Basic EPS"]),
+}
+
+
+def legacy_extract(raw_data, company_name):
+    """Previous `extract_all` field lookups: every field of every year scans all the dates of its line items."""
+    income = raw_data.get("incomestmt", {})
+    balance = raw_data.get("balancesheet", {})
+    dividends = raw_data.get("dividends", {})
+    statements = {"incomestmt": income, "balancesheet": balance}
+
+    fiscal_years = [year.split("-")[0] for year in next(iter(income.values())).keys()] if income else []
+    rows = []
+    for year in fiscal_years:
+        row = {"name": company_name, "year": int(year)}
+        for field, (statement, line_items) in STATEMENT_FIELDS.items():
+            values = [value for item in line_items for date, value in statements[statement].get(item, {}).items()
+                      if date.startswith(year)]
+            if len(line_items) == 1:
+                row[field] = values[0] if values else None
+            else:
+                row[field] = sum(values, 0.0) if values else None
+        year_total = sum(amount for date, amount in dividends.items() if date.startswith(year))
+        row["dividends"] = year_total if year_total > 0 else None
+        rows.append(row)
+    return rows
+# End def legacy_extract
+
+def make_snapshot(years, dividends_per_year, quarterly):
+    """Synthetic snapshot with `years` of statements and a dividend history of the same length."""
+    periods = [f"{year}-{month:02d}-28" for year in range(2024 - years, 2024)
+               for month in ((3, 6, 9, 12) if quarterly else (12,))]
+    line_items = {item for _, items in STATEMENT_FIELDS.values() for item in items}
+    snapshot = {"regularMarketPrice": 52.5, "sharesOutstanding": 1e9, "incomestmt": {}, "balancesheet": {}}
+    for field, (statement, items) in STATEMENT_FIELDS.items():
+        for item in items:
+            snapshot[statement][item] = {period: 1e6 for period in periods}
+    # Line items the cleaner does not read, as in real statements
+    for i in range(60 - len(line_items)):
+        snapshot["balancesheet"][f"Other Item {i}"] = {period: 1.0 for period in periods}
+    snapshot["dividends"] = {f"{year}-{1 + i % 12:02d}-{1 + i // 12:02d}": 0.25
+                             for year in range(2024 - years, 2024) for i in range(dividends_per_year)}
+    return snapshot
+# End def make_snapshot
+
+def bench(snapshot, repeat):
+    """Clean the same snapshot `repeat` times with both implementations and report the throughput."""
+    cleaner = FinancialDataCleaner()
+    for name, extract in (("legacy scans", legacy_extract), ("year index", cleaner.extract_all)):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            rows = extract(snapshot, "BENCH")
+        elapsed = time.perf_counter() - start
+        print(f"{name:14s}  {repeat / elapsed:9.1f} companies/s  ({len(rows)} rows each)")
+# End def bench
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cleaner extraction micro-benchmark")
+    parser.add_argument("--years", type=int, default=40, help="Years of statements and dividends")
+    parser.add_argument("--dividends", type=int, default=4, help="Dividend payments per year")
+    parser.add_argument("--quarterly", action="store_true", help="Four statement periods per year")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    bench(make_snapshot(args.years, args.dividends, args.quarterly), args.repeat)
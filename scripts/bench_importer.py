@@ -0,0 +1,60 @@
+import time
+import argparse
+import tempfile
+
+from financial_pipeline.importer.raw_store import get_raw_store
+from financial_pipeline.importer.data_sources import ReplayDataSource
+from financial_pipeline.importer.financial_data_importer import FinancialDataImporter
+
+
+def make_fixtures(path, count):
+    """Record `count` synthetic snapshots, for boxes without real recordings."""
+    store = get_raw_store("json", path)
+    years = [f"{year}-12-31" for year in range(2020, 2024)]
+    for i in range(count):
+        store.write(f"T{i:05d}.PA", {
+            "isin": f"FR{i:010d}",
+            "regularMarketPrice": 10.0 + i,
+            "incomestmt": {"Operating Revenue": {year: 1e8 for year in years}},
+            "balancesheet": {"Current Assets": {year: 5e7 for year in years}},
+            "dividends": {f"{year[:4]}-06-15": 0.5 for year in years},
+        })
+    return store.tickers()
+# End def make_fixtures
+
+def bench(fixture_path, tickers, concurrency_levels, latency, error_rate, max_rps, rate_limit):
+    """Import the recorded tickers offline at several concurrency levels and report the throughput."""
+    for concurrency in concurrency_levels:
+        source = ReplayDataSource(fixture_path, latency=latency, error_rate=error_rate, max_rps=max_rps, seed=0)
+        with tempfile.TemporaryDirectory() as out_dir:
+            importer = FinancialDataImporter(data_path=out_dir, source=source,
+                                             rate_limit=rate_limit, max_attempts=1)
+            start = time.perf_counter()
+            importer.async_retrieve_data(tickers, concurrency=concurrency)
+            elapsed = time.perf_counter() - start
+            failed = len(importer.dead_letters)
+            importer.manifest.close()
+
+        print(f"concurrency={concurrency:4d}  {len(tickers) / elapsed:8.1f} tickers/s  "
+              f"elapsed={elapsed:6.2f}s  failed={failed}")
+# End def bench
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline importer throughput benchmark")
+    parser.add_argument("--fixtures", help="Raw directory with recorded snapshots (synthetic if omitted)")
+    parser.add_argument("--synthetic", type=int, default=200, help="Number of synthetic tickers")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--latency", type=float, nargs=2, default=[0.05, 0.2], help="Min and max latency (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--max-rps", type=float, default=None, help="Throttle above this many calls per second")
+    parser.add_argument("--rate-limit", type=float, default=10_000.0, help="Importer token bucket rate")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as synthetic_dir:
+        if args.fixtures:
+            fixture_path, tickers = args.fixtures, get_raw_store("json", args.fixtures).tickers()
+        else:
+            fixture_path, tickers = synthetic_dir, make_fixtures(synthetic_dir, args.synthetic)
+
+        bench(fixture_path, tickers, args.concurrency, tuple(args.latency),
+              args.error_rate, args.max_rps, args.rate_limit)
@@ -0,0 +1,67 @@
+import os
+import json
+import time
+import argparse
+
+from financial_pipeline.importer.lookup_parser import parse_lookup
+
+
+def legacy_parse(body):
+    """Previous `process_one` extraction: slice around the documents array and eval it."""
+    pos_beg = body.find('"documents":')
+    pos_end = body.find('"searchString":', pos_beg + 1)
+    rows = eval(body[pos_beg + 12: pos_end - 1])
+    return [(one.get("symbol"), one.get("shortName")) for one in rows]
+# End def legacy_parse
+
+def make_page(rows, padding):
+    """Synthetic lookup page with `rows` documents, surrounded by `padding` bytes of markup."""
+    documents = [{"symbol": f"T{i:04d}.PA", "shortName": f"Company {i}", "exchange": "PAR",
+                  "type": "EQUITY", "industryName": "Industrials", "rank": i} for i in range(rows)]
+    lookup = {"start": 0, "count": rows, "total": rows, "documents": documents, "searchString": "T"}
+    payload = json.dumps(lookup, separators=(",", ":"))
+    markup = "<div>" + "x" * padding + "</div>"
+    return f'<html>{markup}<script>root.App.main = {{"lookupData":{payload}}};</script>{markup}</html>'
+# End def make_page
+
+def load_pages(path):
+    """Recorded lookup pages: every .html file of a directory."""
+    pages = []
+    for filename in sorted(os.listdir(path)):
+        if filename.endswith(".html"):
+            with open(os.path.join(path, filename), encoding="utf-8") as f:
+                pages.append(f.read())
+    return pages
+# End def load_pages
+
+def bench(pages, repeat):
+    """Parse every page `repeat` times with both parsers and report the throughput."""
+    for name, parse in (("legacy find + eval", legacy_parse), ("parse_lookup", parse_lookup)):
+        try:
+            start = time.perf_counter()
+            for _ in range(repeat):
+                for page in pages:
+                    parse(page)
+            elapsed = time.perf_counter() - start
+        except Exception as e:
+            # eval chokes on the JSON literals (true, false, null) of real pages
+            print(f"{name:20s}  failed: {type(e).__name__}: {e}")
+            continue
+        size = sum(len(page) for page in pages) * repeat / 1e6
+        print(f"{name:20s}  {len(pages) * repeat / elapsed:9.1f} pages/s  {size / elapsed:7.1f} MB/s")
+# End def bench
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Lookup page parser micro-benchmark")
+    parser.add_argument("--pages", help="Directory of recorded lookup pages (.html), synthetic if omitted")
+    parser.add_argument("--rows", type=int, default=100, help="Documents per synthetic page")
+    parser.add_argument("--padding", type=int, default=500_000, help="Markup bytes around a synthetic page")
+    parser.add_argument("--count", type=int, default=20, help="Number of synthetic pages")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.pages:
+        pages = load_pages(args.pages)
+    else:
+        pages = [make_page(args.rows, args.padding) for _ in range(args.count)]
+    bench(pages, args.repeat)
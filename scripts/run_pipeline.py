@@ -1,53 +1,93 @@
-import os
-import json
+import argparse
 
 from financial_pipeline.importer.financial_data_importer import FinancialDataImporter
 from financial_pipeline.cleaner.financial_data_cleaner import FinancialDataCleaner
-from financial_pipeline.utils.helpers import insert_cleaned_financials
+from financial_pipeline.utils.helpers import insert_cleaned_financials, insert_company_records
+from financial_pipeline.utils.pipeline import stream_pipeline
+from financial_pipeline.storage.load_ledger import LoadLedger
 
 
 def run():
     importer = FinancialDataImporter()
     cleaner = FinancialDataCleaner()
 
-    # Example: load a local raw file (e.g., TTE.PA.json)
-    with open(os.path.join(importer.data_path, "TTE.PA.json"), "r", encoding="utf-8") as f:
-        raw_data = json.load(f)
+    # Example: load a local raw snapshot (e.g., TTE.PA.json)
+    raw_data = importer.raw_store.read("TTE.PA")
 
     cleaned_rows = cleaner.extract_all(raw_data, company_name="TTE.PA")
     insert_cleaned_financials(cleaned_rows)
 # End def run
 
-def run_all():
+def run_all(workers: int = None, full: bool = False):
+    """Download, then clean and load the snapshots changed since the last run (all of them with `full`)."""
     importer = FinancialDataImporter()
     cleaner = FinancialDataCleaner()
+    ledger = LoadLedger()
+    if full:
+        ledger.clear()
 
     importer.retrieve_data()
 
-    raw_dir = importer.data_path
-    json_files = [f for f in os.listdir(raw_dir) if f.endswith(".json")]
-    json_files.remove("yh_tickers.json")
-
-    cpt: int = 0
-    all_rows = []
-    for filename in json_files:
-        path = os.path.join(raw_dir, filename)
-
-        try:
-            with open(path, "r", encoding="utf-8") as f:
-                raw_data = json.load(f)
-            
-            company_name = filename.replace(".json", "")
-            cleaned_rows = cleaner.extract_all(raw_data, company_name)
-            all_rows.extend(cleaned_rows)
-
-            print(f"[✓] Cleaned and loaded {cpt+1}: {filename}", end="\r")
-            cpt += 1
-        except Exception as e:
-            print(f"[✗] Failed to process {filename}: {e}")
-
-    insert_cleaned_financials(all_rows)
+    paths = [importer.raw_store.path(ticker) for ticker in importer.raw_store.tickers()]
+    changed = ledger.changed(paths, cleaner.version)
+    cpt, errors = 0, []
+    for chunk in cleaner.extract_many(changed, workers=workers):
+        cpt += insert_company_records(chunk.records)
+        errors.extend(chunk.errors)
+        failed = {path for path, _ in chunk.errors}
+        ledger.record([path for path in chunk.paths if path not in failed], cleaner.version)
+        print(f"[✓] Cleaned and loaded {cpt} rows", end="\r")
+    ledger.close()
+
+    print(f"[✓] Cleaned and loaded {cpt} rows of {len(changed) - len(errors)} companies, "
+          f"skipped {len(paths) - len(changed)} unchanged snapshots")
+    for path, error in errors:
+        print(f"[✗] Failed to process {path}: {error}")
 # End def run_all
 
+def run_stream(fetch_workers: int = 8, batch_size: int = 500):
+    """Same as `run_all`, but companies are stored while the others are still downloading."""
+    importer = FinancialDataImporter()
+    cleaner = FinancialDataCleaner()
+
+    counts = stream_pipeline(importer, cleaner, importer.retrieve_tickers(),
+                             fetch_workers=fetch_workers, batch_size=batch_size)
+    print(f"[✓] Stored {counts['rows']} rows of {counts['cleaned']} companies, {counts['failed']} failed")
+# End def run_stream
+
+def run_prices():
+    """Intraday refresh of the share prices of every stored company."""
+    importer = FinancialDataImporter()
+    prices = importer.refresh_prices()
+    print(f"[✓] Refreshed {len(prices)} share prices")
+# End def run_prices
+
+def run_queue(queue_path: str, join: bool = False, processes: int = 4):
+    """Import through a work queue shared by the machines mounting `queue_path`."""
+    importer = FinancialDataImporter()
+    if join:
+        counts = importer.join_queue(queue_path)
+    else:
+        counts = importer.queued_retrieve_data(processes=processes, queue_path=queue_path)
+    print(f"[✓] Queue import finished: {counts}")
+# End def run_queue
+
 if __name__ == "__main__":
-    run_all()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Download, clean and store the financials of every ticker")
+    parser.add_argument("--stream", action="store_true", help="stream tickers through fetch, clean and store")
+    parser.add_argument("--prices", action="store_true", help="only refresh the share prices")
+    parser.add_argument("--workers", type=int, default=8, help="fetcher threads in streaming mode")
+    parser.add_argument("--queue", help="import through this shared work queue file")
+    parser.add_argument("--join", action="store_true", help="only work on the queue, without filling it")
+    parser.add_argument("--processes", type=int, default=4, help="worker processes in queue mode")
+    parser.add_argument("--full", action="store_true", help="clean every snapshot, even those already loaded")
+    args = parser.parse_args()
+
+    if args.queue:
+        run_queue(args.queue, join=args.join, processes=args.processes)
+    elif args.prices:
+        run_prices()
+    elif args.stream:
+        run_stream(fetch_workers=args.workers)
+    else:
+        run_all(full=args.full)
\ No newline at end of file
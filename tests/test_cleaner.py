@@ -1,6 +1,9 @@
+import os
+import tempfile
 import unittest
 
 from financial_pipeline.cleaner.financial_data_cleaner import FinancialDataCleaner
+from financial_pipeline.importer.raw_store import get_raw_store
 
 
 class TestFinancialDataCleaner(unittest.TestCase):
@@ -107,6 +110,81 @@ class TestFinancialDataCleaner(unittest.TestCase):
         self.assertIsNone(row["dividends"])
     # End def test_missing_data
 
+    def test_extract_all_multiple_years(self):
+        raw_data = {
+            "incomestmt": {
+                "Operating Revenue": {"2023-12-31": 300.0, "2022-12-31": 200.0, "2021-12-31": 100.0},
+                "Basic EPS": {"2023-12-31": 3.0, "2021-12-31": 1.0},
+            },
+            "balancesheet": {
+                "Current Assets": {"2023-12-31": 30.0, "2022-12-31": 20.0},
+                "Other Current Assets": {"2022-12-31": 2.0},
+            },
+            "dividends": {f"{year}-{month:02d}-15": 0.25 for year in (2021, 2023) for month in (3, 6, 9, 12)},
+        }
+        rows = {row["year"]: row for row in self.cleaner.extract_all(raw_data, "LongCorp")}
+
+        self.assertEqual(list(rows), [2023, 2022, 2021])
+        self.assertEqual([rows[year]["sales"] for year in rows], [300.0, 200.0, 100.0])
+        self.assertEqual([rows[year]["eps"] for year in rows], [3.0, None, 1.0])
+        self.assertEqual([rows[year]["current_assets"] for year in rows], [30.0, 22.0, None])
+        self.assertEqual([rows[year]["dividends"] for year in rows], [1.0, None, 1.0])
+    # End def test_extract_all_multiple_years
+
+    def test_extract_company_is_columnar(self):
+        record = self.cleaner.extract_company(self.raw_data, "TestCorp")
+
+        self.assertEqual(record.company["country"], "France")
+        self.assertEqual(record.financials["year"].tolist(), [2023])
+        self.assertEqual(record.financials["period_end"].tolist(), ["2023-12-31"])
+        self.assertEqual(record.financials.loc[0, "current_assets"], 6000000.0)
+        self.assertEqual(record.to_rows(), self.cleaner.extract_all(self.raw_data, "TestCorp"))
+        self.assertIsNone(self.cleaner.extract_company({"dividends": {}}, "EmptyCorp"))
+    # End def test_extract_company_is_columnar
+
+    def test_extract_many_over_processes(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            get_raw_store("json", tmp_dir).write("AAA.PA", self.raw_data)
+            get_raw_store("json.gz", tmp_dir).write("BBB.PA", self.raw_data)
+            broken = os.path.join(tmp_dir, "CCC.PA.json")
+            with open(broken, "w") as f:
+                f.write("{not json")
+            paths = [os.path.join(tmp_dir, name) for name in ("AAA.PA.json", "BBB.PA.json.gz")] + [broken]
+
+            for workers in (1, 2):
+                chunks = list(self.cleaner.extract_many(paths, workers=workers, chunk_size=2))
+                self.assertEqual(len(chunks), 2)
+                self.assertEqual([record.name for chunk in chunks for record in chunk.records], ["AAA.PA", "BBB.PA"])
+                self.assertEqual(chunks[1].errors[0][0], broken)
+                self.assertTrue(chunks[1].errors[0][1].startswith("JSONDecodeError"))
+    # End def test_extract_many_over_processes
+
+    def test_quarters_roll_into_ttm(self):
+        periods = ["2023-03-31", "2023-06-30", "2023-09-30", "2023-12-31", "2024-03-31", "2024-09-30"]
+        raw_data = {
+            "quarterly_incomestmt": {
+                "Total Revenue": {period: 10.0 for period in periods},
+                "Net Income Continuous Operations": {period: 1.0 for period in periods},
+                "Basic EPS": {period: 0.5 for period in periods if period != "2023-06-30"},
+            },
+            "quarterly_balancesheet": {"Stockholders Equity": {"2024-09-30": 70.0}},
+        }
+        quarters = self.cleaner.extract_quarters(raw_data)
+
+        self.assertEqual(quarters.columns.tolist(), self.cleaner.quarterly_columns)
+        self.assertEqual(quarters["period"].tolist(), periods)
+        # Four consecutive quarters are needed; the 2024-06-30 quarter is missing
+        self.assertEqual(quarters["ttm_sales"].fillna(-1).tolist(), [-1, -1, -1, 40.0, 40.0, -1])
+        self.assertEqual(quarters["ttm_eps"].fillna(-1).tolist(), [-1, -1, -1, -1, -1, -1])
+        self.assertEqual(quarters["equity"].iloc[-1], 70.0)
+        self.assertIsNone(self.cleaner.extract_quarters(self.raw_data))
+
+        # A company with quarters but no fiscal year yet keeps its quarters
+        record = self.cleaner.extract_company(raw_data, "NewCorp")
+        self.assertTrue(record.financials.empty)
+        self.assertEqual(record.quarters["period"].tolist(), periods)
+    # End def test_quarters_roll_into_ttm
+
     def test_nan_values(self):
         pass
     # End def test_nan_values
@@ -0,0 +1,82 @@
+import os
+import json
+import tempfile
+import unittest
+
+import pandas as pd
+
+from financial_pipeline.cleaner.field_mapping import FieldMapping
+from financial_pipeline.cleaner.financial_data_cleaner import FinancialDataCleaner
+
+SPEC = {
+    "sales": {"statement": "incomestmt", "items": ["Operating Revenue"], "fallbacks": [["Total Revenue"]]},
+    "net_debt": {"statement": "balancesheet", "items": ["Total Debt", "-Cash And Cash Equivalents"]},
+    "capex": {"statement": "cashflow", "items": ["Capital Expenditure"], "sign": -1},
+}
+
+RAW_DATA = {
+    "incomestmt": {
+        "Operating Revenue": {"2023-12-31": 100.0, "2022-12-31": float("nan")},
+        "Total Revenue": {"2023-12-31": 110.0, "2022-12-31": 90.0},
+    },
+    "balancesheet": {
+        "Total Debt": {"2023-12-31": 50.0},
+        "Cash And Cash Equivalents": {"2023-12-31": 20.0, "2022-12-31": 10.0},
+    },
+    "cashflow": {"Capital Expenditure": {"2023-12-31": -7.0}},
+}
+
+
+class TestFieldMapping(unittest.TestCase):
+    def setUp(self):
+        self.mapping = FieldMapping(SPEC)
+    # End def setUp
+
+    def test_sums_fallbacks_and_signs(self):
+        cleaner = FinancialDataCleaner(self.mapping)
+        rows = {row["year"]: row for row in cleaner.extract_all(RAW_DATA, "TestCorp")}
+
+        self.assertEqual(rows[2023]["sales"], 100.0)
+        self.assertEqual(rows[2022]["sales"], 90.0)     # Operating Revenue is NaN that year
+        self.assertEqual(rows[2023]["net_debt"], 30.0)
+        self.assertIsNone(rows[2022]["net_debt"])     # Total Debt is missing that year
+        self.assertEqual(rows[2023]["capex"], 7.0)
+        self.assertIsNone(rows[2022]["capex"])
+        self.assertEqual(cleaner.columns, ["year", "period_end", "share_price", "shares_issued", "sales", "net_debt", "capex",
+                                           "dividends"])
+    # End def test_sums_fallbacks_and_signs
+
+    def test_extract_frame_matches_evaluate(self):
+        records = [("T", statement, item, date, value)
+                   for statement in ("incomestmt", "balancesheet", "cashflow")
+                   for item, series in RAW_DATA[statement].items()
+                   for date, value in series.items() if value == value]
+        frame = pd.DataFrame(records, columns=["ticker", "statement", "line_item", "period", "value"])
+        frame["year"] = frame["period"].str[:4]
+
+        result = self.mapping.extract_frame(frame, ["ticker", "year"])
+        self.assertEqual(result.loc[("T", "2022"), "sales"], 90.0)
+        self.assertEqual(result.loc[("T", "2023"), "sales"], 100.0)
+        self.assertTrue(pd.isna(result.loc[("T", "2022"), "net_debt"]))
+        self.assertEqual(result.loc[("T", "2023"), "net_debt"], 30.0)
+        self.assertEqual(result.loc[("T", "2023"), "capex"], 7.0)
+    # End def test_extract_frame_matches_evaluate
+
+    def test_load_and_validate(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "mapping.json")
+            with open(path, "w") as f:
+                json.dump(SPEC, f)
+            cleaner = FinancialDataCleaner(path)
+        self.assertEqual(cleaner.mapping.columns, ["sales", "net_debt", "capex"])
+        self.assertIn("Cash And Cash Equivalents", cleaner.mapping.line_items())
+
+        self.assertRaises(ValueError, FieldMapping, {"sales": {"statement": "incomestmt"}})
+        self.assertRaises(ValueError, FieldMapping, {"sales": {"statement": "incomestmt", "items": ["A"], "sign": 2}})
+        self.assertRaises(ValueError, FieldMapping, {"sales": {"statement": "incomestmt", "items": ["A"], "sum": []}})
+    # End def test_load_and_validate
+# End class TestFieldMapping
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -120,6 +120,38 @@ class TestGrahamEvaluator(unittest.TestCase):
         result = self.evaluator._check_bonus_rule(self.df)
         self.assertFalse(result["passed"])
     # End def test_bonus_rule_per_times_pbr
+
+    def test_ttm_replaces_latest_year(self):
+        self.evaluator.db = MagicMock()
+        self.evaluator.db.get_period_end.return_value = None
+        self.evaluator.db.get_latest_ttm.return_value = {
+            "period": "2024-06-30", "ttm_sales": 300_000_000, "ttm_net_income": 12_000_000,
+            "ttm_eps": 15.0, "equity": 160_000_000,
+        }
+        df = self.evaluator._apply_ttm(self.df, self.company_name)
+
+        self.assertEqual(df.iloc[-1]["sales"], 300_000_000)
+        self.assertEqual(df.iloc[-1]["equity"], 160_000_000)
+        self.assertEqual(df.iloc[-1]["eps"], 15.0)
+        self.assertEqual(df.iloc[-2]["sales"], 200_000_000)
+
+        # Without a date, the fiscal year ends on December 31: TTM figures ending before are not applied
+        self.evaluator.db.get_latest_ttm.return_value["period"] = "2023-09-30"
+        df = self.evaluator._apply_ttm(self.df, self.company_name)
+        self.assertEqual(df.iloc[-1]["sales"], 200_000_000)
+
+        # With a fiscal year ending in June, the same figures are more recent
+        self.evaluator.db.get_period_end.return_value = "2023-06-30"
+        df = self.evaluator._apply_ttm(self.df, self.company_name)
+        self.assertEqual(df.iloc[-1]["sales"], 300_000_000)
+        self.evaluator.db.get_period_end.assert_called_with(self.company_name, 2023)
+
+        # Figures are applied all together or not at all
+        self.evaluator.db.get_latest_ttm.return_value.update(period="2024-06-30", ttm_eps=None)
+        df = self.evaluator._apply_ttm(self.df, self.company_name)
+        self.assertEqual(df.iloc[-1]["sales"], 200_000_000)
+        self.assertEqual(df.iloc[-1]["eps"], self.df.iloc[-1]["eps"])
+    # End def test_ttm_replaces_latest_year
 # End class TestGrahamEvaluator
 
 if __name__ == "__main__":
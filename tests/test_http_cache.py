@@ -0,0 +1,121 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from curl_cffi import requests
+
+from financial_pipeline.importer.data_sources import YahooDataSource
+from financial_pipeline.importer.http_cache import CachedSession, HttpCache, cache_key
+
+URL = "https://query2.finance.yahoo.com/v10/finance/quoteSummary/TTE.PA"
+
+
+def make_response(url, status=200, body=b'{"price": 1}', headers=None):
+    response = requests.Response()
+    response.url = url
+    response.status_code = status
+    response.headers = requests.Headers(headers or {})
+    response.content = body
+    return response
+
+
+class TestHttpCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache = HttpCache(os.path.join(self.tmp_dir.name, "http_cache.db"))
+        self.session = CachedSession(self.cache)
+    # End def setUp
+
+    def tearDown(self):
+        self.session.close()
+        self.cache.close()
+        self.tmp_dir.cleanup()
+    # End def tearDown
+
+    @patch.object(requests.Session, "request")
+    def test_fresh_responses_are_served_from_disk(self, mock_request):
+        mock_request.return_value = make_response(URL)
+
+        first = self.session.get(URL, params={"modules": "price", "crumb": "abc"})
+        second = self.session.get(URL, params={"crumb": "xyz", "modules": "price"})
+
+        self.assertEqual(mock_request.call_count, 1)
+        self.assertFalse(first.from_cache)
+        self.assertTrue(second.from_cache)
+        self.assertEqual(second.json(), {"price": 1})
+    # End def test_fresh_responses_are_served_from_disk
+
+    @patch.object(requests.Session, "request")
+    def test_stale_responses_are_revalidated(self, mock_request):
+        mock_request.return_value = make_response(URL, headers={"ETag": '"v1"'})
+        self.session.get(URL)
+        self.cache.cursor.execute("UPDATE responses SET expires_at = 0")
+
+        mock_request.return_value = make_response(URL, status=304, body=b"")
+        response = self.session.get(URL)
+
+        self.assertEqual(mock_request.call_args.kwargs["headers"], {"If-None-Match": '"v1"'})
+        self.assertTrue(response.from_cache)
+        self.assertEqual(response.json(), {"price": 1})
+        self.assertTrue(self.cache.get(cache_key("GET", URL))["fresh"])
+    # End def test_stale_responses_are_revalidated
+
+    @patch.object(requests.Session, "request")
+    def test_session_bound_endpoints_are_not_cached(self, mock_request):
+        mock_request.return_value = make_response("https://query1.finance.yahoo.com/v1/test/getcrumb")
+        self.session.get("https://query1.finance.yahoo.com/v1/test/getcrumb")
+        self.session.get("https://query1.finance.yahoo.com/v1/test/getcrumb")
+
+        self.assertEqual(mock_request.call_count, 2)
+        self.assertEqual(len(self.cache), 0)
+    # End def test_session_bound_endpoints_are_not_cached
+
+    @patch.object(requests.Session, "request")
+    def test_yfinance_accepts_the_session(self, mock_request):
+        mock_request.return_value = make_response(URL)
+        handle = YahooDataSource().open("TTE.PA", session=self.session)
+
+        # yfinance talks through the cached session instead of refusing it
+        self.assertIs(handle._data._session, self.session)
+        handle._data._session.get(URL)
+        handle._data._session.get(URL)
+        self.assertEqual(mock_request.call_count, 1)
+    # End def test_yfinance_accepts_the_session
+
+    def test_least_recently_used_are_evicted(self):
+        self.cache.max_bytes = 20
+        for ticker in ("A", "B", "C"):
+            self.cache.put(ticker, make_response(f"{URL}?s={ticker}", body=b"0123456789"))
+            self.cache.get("A")
+
+        self.assertIsNotNone(self.cache.get("A"))
+        self.assertIsNone(self.cache.get("B"))
+        self.assertEqual(len(self.cache), 2)
+        self.assertEqual(self.cache.size(), 20)
+
+        # Replacing a response counts its new size only, clearing resets the total
+        self.cache.put("A", make_response(f"{URL}?s=A", body=b"01234"))
+        self.assertEqual(self.cache.size(), 15)
+        self.cache.clear()
+        self.assertEqual(self.cache.size(), 0)
+    # End def test_least_recently_used_are_evicted
+
+    def test_hits_do_not_write(self):
+        self.cache.put("A", make_response(f"{URL}?s=A"))
+        changes = self.cache.conn.total_changes
+        for _ in range(10):
+            self.assertIsNotNone(self.cache.get("A"))
+        self.assertEqual(self.cache.conn.total_changes, changes)
+
+        # The buffered access time is written with the next insert
+        accessed_at = self.cache._accessed["A"]
+        self.cache.put("B", make_response(f"{URL}?s=B"))
+        self.cache.cursor.execute("SELECT accessed_at FROM responses WHERE key = 'A'")
+        self.assertEqual(self.cache.cursor.fetchone()[0], accessed_at)
+    # End def test_hits_do_not_write
+# End class TestHttpCache
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,17 +1,44 @@
 import os
+import json
+import tempfile
 import unittest
 from pathlib import Path
-from unittest.mock import patch, mock_open, MagicMock
+from unittest.mock import patch, mock_open, MagicMock, PropertyMock
 
+from financial_pipeline.importer.data_sources import SECTIONS, ReplayDataSource, ReplayError, YahooDataSource, convert_timestamp
 from financial_pipeline.importer.financial_data_importer import FinancialDataImporter
+from financial_pipeline.importer.sharded_import import ImportCheckpoint
+from financial_pipeline.importer.telemetry import percentile
+from financial_pipeline.cleaner.financial_data_cleaner import FinancialDataCleaner
+from financial_pipeline.cleaner.validator import FinancialValidator
+from financial_pipeline.storage.company_storage import CompanyStorage
+from financial_pipeline.utils.pipeline import stream_pipeline
 
 
 class TestFinancialDataImporter(unittest.TestCase):
     
     def setUp(self):
-        self.importer = FinancialDataImporter(ticker_source="mock_tickers.json", data_path="test_data/")
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.importer = FinancialDataImporter(ticker_source="mock_tickers.json", data_path=self.tmp_dir.name)
     # End def setUp
 
+    def tearDown(self):
+        self.importer.manifest.close()
+        self.tmp_dir.cleanup()
+    # End def tearDown
+
+    def _mock_ticker(self):
+        mock_ticker = MagicMock()
+        mock_ticker.info = {"some": "data"}
+        mock_ticker.isin = "ISIN123"
+        mock_ticker.incomestmt.to_dict.return_value = {}
+        mock_ticker.balancesheet.to_dict.return_value = {}
+        mock_ticker.quarterly_incomestmt.to_dict.return_value = {}
+        mock_ticker.quarterly_balancesheet.to_dict.return_value = {}
+        mock_ticker.dividends.items.return_value = []
+        return mock_ticker
+    # End def _mock_ticker
+
     @patch("os.path.exists", return_value=False)
     def test_retrieve_tickers_returns_default_if_file_missing(self, mock_exists):
         """Mocks os.path.exists() to simulate missing ticker file"""
@@ -31,9 +58,10 @@ class TestFinancialDataImporter(unittest.TestCase):
         self.assertEqual(tickers, ["TTE.PA"])
     # End def test_retrieve_tickers_from_file
 
-    @patch("financial_pipeline.importer.financial_data_importer.yf.Ticker")
+    @patch("financial_pipeline.importer.data_sources.yf.Ticker")
+    @patch("financial_pipeline.importer.raw_store.os.replace")
     @patch("builtins.open", new_callable=mock_open)
-    def test_fetch_ticker_data_success(self, mock_file, mock_yf):
+    def test_fetch_ticker_data_success(self, mock_file, mock_replace, mock_yf):
         """Mocks yfinance.Ticker to simulate a successful fetch"""
 
         mock_ticker = MagicMock()
@@ -41,16 +69,46 @@ class TestFinancialDataImporter(unittest.TestCase):
         mock_ticker.isin = "ISIN123"
         mock_ticker.incomestmt.to_dict.return_value = {}
         mock_ticker.balancesheet.to_dict.return_value = {}
+        mock_ticker.quarterly_incomestmt.to_dict.return_value = {}
+        mock_ticker.quarterly_balancesheet.to_dict.return_value = {}
         mock_ticker.dividends.items.return_value = []
 
         mock_yf.return_value = mock_ticker
 
         self.importer._fetch_ticker_data("TTE.PA")
-        mock_file.assert_called_with(os.path.join("test_data/", "TTE.PA.json"), "w", encoding="utf-8")
+        path = os.path.join(self.tmp_dir.name, "TTE.PA.json")
+        mock_file.assert_called_with(f"{path}.tmp", "wb")
         mock_file().write.assert_called()
+        mock_replace.assert_called_with(f"{path}.tmp", path)
     # End def test_fetch_ticker_data_success
 
-    @patch("financial_pipeline.importer.financial_data_importer.yf.Ticker", side_effect=Exception("fetch error"))
+    @patch("financial_pipeline.importer.data_sources.yf.Ticker")
+    def test_fetch_ticker_data_skips_fresh_sections(self, mock_yf):
+        """A second fetch within the TTLs downloads nothing, an expired section is merged in place"""
+
+        mock_yf.return_value = self._mock_ticker()
+
+        self.importer._fetch_ticker_data("TTE.PA")
+        self.importer._fetch_ticker_data("TTE.PA")
+        self.assertEqual(mock_yf.call_count, 1)
+        self.assertEqual(set(self.importer.manifest.get("TTE.PA")), set(SECTIONS))
+
+        # Expire the price-bearing info section only
+        self.importer.manifest.ttl["info"] = 0
+        mock_yf.return_value.info = {"regularMarketPrice": 10.0}
+        mock_yf.return_value.isin = "CHANGED"
+        self.importer._fetch_ticker_data("TTE.PA")
+        self.assertEqual(mock_yf.call_count, 2)
+
+        with open(os.path.join(self.tmp_dir.name, "TTE.PA.json"), encoding="utf-8") as f:
+            snapshot = json.load(f)
+        self.assertEqual(snapshot["regularMarketPrice"], 10.0)
+        self.assertNotIn("some", snapshot)
+        self.assertEqual(snapshot["isin"], "ISIN123")
+        self.assertIn("incomestmt", snapshot)
+    # End def test_fetch_ticker_data_skips_fresh_sections
+
+    @patch("financial_pipeline.importer.data_sources.yf.Ticker", side_effect=Exception("fetch error"))
     @patch("builtins.open", new_callable=mock_open)
     @patch("financial_pipeline.importer.financial_data_importer.logger")
     def test_fetch_ticker_data_handles_error(self, mock_logger, mock_file, mock_yf):
@@ -60,6 +118,285 @@ class TestFinancialDataImporter(unittest.TestCase):
         mock_logger.error.assert_called()
     # End def test_fetch_ticker_data_handles_error
 
+    @patch("financial_pipeline.importer.data_sources.yf.Ticker")
+    def test_async_retrieve_data_overlaps_sections(self, mock_yf):
+        """Every ticker is written once, with all sections merged in the snapshot"""
+
+        mock_yf.return_value = self._mock_ticker()
+
+        with patch.object(self.importer, "_write_snapshot", return_value=0) as mock_write:
+            self.importer.async_retrieve_data(["TTE.PA", "AI.PA"], concurrency=2)
+
+        written = {call.args[0]: call.args[1] for call in mock_write.call_args_list}
+        self.assertEqual(set(written), {"TTE.PA", "AI.PA"})
+        self.assertEqual(written["TTE.PA"]["isin"], "ISIN123")
+        self.assertEqual(written["TTE.PA"]["some"], "data")
+        self.assertEqual(len(self.importer.session), 1)
+    # End def test_async_retrieve_data_overlaps_sections
+
+    @patch("financial_pipeline.importer.data_sources.yf.Ticker")
+    def test_retry_failed_redrives_dead_letters(self, mock_yf):
+        """Failed tickers land in the dead-letter list and only they are retried"""
+
+        self.importer.retry_policy.max_attempts = 1
+        mock_yf.return_value = self._mock_ticker()
+        type(mock_yf.return_value).info = PropertyMock(side_effect=[Exception("429"), {"some": "data"}])
+
+        self.importer.retrieve_data(["TTE.PA"])
+        self.assertIn("TTE.PA", self.importer.dead_letters)
+
+        self.assertEqual(self.importer.retry_failed(), [])
+        self.assertEqual(len(self.importer.dead_letters), 0)
+        self.assertEqual(mock_yf.call_count, 2)
+    # End def test_retry_failed_redrives_dead_letters
+
+    def _replay_importer(self, **kwargs):
+        fixtures = os.path.join(self.tmp_dir.name, "fixtures")
+        recorder = FinancialDataImporter(data_path=fixtures)
+        recorder.raw_store.write("TTE.PA", {"isin": "FR0000120271", "regularMarketPrice": 52.5,
+                                            "incomestmt": {"Basic EPS": {"2023-12-31": 1.2}},
+                                            "balancesheet": {}, "dividends": {"2023-01-10": 0.5}})
+        recorder.raw_store.write("TTE", {"isin": "FR0000120271", "regularMarketPrice": 57.1,
+                                         "incomestmt": {"Basic EPS": {"2023-12-31": 1.3}},
+                                         "balancesheet": {}, "dividends": {}})
+        recorder.manifest.close()
+
+        source = ReplayDataSource(fixtures, seed=0, **kwargs)
+        return FinancialDataImporter(data_path=os.path.join(self.tmp_dir.name, "raw"), source=source, max_attempts=1)
+    # End def _replay_importer
+
+    def test_replay_source_serves_recordings(self):
+        """The replay source rebuilds the recorded snapshot without the network"""
+
+        importer = self._replay_importer(latency=(0.0, 0.001))
+        importer.async_retrieve_data(["TTE.PA"], concurrency=2)
+        importer.retrieve_data(["UNKNOWN"])
+
+        self.assertEqual(importer.raw_store.read("TTE.PA")["regularMarketPrice"], 52.5)
+        self.assertEqual(importer.raw_store.read("TTE.PA")["incomestmt"], {"Basic EPS": {"2023-12-31": 1.2}})
+        self.assertEqual(importer.dead_letters.tickers(), ["UNKNOWN"])
+
+        # A dead letter whose snapshot is now fresh is discarded without a download
+        importer.dead_letters.add("TTE.PA", Exception("429"))
+        importer.retrieve_data(["TTE.PA"])
+        importer.async_retrieve_data(["UNKNOWN"], concurrency=1)
+        self.assertEqual(importer.dead_letters.tickers(), ["UNKNOWN"])
+        importer.manifest.close()
+    # End def test_replay_source_serves_recordings
+
+    def test_replay_source_injects_errors_and_throttling(self):
+        """Injected errors and throttling surface like real download failures"""
+
+        importer = self._replay_importer(error_rate=1.0)
+        importer.retrieve_data(["TTE.PA"])
+        self.assertIn("TTE.PA", importer.dead_letters)
+        importer.manifest.close()
+
+        source = ReplayDataSource(os.path.join(self.tmp_dir.name, "fixtures"), max_rps=2)
+        source.fetch("TTE.PA", "isin")
+        source.fetch("TTE.PA", "isin")
+        self.assertRaises(ReplayError, source.fetch, "TTE.PA", "isin")
+    # End def test_replay_source_injects_errors_and_throttling
+
+    @patch("financial_pipeline.importer.resilience.time.sleep")
+    def test_bad_tickers_do_not_open_the_circuit(self, mock_sleep):
+        """Unknown tickers are answered by the host, so the healthy ones after them still download"""
+
+        importer = self._replay_importer()
+        importer.retry_policy.max_attempts = 4
+        importer.retrieve_data(["DEAD1", "DEAD2", "DEAD3", "TTE.PA", "TTE"])
+
+        self.assertEqual(importer.circuit_breaker.state("replay"), "closed")
+        self.assertTrue(importer.raw_store.exists("TTE.PA"))
+        self.assertTrue(importer.raw_store.exists("TTE"))
+        self.assertEqual(sorted(importer.dead_letters.tickers()), ["DEAD1", "DEAD2", "DEAD3"])
+        importer.manifest.close()
+    # End def test_bad_tickers_do_not_open_the_circuit
+
+    def test_selected_sections_are_merged(self):
+        """Each selected section is merged into the stored snapshot, `price` comes from quotes"""
+
+        importer = self._replay_importer()
+        importer.retrieve_data(["TTE.PA"], sections={"income"})
+        self.assertEqual(set(importer.raw_store.read("TTE.PA")), {"incomestmt"})
+
+        with patch.object(importer.source, "fetch", wraps=importer.source.fetch) as mock_fetch:
+            importer.async_retrieve_data(["TTE.PA"], sections=["dividends", "price"])
+        self.assertEqual([call.args[1] for call in mock_fetch.call_args_list], ["dividends"])
+
+        snapshot = importer.raw_store.read("TTE.PA")
+        self.assertEqual(snapshot["incomestmt"], {"Basic EPS": {"2023-12-31": 1.2}})
+        self.assertEqual(snapshot["dividends"], {"2023-01-10": 0.5})
+        self.assertEqual(snapshot["regularMarketPrice"], 52.5)
+        self.assertEqual(importer._sections_to_fetch("TTE.PA", sections=["incomestmt", "balancesheet"]),
+                         ["balancesheet"])
+        self.assertRaises(ValueError, importer.retrieve_data, ["TTE.PA"], sections=["prices"])
+        importer.manifest.close()
+    # End def test_selected_sections_are_merged
+
+    def test_secondary_listings_skip_statements(self):
+        """A listing whose ISIN is already listed on its home market only gets its quote"""
+
+        importer = self._replay_importer()
+        importer.retrieve_data(["TTE.PA"])
+        importer.async_retrieve_data(["TTE"], concurrency=2)
+
+        self.assertEqual(importer.registry.primary_of("TTE"), "TTE.PA")
+        self.assertIn("incomestmt", importer.raw_store.read("TTE.PA"))
+        snapshot = importer.raw_store.read("TTE")
+        self.assertEqual(snapshot["regularMarketPrice"], 57.1)
+        self.assertNotIn("incomestmt", snapshot)
+        self.assertEqual(importer._sections_to_fetch("TTE", force=True), ["info", "isin"])
+        importer.manifest.close()
+    # End def test_secondary_listings_skip_statements
+
+    def test_sharded_import_resumes_from_checkpoint(self):
+        """A sharded import only processes the tickers not done in a previous run"""
+
+        importer = self._replay_importer()
+        state_path = os.path.join(self.tmp_dir.name, "state.db")
+        checkpoint = ImportCheckpoint(state_path)
+        checkpoint.plan(["STALE.PA", "TTE.PA", "UNKNOWN", "DONE.PA"])
+        checkpoint.mark("DONE.PA", "done")
+        self.assertEqual(checkpoint.remaining(["TTE.PA", "UNKNOWN", "DONE.PA"]), ["TTE.PA", "UNKNOWN"])
+        checkpoint.close()
+
+        counts = importer.sharded_retrieve_data(["TTE.PA", "UNKNOWN", "DONE.PA"], processes=2,
+                                                concurrency=2, state_path=state_path)
+        self.assertEqual(counts, {"done": 2, "failed": 1})
+        self.assertTrue(importer.raw_store.exists("TTE.PA"))
+        self.assertFalse(importer.raw_store.exists("DONE.PA"))
+        self.assertFalse(importer.raw_store.exists("STALE.PA"))
+        self.assertEqual(importer.dead_letters.tickers(), ["UNKNOWN"])
+        importer.manifest.close()
+    # End def test_sharded_import_resumes_from_checkpoint
+
+    def test_queued_import_drains_the_queue(self):
+        """Workers import every queued ticker and record failures in the queue"""
+
+        importer = self._replay_importer()
+        queue_path = os.path.join(self.tmp_dir.name, "queue.db")
+        counts = importer.queued_retrieve_data(["TTE.PA", "UNKNOWN"], processes=1, concurrency=2,
+                                               queue_path=queue_path)
+        self.assertEqual(counts, {"done": 1, "failed": 1})
+        self.assertTrue(importer.raw_store.exists("TTE.PA"))
+        self.assertEqual(importer.join_queue(queue_path), {"done": 0, "failed": 0, "lost": 0})
+
+        # A second run on the same queue file imports its tickers again, and only counts them
+        os.remove(importer.raw_store.path("TTE.PA"))
+        counts = importer.queued_retrieve_data(["TTE.PA"], processes=1, concurrency=2, queue_path=queue_path,
+                                               force=True)
+        self.assertEqual(counts, {"done": 1})
+        self.assertTrue(importer.raw_store.exists("TTE.PA"))
+        importer.manifest.close()
+    # End def test_queued_import_drains_the_queue
+
+    def test_stream_pipeline_stores_while_fetching(self):
+        """Tickers flow through fetch, clean and store, failures are counted and skipped"""
+
+        importer = self._replay_importer()
+        db_path = os.path.join(self.tmp_dir.name, "companies.db")
+        counts = stream_pipeline(importer, FinancialDataCleaner(), ["TTE.PA", "UNKNOWN"], db_path=db_path,
+                                 fetch_workers=2, queue_size=1, batch_size=1,
+                                 validator=FinancialValidator(required=["eps"]))
+        importer.manifest.close()
+
+        self.assertEqual(counts, {"fetched": 1, "failed": 1, "cleaned": 1, "rows": 1, "quarantined": 0})
+        storage = CompanyStorage(db_path)
+        self.assertEqual(storage.get_financials("TTE.PA")[0][3], 2023)
+        storage.close()
+    # End def test_stream_pipeline_stores_while_fetching
+
+    def test_stream_pipeline_ends_when_the_clean_stage_dies(self):
+        """The writer stores what reached it and the pipeline raises the error the clean stage died of"""
+
+        class StageKilled(BaseException):
+            pass
+        # End class StageKilled
+
+        importer = self._replay_importer()
+        cleaner = FinancialDataCleaner()
+        calls = []
+
+        def extract_company(snapshot, ticker):
+            calls.append(ticker)
+            if len(calls) > 1:
+                raise StageKilled("cleaner crashed")
+            return FinancialDataCleaner.extract_company(cleaner, snapshot, ticker)
+        # End def extract_company
+
+        cleaner.extract_company = extract_company
+        db_path = os.path.join(self.tmp_dir.name, "companies.db")
+        with self.assertLogs("financial_pipeline.utils.pipeline", level="ERROR") as logs:
+            with self.assertRaises(StageKilled):
+                stream_pipeline(importer, cleaner, ["TTE.PA", "TTE"], db_path=db_path, fetch_workers=1,
+                                validator=FinancialValidator(required=["eps"]))
+        importer.manifest.close()
+
+        self.assertIn("Clean stage failed", logs.output[0])
+        storage = CompanyStorage(db_path)
+        self.assertEqual(storage.get_financials("TTE.PA")[0][3], 2023)
+        storage.close()
+    # End def test_stream_pipeline_ends_when_the_clean_stage_dies
+
+    def test_refresh_prices_updates_latest_year(self):
+        """Batched quotes only touch the share price of the latest year"""
+
+        importer = self._replay_importer()
+        db_path = os.path.join(self.tmp_dir.name, "companies.db")
+        storage = CompanyStorage(db_path)
+        storage.insert_rows([{"name": "TTE.PA", "year": year, "share_price": 40.0, "sales": 1.0} for year in (2022, 2023)])
+
+        prices = importer.refresh_prices(["TTE.PA", "UNKNOWN"], batch_size=1, db_path=db_path)
+        importer.manifest.close()
+
+        self.assertEqual(prices, {"TTE.PA": 52.5})
+        self.assertEqual([(row[3], row[4], row[5]) for row in storage.get_financials("TTE.PA")],
+                         [(2022, 40.0, 1.0), (2023, 52.5, 1.0)])
+        storage.close()
+    # End def test_refresh_prices_updates_latest_year
+
+    def test_run_report_summarizes_telemetry(self):
+        """Each run writes a report with latencies, per-exchange counts and errors"""
+
+        importer = self._replay_importer()
+        importer.retrieve_data(["TTE.PA", "UNKNOWN"])
+        importer.manifest.close()
+
+        reports = os.listdir(importer.reports_path)
+        self.assertEqual(len(reports), 1)
+        with open(os.path.join(importer.reports_path, reports[0]), encoding="utf-8") as f:
+            report = json.load(f)
+
+        self.assertEqual(report["status"], {"ok": 1, "failed": 1})
+        self.assertEqual(report["errors"]["by_type"], {"ReplayError": 1})
+        self.assertEqual(report["exchanges"]["PA"]["ok"], 1)
+        self.assertEqual(report["latency_s"]["incomestmt"]["count"], 1)
+        self.assertGreater(report["bytes_written"], 0)
+        self.assertEqual(percentile([4, 1, 3, 2], 50), 2)
+        self.assertEqual(percentile(list(range(1, 101)), 99), 99)
+
+        # A record finished twice keeps the last outcome, and a second run gets its own report
+        record = importer.telemetry.start("TTE.PA")
+        importer.telemetry.finish(record, "fresh")
+        importer.telemetry.finish(record, "failed", ValueError("unreadable"))
+        self.assertEqual(record["status"], "failed")
+        importer.retrieve_data(["TTE.PA"])
+        importer.manifest.close()
+        self.assertEqual(len(os.listdir(importer.reports_path)), 2)
+    # End def test_run_report_summarizes_telemetry
+
+    @patch("financial_pipeline.importer.data_sources.YfData")
+    def test_quotes_bind_the_session_once(self, mock_data):
+        mock_data.return_value.get_raw_json.return_value = {"quoteResponse": {"result": [
+            {"symbol": "TTE.PA", "regularMarketPrice": 60.0}, {"symbol": "AI.PA"}]}}
+        source, session = YahooDataSource(), MagicMock()
+
+        self.assertEqual(source.quotes(["TTE.PA", "AI.PA"], session=session), {"TTE.PA": 60.0})
+        source.quotes(["TTE.PA"], session=session)
+        mock_data.assert_called_once_with(session=session)
+    # End def test_quotes_bind_the_session_once
+
     def test_convert_timestamp(self):
         """Verifies date formatting transformation logic"""
         input_data = {
@@ -76,7 +413,7 @@ class TestFinancialDataImporter(unittest.TestCase):
                 datetime(2021, 1, 1): 200,
             }
         }
-        result = self.importer._convert_timestamp(input_data)
+        result = convert_timestamp(input_data)
         self.assertEqual(list(result["A"].keys()), ["2020-01-01", "2021-01-01"])
     # End def test_convert_timestamp
 # End class TestFinancialDataImporter
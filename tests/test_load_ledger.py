@@ -0,0 +1,56 @@
+import os
+import tempfile
+import unittest
+
+from financial_pipeline.storage.load_ledger import LoadLedger
+
+
+class TestLoadLedger(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.ledger = LoadLedger(os.path.join(self.tmp_dir.name, "test.db"))
+        self.paths = []
+        for ticker in ("AAA.PA", "BBB.PA", "CCC.PA"):
+            path = os.path.join(self.tmp_dir.name, f"{ticker}.json")
+            self._write(path, '{"isin": "%s"}' % ticker)
+            self.paths.append(path)
+    # End def setUp
+
+    def tearDown(self):
+        self.ledger.close()
+        self.tmp_dir.cleanup()
+    # End def tearDown
+
+    def _write(self, path, content):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+    # End def _write
+
+    def test_only_changed_files_are_returned(self):
+        self.assertEqual(self.ledger.changed(self.paths, "v1"), self.paths)
+        self.ledger.record(self.paths[:2], "v1")
+
+        # The third one was never loaded, e.g. its chunk failed
+        self.assertEqual(self.ledger.changed(self.paths, "v1"), self.paths[2:])
+
+        # New content is detected, a mere touch is not
+        self._write(self.paths[0], '{"isin": "changed"}')
+        os.utime(self.paths[1], ns=(1, 1))
+        self.assertEqual(self.ledger.changed(self.paths, "v1"), [self.paths[0], self.paths[2]])
+        self.ledger.record([self.paths[0], self.paths[2]], "v1")
+        self.assertEqual(self.ledger.changed(self.paths, "v1"), [])
+    # End def test_only_changed_files_are_returned
+
+    def test_new_mapping_version_reloads_everything(self):
+        self.ledger.changed(self.paths, "v1")
+        self.ledger.record(self.paths, "v1")
+
+        self.assertEqual(self.ledger.changed(self.paths, "v2"), self.paths)
+        self.ledger.clear()
+        self.assertEqual(len(self.ledger), 0)
+    # End def test_new_mapping_version_reloads_everything
+# End class TestLoadLedger
+
+
+if __name__ == "__main__":
+    unittest.main()
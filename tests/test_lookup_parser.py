@@ -0,0 +1,30 @@
+import unittest
+
+from financial_pipeline.importer.lookup_parser import LookupRecord, parse_lookup
+
+
+PAGE = ('<html><script>root.App.main = {"context":{"lookupData": {"start":0,"count":2,"total":2,"documents":['
+        '{"symbol":"TTE.PA","shortName":"TotalEnergies","exchange":"PAR","type":"EQUITY","industryName":"Energy",'
+        '"rank":null,"isYahooFinance":true},'
+        '{"symbol":"AI.PA","shortName":"Air Liquide","exchange":"PAR","type":"EQUITY"}],'
+        '"searchString":"A"},"plugins":{}}};</script></html>')
+
+
+class TestLookupParser(unittest.TestCase):
+    def test_parse_lookup(self):
+        page = parse_lookup(PAGE)
+        self.assertEqual(page.total, 2)
+        self.assertEqual(page.records[0], LookupRecord("TTE.PA", "TotalEnergies", "PAR", "EQUITY", "Energy"))
+        self.assertIsNone(page.records[1].industry)
+        self.assertEqual(page.records[0].to_registry()["yahoo_exchange"], "PAR")
+    # End def test_parse_lookup
+
+    def test_parse_lookup_without_data(self):
+        self.assertIsNone(parse_lookup("<html>No Results for 'ZZZZ'</span></html>"))
+        self.assertRaises(ValueError, parse_lookup, '"lookupData": {"documents": [__import__("os")]}')
+    # End def test_parse_lookup_without_data
+# End class TestLookupParser
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from financial_pipeline.importer import raw_store
+from financial_pipeline.importer.raw_store import RAW_FORMATS, get_raw_store, pack_statements, unpack_statements
+
+
+class TestRawStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.snapshot = {
+            "regularMarketPrice": 52.5,
+            "isin": "FR0000120271",
+            "incomestmt": {
+                "Operating Revenue": {"2023-12-31": 100.0, "2022-12-31": 90.0},
+                "Basic EPS": {"2023-12-31": 1.2},
+            },
+            "balancesheet": {},
+            "dividends": {"2023-01-10": 0.5},
+        }
+    # End def setUp
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+    # End def tearDown
+
+    def _available_formats(self):
+        formats = ["json", "json.gz"]
+        if raw_store.msgpack is not None:
+            formats.append("msgpack.gz")
+            if raw_store.zstandard is not None:
+                formats.append("msgpack.zst")
+        return formats
+    # End def _available_formats
+
+    def test_round_trip_every_format(self):
+        for raw_format in self._available_formats():
+            with self.subTest(raw_format=raw_format):
+                store = get_raw_store(raw_format, self.tmp_dir.name)
+                written = store.write("TTE.PA", self.snapshot)
+                self.assertEqual(written, os.path.getsize(store.path("TTE.PA")))
+                self.assertEqual(store.read("TTE.PA"), self.snapshot)
+                self.assertIsNone(store.read("MISSING"))
+                self.assertFalse(os.path.exists(f"{store.path('TTE.PA')}.tmp"))
+    # End def test_round_trip_every_format
+
+    def test_interrupted_write_keeps_the_previous_snapshot(self):
+        for raw_format in self._available_formats():
+            with self.subTest(raw_format=raw_format):
+                store = get_raw_store(raw_format, self.tmp_dir.name)
+                store.write("TTE.PA", self.snapshot)
+                with patch("financial_pipeline.importer.raw_store.os.replace", side_effect=OSError("disk full")):
+                    self.assertRaises(OSError, store.write, "TTE.PA", {"isin": "partial"})
+                self.assertEqual(store.read("TTE.PA"), self.snapshot)
+    # End def test_interrupted_write_keeps_the_previous_snapshot
+
+    def test_tickers_skip_reserved_files_and_other_formats(self):
+        json_store = get_raw_store("json", self.tmp_dir.name)
+        gzip_store = get_raw_store("json.gz", self.tmp_dir.name)
+        json_store.write("TTE.PA", self.snapshot)
+        json_store.write("yh_tickers", {"TTE.PA": "TotalEnergies"})
+        gzip_store.write("AI.PA", self.snapshot)
+
+        self.assertEqual(json_store.tickers(), ["TTE.PA"])
+        self.assertEqual(gzip_store.tickers(), ["AI.PA"])
+    # End def test_tickers_skip_reserved_files_and_other_formats
+
+    def test_pack_statements_is_columnar(self):
+        packed = pack_statements(self.snapshot)
+        self.assertEqual(packed["incomestmt"]["dates"], ["2022-12-31", "2023-12-31"])
+        self.assertEqual(packed["incomestmt"]["items"]["Basic EPS"], [None, 1.2])
+        self.assertEqual(unpack_statements(packed), self.snapshot)
+    # End def test_pack_statements_is_columnar
+
+    def test_unknown_format(self):
+        self.assertRaises(ValueError, get_raw_store, "xml", self.tmp_dir.name)
+        self.assertIn("json", RAW_FORMATS)
+    # End def test_unknown_format
+# End class TestRawStore
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+from financial_pipeline.importer.resilience import (
+    CircuitBreaker, CircuitOpenError, DeadLetterQueue, RetryPolicy, TokenBucket, is_host_failure
+)
+
+
+class TestResilience(unittest.TestCase):
+
+    def test_token_bucket_waits_when_empty(self):
+        bucket = TokenBucket(rate=100.0, capacity=2)
+        self.assertEqual(bucket.acquire(), 0.0)
+        self.assertEqual(bucket.acquire(), 0.0)
+        self.assertGreater(bucket.acquire(), 0.0)
+    # End def test_token_bucket_waits_when_empty
+
+    def test_circuit_breaker_opens_then_probes(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+        breaker.record_failure("host")
+        breaker.before_call("host")
+        breaker.record_failure("host")
+        self.assertEqual(breaker.state("host"), "open")
+        self.assertRaises(CircuitOpenError, breaker.before_call, "host")
+
+        with patch("financial_pipeline.importer.resilience.time.monotonic", return_value=float("inf")):
+            breaker.before_call("host")  # Single probe let through
+            self.assertRaises(CircuitOpenError, breaker.before_call, "host")
+        breaker.record_success("host")
+        self.assertEqual(breaker.state("host"), "closed")
+    # End def test_circuit_breaker_opens_then_probes
+
+    @patch("financial_pipeline.importer.resilience.time.sleep")
+    def test_retry_policy_backs_off_then_gives_up(self, mock_sleep):
+        policy = RetryPolicy(max_attempts=3, base_delay=1.0)
+        func = MagicMock(side_effect=[ValueError("boom"), "ok"])
+        on_retry = MagicMock()
+
+        self.assertEqual(policy.call(func, on_retry=on_retry), "ok")
+        self.assertEqual(func.call_count, 2)
+        on_retry.assert_called_once()
+        self.assertLessEqual(mock_sleep.call_args[0][0], 1.0)
+
+        func = MagicMock(side_effect=ValueError("boom"))
+        self.assertRaises(ValueError, policy.call, func)
+        self.assertEqual(func.call_count, 3)
+    # End def test_retry_policy_backs_off_then_gives_up
+
+    @patch("financial_pipeline.importer.resilience.time.sleep")
+    def test_breaker_counts_host_failures_once_per_call(self, mock_sleep):
+        policy = RetryPolicy(max_attempts=3)
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60.0)
+
+        # The host answered: a missing ticker does not count, whatever the attempts
+        for _ in range(3):
+            self.assertRaises(ValueError, policy.call, MagicMock(side_effect=ValueError("No data")),
+                              host="host", circuit_breaker=breaker)
+        self.assertEqual(breaker.state("host"), "closed")
+
+        self.assertRaises(ConnectionError, policy.call, MagicMock(side_effect=ConnectionError("reset")),
+                          host="host", circuit_breaker=breaker)
+        self.assertEqual(breaker.state("host"), "closed")
+        self.assertRaises(ConnectionError, policy.call, MagicMock(side_effect=ConnectionError("reset")),
+                          host="host", circuit_breaker=breaker)
+        self.assertEqual(breaker.state("host"), "open")
+
+        self.assertTrue(is_host_failure(Exception("429 Too Many Requests")))
+        self.assertFalse(is_host_failure(KeyError("isin")))
+    # End def test_breaker_counts_host_failures_once_per_call
+
+    def test_call_waits_for_an_open_circuit(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+        breaker.record_failure("host")
+
+        self.assertRaises(CircuitOpenError, RetryPolicy(wait_open=False).call, MagicMock(), host="host",
+                          circuit_breaker=breaker)
+        self.assertEqual(RetryPolicy().call(MagicMock(return_value="ok"), host="host", circuit_breaker=breaker), "ok")
+        self.assertEqual(breaker.state("host"), "closed")
+    # End def test_call_waits_for_an_open_circuit
+
+    def test_dead_letter_queue_is_persisted(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "dead_letter.db")
+            queue = DeadLetterQueue(path)
+            queue.add("TTE.PA", ValueError("boom"))
+            queue.add("TTE.PA", ValueError("boom again"))
+            queue.add("AI.PA", "timeout")
+
+            reloaded = DeadLetterQueue(path)
+            self.assertEqual(sorted(reloaded.tickers()), ["AI.PA", "TTE.PA"])
+            self.assertEqual(reloaded.get("TTE.PA")["failures"], 2)
+
+            reloaded.discard("TTE.PA")
+            self.assertEqual(DeadLetterQueue(path).tickers(), ["AI.PA"])
+    # End def test_dead_letter_queue_is_persisted
+# End class TestResilience
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import tempfile
+import unittest
+
+from financial_pipeline.cleaner.financial_data_cleaner import FinancialDataCleaner
+from financial_pipeline.importer import statement_store
+from financial_pipeline.importer.statement_store import StatementStore
+from financial_pipeline.importer.tickers import exchange_of
+
+
+@unittest.skipIf(statement_store.pyarrow is None, "pyarrow is not installed")
+class TestStatementStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.store = StatementStore(self.tmp_dir.name)
+        self.parts = {
+            "incomestmt": {
+                "Operating Revenue": {"2023-12-31": 100.0, "2022-12-31": 90.0},
+                "Basic EPS": {"2023-12-31": 1.2, "2022-12-31": 1.0},
+            },
+            "balancesheet": {
+                "Current Assets": {"2023-12-31": 50.0},
+                "Other Current Assets": {"2023-12-31": 10.0},
+            },
+            "dividends": {"2023-01-10": 0.5, "2023-04-15": 0.6},
+        }
+    # End def setUp
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+    # End def tearDown
+
+    def test_append_and_read_line_item(self):
+        self.assertEqual(self.store.append("TTE.PA", self.parts, fetch_date="2024-01-01"), 8)
+        self.store.append("AAPL", self.parts, fetch_date="2024-01-01")
+        self.assertEqual(self.store.flush(), 16)
+
+        revenue = self.store.read_line_item("Operating Revenue")
+        self.assertEqual(sorted(revenue.index), ["AAPL", "TTE.PA"])
+        self.assertEqual(revenue.loc["TTE.PA", "2023-12-31"], 100.0)
+
+        frame = self.store.read(line_items=["Basic EPS"], tickers=["AAPL"])
+        self.assertEqual(len(frame), 2)
+        self.assertEqual(set(frame["exchange"]), {"US"})
+    # End def test_append_and_read_line_item
+
+    def test_latest_fetch_wins(self):
+        self.store.append("TTE.PA", self.parts, fetch_date="2024-01-01")
+        self.store.flush()
+        self.parts["incomestmt"]["Operating Revenue"]["2023-12-31"] = 120.0
+        self.store.append("TTE.PA", self.parts, fetch_date="2024-02-01")
+        self.store.flush()
+
+        frame = self.store.read(line_items=["Operating Revenue"])
+        self.assertEqual(len(frame), 2)
+        self.assertEqual(frame.set_index("period").loc["2023-12-31", "value"], 120.0)
+        self.assertEqual(len(self.store.read(line_items=["Operating Revenue"], latest=False)), 4)
+    # End def test_latest_fetch_wins
+
+    def test_cleaner_reads_whole_universe(self):
+        self.store.append("TTE.PA", self.parts)
+        self.store.append("AI.PA", self.parts)
+        self.store.flush()
+
+        rows = FinancialDataCleaner().extract_from_store(self.store)
+        self.assertEqual(len(rows), 4)
+        latest = rows[(rows["name"] == "AI.PA") & (rows["year"] == 2023)].iloc[0]
+        self.assertEqual(latest["sales"], 100.0)
+        self.assertEqual(latest["current_assets"], 60.0)
+        self.assertAlmostEqual(latest["dividends"], 1.1)
+        self.assertIsNone(rows[rows["year"] == 2022].iloc[0]["current_assets"])
+    # End def test_cleaner_reads_whole_universe
+
+    def test_exchange_of(self):
+        self.assertEqual(exchange_of("TTE.PA"), "PA")
+        self.assertEqual(exchange_of("AAPL"), "US")
+    # End def test_exchange_of
+# End class TestStatementStore
+
+if __name__ == '__main__':
+    unittest.main()
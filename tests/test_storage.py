@@ -1,5 +1,8 @@
 import unittest
 
+import pandas as pd
+
+from financial_pipeline.cleaner.financial_data_cleaner import CompanyRecord
 from financial_pipeline.storage.company_storage import CompanyStorage
 
 
@@ -72,6 +75,41 @@ class TestCompanyStorage(unittest.TestCase):
         self.assertIsNone(self.storage.get_company("OmegaCorp"))
         self.assertEqual(self.storage.get_financials("OmegaCorp"), None)
     # End def test_delete_company
+
+    def test_insert_rows(self):
+        rows = [{"name": "AlphaCorp", "year": year, "country": "France", "sales": 10.0 * year} for year in (2022, 2023)]
+        self.assertEqual(self.storage.insert_rows(rows), 2)
+        self.storage.insert_rows([{"name": "AlphaCorp", "year": 2023, "country": "Spain", "sales": 1.0}])
+
+        self.assertEqual(self.storage.get_company("AlphaCorp")[2], "France")
+        financials = self.storage.get_financials("AlphaCorp")
+        self.assertEqual([(row[3], row[5]) for row in financials], [(2022, 20220.0), (2023, 1.0)])
+    # End def test_insert_rows
+
+    def test_insert_records(self):
+        financials = pd.DataFrame({"year": [2022, 2023], "period_end": ["2022-06-30", "2023-06-30"],
+                                   "sales": [1.5, float("nan")], "eps": [1, 2]})
+        record = CompanyRecord("AlphaCorp", {"country": "France", "isin": "FR0000120271"}, financials)
+        self.assertEqual(self.storage.insert_records([record]), 2)
+
+        self.assertEqual(self.storage.get_company("AlphaCorp")[2], "France")
+        rows = self.storage.get_financials("AlphaCorp")
+        self.assertEqual([(row[3], row[5], row[14]) for row in rows], [(2022, 1.5, 1.0), (2023, None, 2.0)])
+        self.assertEqual(self.storage.get_period_end("AlphaCorp", 2023), "2023-06-30")
+        self.assertIsNone(self.storage.get_period_end("AlphaCorp", 2021))
+    # End def test_insert_records
+
+    def test_insert_records_with_quarters(self):
+        financials = pd.DataFrame({"year": [2023], "sales": [100.0]})
+        quarters = pd.DataFrame({"period": ["2024-03-31", "2024-06-30"], "sales": [30.0, 35.0],
+                                 "ttm_sales": [float("nan"), 120.0]})
+        self.storage.insert_records([CompanyRecord("AlphaCorp", {}, financials, quarters)])
+
+        self.assertEqual([row["period"] for row in self.storage.get_quarterly("AlphaCorp")],
+                         ["2024-03-31", "2024-06-30"])
+        latest = self.storage.get_latest_ttm("AlphaCorp")
+        self.assertEqual((latest["period"], latest["ttm_sales"]), ("2024-06-30", 120.0))
+    # End def test_insert_records_with_quarters
 # End class TestCompanyStorage
 
 if __name__ == '__main__':
@@ -0,0 +1,87 @@
+import os
+import json
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from financial_pipeline.importer.ticker_crawler import COUNT_PAGE, CrawlFrontier, crawl, plan_prefix
+from financial_pipeline.storage.ticker_registry import TickerRegistry
+
+
+COUNTS = {"A": 9500, "AA": 150}
+
+
+def lookup_page(url, hdr):
+    """Fake lookup: A must be split, AA has 150 results over two pages, AB fails, the others are empty"""
+    prefix = url.split("s=")[1].split("&")[0]
+    start = int(url.split("b=")[1].split("&")[0])
+    if prefix == "AB":
+        raise ConnectionError("timeout")
+    count = COUNTS.get(prefix, 0)
+    documents = [{"symbol": f"{prefix}{start}.PA", "shortName": "Name", "type": "EQUITY", "exchange": "PAR"}]
+    lookup = {"start": start, "total": count, "documents": documents if count else [], "searchString": prefix}
+    return f'All ({count}) <script>"lookupData":{json.dumps(lookup)},"other":{{}}</script>'
+
+
+class TestTickerCrawler(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.state_path = os.path.join(self.tmp_dir.name, "crawl.db")
+        self.registry = TickerRegistry(":memory:")
+    # End def setUp
+
+    def tearDown(self):
+        self.registry.close()
+        self.tmp_dir.cleanup()
+    # End def tearDown
+
+    @patch("financial_pipeline.importer.ticker_crawler.call_url", side_effect=lookup_page)
+    def test_crawl_splits_only_full_prefixes_and_resumes(self, mock_call):
+        counts = crawl(self.state_path, self.registry, workers=3, alphabet=["A", "B"])
+
+        # A, B, AA and the second page of AA are done, AB failed
+        self.assertEqual(mock_call.call_count, 5)
+        self.assertEqual(counts, {"done": 4, "failed": 1})
+        self.assertEqual(self.registry.select(), ["A0.PA", "AA0.PA", "AA100.PA"])
+        self.assertEqual(self.registry.get("AA0.PA")["type"], "equity")
+
+        # A second run only retries what is not done
+        mock_call.reset_mock()
+        counts = crawl(self.state_path, self.registry, workers=3, alphabet=["A", "B"])
+        self.assertEqual(mock_call.call_count, 1)
+        self.assertEqual(counts, {"done": 4, "failed": 1})
+
+        # A new crawl skips the pages of AA, fully crawled, but splits A again as AB never completed
+        mock_call.reset_mock()
+        self.assertEqual(self.registry.crawled_results("AA"), 150)
+        self.assertIsNone(self.registry.crawled_results("A"))
+        crawl(os.path.join(self.tmp_dir.name, "new_crawl.db"), self.registry, workers=3, alphabet=["A", "B"])
+        self.assertEqual(sorted(call.args[0].split("s=")[1].split("&")[0] for call in mock_call.call_args_list),
+                         ["A", "AA", "AB", "B"])
+    # End def test_crawl_splits_only_full_prefixes_and_resumes
+
+    def test_plan_prefix(self):
+        self.assertEqual(plan_prefix("A", 9500, alphabet=["A", "B"]), [("AA", COUNT_PAGE), ("AB", COUNT_PAGE)])
+        self.assertEqual(plan_prefix("ABCD", 9500, alphabet=["A", "B"])[-1], ("ABCD", 9400))
+        self.assertEqual(plan_prefix("AB", 250), [("AB", 100), ("AB", 200)])
+        self.assertEqual(plan_prefix("AB", 80), [])
+        self.assertEqual(plan_prefix("AB", 250, covered=250), [])
+        self.assertEqual(plan_prefix("A", 9500, covered=9500, alphabet=["A", "B"]), [])
+        self.assertEqual(plan_prefix("AB", 250, covered=200), [("AB", 100), ("AB", 200)])
+    # End def test_plan_prefix
+
+    def test_frontier_completes_atomically(self):
+        frontier = CrawlFrontier(self.state_path)
+        frontier.add([("AA", COUNT_PAGE)])
+        frontier.complete(("AA", COUNT_PAGE), [("AA", 100), ("AA", 200)], results=250)
+
+        self.assertEqual(frontier.remaining(), [("AA", 100), ("AA", 200)])
+        self.assertEqual(frontier.results("AA"), 250)
+        self.assertEqual(frontier.counts(), {"done": 1, "pending": 2})
+        frontier.close()
+    # End def test_frontier_completes_atomically
+# End class TestTickerCrawler
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+
+from financial_pipeline.storage.ticker_registry import TickerRegistry
+
+
+class TestTickerRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = TickerRegistry(":memory:")
+        self.registry.load_mapping({"TTE.PA": "TotalEnergies", "AI.PA": "Air Liquide", "AAPL": "Apple"})
+    # End def setUp
+
+    def tearDown(self):
+        self.registry.close()
+    # End def tearDown
+
+    def test_select_by_exchange(self):
+        self.assertEqual(self.registry.select(exchange="PA"), ["AI.PA", "TTE.PA"])
+        self.assertEqual(self.registry.select(exchange="US"), ["AAPL"])
+        self.assertEqual(len(self.registry), 3)
+        self.assertEqual(self.registry.count("A"), 2)
+        self.assertEqual(self.registry.count("AI"), 1)
+    # End def test_select_by_exchange
+
+    def test_upsert_keeps_known_fields(self):
+        self.registry.upsert([{"symbol": "TTE.PA", "type": "EQUITY", "yahoo_exchange": "PAR"}])
+        self.registry.upsert([{"symbol": "TTE.PA", "industry": "Energy"}])
+
+        record = self.registry.get("TTE.PA")
+        self.assertEqual(record["short_name"], "TotalEnergies")
+        self.assertEqual(record["type"], "equity")
+        self.assertEqual(record["yahoo_exchange"], "PAR")
+        self.assertEqual(record["industry"], "Energy")
+        self.assertEqual(self.registry.select(exchange="PA", type="Equity"), ["TTE.PA"])
+    # End def test_upsert_keeps_known_fields
+
+    def test_loaded_version(self):
+        self.assertIsNone(self.registry.loaded_version("yh_tickers.json"))
+        self.registry.load_mapping({}, source="yh_tickers.json", version="42.0")
+        self.assertEqual(self.registry.loaded_version("yh_tickers.json"), "42.0")
+    # End def test_loaded_version
+
+    def test_primary_listing_prefers_home_market(self):
+        self.assertFalse(self.registry.set_isin("TTE", "-"))
+        self.registry.set_isin("TTE", "FR0000120271")
+        self.assertEqual(self.registry.primary_of("TTE"), "TTE")
+
+        self.registry.set_isin("TOTB.F", "FR0000120271")
+        self.registry.set_isin("TTE.PA", "FR0000120271")
+        self.assertEqual(self.registry.primary_of("TOTB.F"), "TTE.PA")
+        self.assertEqual(self.registry.primary_of("TTE.PA"), "TTE.PA")
+        self.assertIsNone(self.registry.primary_of("AAPL"))
+        self.assertEqual(len(self.registry), 3)
+    # End def test_primary_listing_prefers_home_market
+# End class TestTickerRegistry
+
+
+if __name__ == "__main__":
+    unittest.main()
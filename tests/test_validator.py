@@ -0,0 +1,100 @@
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+from financial_pipeline.cleaner.financial_data_cleaner import CompanyRecord
+from financial_pipeline.cleaner.validator import FinancialValidator
+from financial_pipeline.storage.company_storage import CompanyStorage
+from financial_pipeline.utils.helpers import insert_cleaned_financials
+
+
+def make_record(name, sector=None, **overrides):
+    financials = pd.DataFrame({
+        "year": [2020, 2021, 2022, 2023],
+        "share_price": [50.0] * 4,
+        "shares_issued": [1_000_000] * 4,
+        "sales": [100e6, 110e6, 120e6, 130e6],
+        "current_assets": [40e6, 42e6, 44e6, 46e6],
+        "current_liabilities": [20e6] * 4,
+        "equity": [80e6] * 4,
+        "net_income": [10e6, 11e6, 12e6, 13e6],
+        "eps": [10.0, 11.0, 12.0, 13.0],
+        "dividends": [1.0] * 4,
+    })
+    for column, (index, value) in overrides.items():
+        financials.loc[index, column] = value
+    return CompanyRecord(name, {"country": "France", "sector": sector}, financials)
+
+
+class TestFinancialValidator(unittest.TestCase):
+    def setUp(self):
+        self.validator = FinancialValidator()
+    # End def setUp
+
+    def test_clean_batch_passes(self):
+        result = self.validator.split([make_record("AAA"), make_record("BBB")])
+        self.assertTrue(result.quarantine.empty)
+        self.assertEqual([len(record.financials) for record in result.records], [4, 4])
+    # End def test_clean_batch_passes
+
+    def test_bad_years_are_quarantined_with_reasons(self):
+        records = [
+            make_record("AAA", eps=(1, None)),
+            make_record("BBB", current_assets=(2, 44e9)),    # Thousands read as units
+            make_record("CCC", shares_issued=(3, -5)),
+            make_record("DDD", eps=(0, -10.0)),
+        ]
+        result = self.validator.split(records)
+        reasons = {(row.name, row.year): row.reasons for row in result.quarantine.itertuples()}
+
+        self.assertEqual(set(reasons), {("AAA", 2021), ("BBB", 2022), ("CCC", 2023), ("DDD", 2020)})
+        self.assertIn("eps: missing", reasons[("AAA", 2021)])
+        self.assertIn("current_assets: over 100x jump from a neighbouring year", reasons[("BBB", 2022)])
+        self.assertIn("shares_issued: out of range", reasons[("CCC", 2023)])
+        self.assertIn("eps: sign differs from net_income", reasons[("DDD", 2020)])
+        self.assertEqual([record.financials["year"].tolist() for record in result.records][1], [2020, 2021, 2023])
+    # End def test_bad_years_are_quarantined_with_reasons
+
+    def test_required_fields_depend_on_the_sector(self):
+        bank = make_record("BANK", sector="Financial Services")
+        bank.financials[["current_assets", "current_liabilities"]] = None
+        retailer = make_record("SHOP", sector="Consumer Cyclical", current_liabilities=(0, None))
+
+        result = self.validator.split([bank, retailer])
+        self.assertEqual(len(result.records[0].financials), 4)
+        self.assertEqual(result.quarantine[["name", "year"]].values.tolist(), [["SHOP", 2020]])
+        self.assertEqual(result.quarantine["reasons"][0], "current_liabilities: missing")
+    # End def test_required_fields_depend_on_the_sector
+
+    def test_quarantine_is_stored_and_released(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            storage = CompanyStorage(os.path.join(tmp_dir, "test.db"))
+            result = self.validator.split([make_record("AAA", eps=(1, None))])
+            self.assertEqual(storage.insert_quarantine(result.quarantine), 1)
+            storage.insert_records(result.records)
+            self.assertEqual(len(storage.get_financials("AAA")), 3)
+            self.assertEqual(storage.get_quarantine("AAA")[0]["year"], 2021)
+
+            # Once the year loads cleanly, its rejection is dropped
+            storage.insert_records(self.validator.split([make_record("AAA")]).records)
+            self.assertEqual(storage.get_quarantine(), [])
+            storage.close()
+    # End def test_quarantine_is_stored_and_released
+
+    def test_cleaned_rows_are_validated(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db_path = os.path.join(tmp_dir, "test.db")
+            written = insert_cleaned_financials(make_record("AAA", eps=(1, None)).to_rows(), db_path)
+            self.assertEqual(written, 3)
+
+            storage = CompanyStorage(db_path)
+            self.assertEqual(storage.get_quarantine("AAA")[0]["year"], 2021)
+            storage.close()
+    # End def test_cleaned_rows_are_validated
+# End class TestFinancialValidator
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from financial_pipeline.importer.work_queue import WorkQueue
+
+
+class TestWorkQueue(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "queue.db")
+        self.queue = WorkQueue(self.path, lease_seconds=60, max_attempts=2)
+        self.queue.add(["A", "B", "C"])
+    # End def setUp
+
+    def tearDown(self):
+        self.queue.close()
+        self.tmp_dir.cleanup()
+    # End def tearDown
+
+    def test_claims_do_not_overlap(self):
+        other = WorkQueue(self.path)
+        self.assertEqual(self.queue.claim("w1", 2), ["A", "B"])
+        self.assertEqual(other.claim("w2", 2), ["C"])
+        self.assertEqual(other.claim("w2", 2), [])
+        other.close()
+
+        self.assertTrue(self.queue.complete("w1", "A", True))
+        self.assertTrue(self.queue.complete("w1", "B", False, "boom"))
+        self.assertEqual(self.queue.counts(), {"done": 1, "pending": 1, "leased": 1})
+        self.assertEqual(self.queue.unfinished(), 2)
+    # End def test_claims_do_not_overlap
+
+    def test_failures_are_retried_then_failed(self):
+        for attempt in range(2):
+            self.assertEqual(self.queue.claim("w1", 1), ["A"])
+            self.assertTrue(self.queue.complete("w1", "A", False, "boom"))
+        self.assertEqual(self.queue.counts(), {"failed": 1, "pending": 2})
+    # End def test_failures_are_retried_then_failed
+
+    def test_new_run_requeues_finished_tickers(self):
+        self.queue.claim("w1", 3)
+        self.queue.complete("w1", "A", True)
+        self.queue.add(["A", "B", "D"])
+        self.assertEqual(self.queue.counts(), {"done": 1, "leased": 2, "pending": 1})
+
+        self.queue.add(["A", "B", "D"], reset=True)
+        self.assertEqual(self.queue.counts(), {"leased": 2, "pending": 2})
+    # End def test_new_run_requeues_finished_tickers
+
+    def test_expired_leases_are_requeued(self):
+        self.assertEqual(self.queue.claim("w1", 3), ["A", "B", "C"])
+        self.assertEqual(self.queue.heartbeat("w1"), 3)
+
+        with patch("financial_pipeline.importer.work_queue.time.time", return_value=10 ** 10):
+            self.assertEqual(self.queue.claim("w2", 1), ["A"])
+        # w1 stopped sending heartbeats: its late result is discarded
+        self.assertFalse(self.queue.complete("w1", "A", True))
+        self.assertTrue(self.queue.complete("w2", "A", True))
+
+        # Second expiry of B and C reaches max_attempts
+        self.assertEqual(self.queue.claim("w2", 2), ["B", "C"])
+        with patch("financial_pipeline.importer.work_queue.time.time", return_value=10 ** 11):
+            self.assertEqual(self.queue.claim("w3", 2), [])
+        self.assertEqual(self.queue.counts(), {"done": 1, "failed": 2})
+    # End def test_expired_leases_are_requeued
+
+    def test_release_gives_leases_back(self):
+        self.queue.claim("w1", 3)
+        self.queue.release("w1")
+        self.assertEqual(self.queue.counts(), {"pending": 3})
+        self.assertEqual(self.queue.claim("w2", 3), ["A", "B", "C"])
+    # End def test_release_gives_leases_back
+# End class TestWorkQueue
+
+
+if __name__ == "__main__":
+    unittest.main()